@@ -0,0 +1,99 @@
+"""
+Local stand-ins for Razorpay, the email transport and Google Sheets.
+
+They mimic the call shapes the services use and can add artificial latency, so the
+full order flow can be benchmarked without any network access. Razorpay and gspread
+are blocking SDKs, so their fakes block too; the email transport is async.
+"""
+
+import time
+import uuid
+import asyncio
+from email.message import EmailMessage
+from typing import Dict, Any, List
+from services.mail_transport import MailTransport
+
+
+class _FakeRazorpayOrders:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.created: List[Dict[str, Any]] = []
+
+    def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        order = {"id": f"order_{uuid.uuid4().hex[:14]}", "entity": "order", "status": "created", **data}
+        self.created.append(order)
+        return order
+
+
+class FakeRazorpayClient:
+    def __init__(self, latency: float = 0.0):
+        self.order = _FakeRazorpayOrders(latency)
+
+
+class FakeMailTransport(MailTransport):
+    name = "fake"
+    enabled = True
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sent: List[EmailMessage] = []
+
+    async def send(self, message: EmailMessage) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append(message)
+        return message['Message-ID']
+
+
+class FakeWorksheet:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.rows: List[List[Any]] = []
+
+    def append_row(self, row: List[Any]) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        self.rows.append(row)
+
+    def row_values(self, row_number: int) -> List[Any]:
+        return self.rows[row_number - 1] if len(self.rows) >= row_number else []
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet: FakeWorksheet):
+        self.worksheet = worksheet
+
+    def get_worksheet(self, index: int) -> FakeWorksheet:
+        return self.worksheet
+
+
+class FakeSheetsClient:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.worksheet = FakeWorksheet(latency)
+
+    def open_by_key(self, sheet_id: str) -> FakeSpreadsheet:
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeSpreadsheet(self.worksheet)
+
+
+def install_fakes(server_module, latency: float = 0.0) -> Dict[str, Any]:
+    """Swap the outside clients used by the app for local fakes"""
+    from services.gmail_service import gmail_service
+    from services.sheets_service import sheets_service
+
+    fakes = {
+        "razorpay": FakeRazorpayClient(latency),
+        "mail": FakeMailTransport(latency),
+        "sheets": FakeSheetsClient(latency)
+    }
+    server_module.razorpay_client = fakes["razorpay"]
+    gmail_service.transport = fakes["mail"]
+    gmail_service.enabled = True
+    sheets_service._client = fakes["sheets"]
+    sheets_service._client_initialized = True
+    sheets_service.sheet_id = "benchmark-sheet"
+    return fakes
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Concurrent load benchmark for the Stallion & Co. order flow.
+
+Each virtual customer runs the full flow: submit measurements, upload a photo,
+create a payment order and verify the payment. Requests go straight into the
+ASGI app in-process, Razorpay, email and Sheets are replaced by local fakes,
+and MongoDB is a local server (a throwaway database is created and dropped).
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --customers 200 --concurrency 20
+    python -m benchmarks.load_test --output results.json --compare previous.json
+"""
+
+import os
+import sys
+import json
+import hmac
+import time
+import uuid
+import asyncio
+import shutil
+import hashlib
+import argparse
+import tempfile
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+# Settings must be in place before the app is imported
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ["DB_NAME"] = os.environ.get("BENCHMARK_DB_NAME", f"stallion_benchmark_{uuid.uuid4().hex[:8]}")
+os.environ["RAZORPAY_KEY_ID"] = "rzp_benchmark"
+os.environ["RAZORPAY_KEY_SECRET"] = "benchmark_secret"
+os.environ.setdefault("REMINDER_SWEEP_ENABLED", "false")
+os.environ.setdefault("NOTIFICATION_DIGEST_ENABLED", "false")
+# Every simulated customer shares one client address
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+# Background jobs that delete or move data stay off, and files go to a scratch directory,
+# so a run from the backend directory never touches the real uploads or archive
+os.environ["UPLOAD_GC_ENABLED"] = "false"
+os.environ["ARCHIVE_ENABLED"] = "false"
+os.environ["ANALYTICS_ENABLED"] = "false"
+SCRATCH_DIR = tempfile.mkdtemp(prefix="stallion_benchmark_")
+os.environ["UPLOAD_DIR"] = os.path.join(SCRATCH_DIR, "uploads")
+os.environ["RESUMABLE_UPLOAD_DIR"] = os.path.join(SCRATCH_DIR, "uploads_partial")
+os.environ["ARCHIVE_DIR"] = os.path.join(SCRATCH_DIR, "archive")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+from benchmarks.fakes import install_fakes  # noqa: E402
+
+STEPS = ["submit_measurements", "upload_image", "create_payment_order", "verify_payment"]
+
+# Smallest valid PNG (1x1 transparent pixel)
+SAMPLE_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+
+class ASGIClient:
+    """Sends HTTP requests directly into an ASGI app without opening sockets.
+
+    A request returns as soon as the last body chunk is sent, like a real client would see it.
+    Background tasks that Starlette runs after the response keep going and are awaited by drain().
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._pending: Set[asyncio.Task] = set()
+
+    async def request(self, method: str, path: str, body: bytes = b"",
+                      headers: Optional[Dict[str, str]] = None, query: str = "") -> Tuple[int, bytes]:
+        headers = headers or {}
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()]
+                       + [(b"content-length", str(len(body)).encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("benchmark", 80)
+        }
+        response_done = asyncio.Event()
+        body_sent = False
+        status_code = 500
+        chunks: List[bytes] = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        app_call = asyncio.create_task(self.app(scope, receive, send))
+        self._pending.add(app_call)
+        app_call.add_done_callback(self._pending.discard)
+        response_waiter = asyncio.create_task(response_done.wait())
+        await asyncio.wait({app_call, response_waiter}, return_when=asyncio.FIRST_COMPLETED)
+        if not response_done.is_set():
+            response_waiter.cancel()
+            response_done.set()
+            # The app finished or failed without completing a response
+            app_call.result()
+        return status_code, b"".join(chunks)
+
+    async def drain(self) -> None:
+        """Wait for background work still running after responses were sent"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def post_json(self, path: str, payload: Dict[str, Any], query: str = "") -> Tuple[int, bytes]:
+        return await self.request(
+            "POST", path, json.dumps(payload).encode(), {"content-type": "application/json"}, query
+        )
+
+    async def post_multipart(self, path: str, fields: Dict[str, str], file_field: str,
+                             filename: str, content: bytes, content_type: str) -> Tuple[int, bytes]:
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in fields.items():
+            parts.append(
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode()
+            )
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{file_field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: {content_type}\r\n\r\n".encode() + content + b"\r\n"
+        )
+        parts.append(f"--{boundary}--\r\n".encode())
+        return await self.request(
+            "POST", path, b"".join(parts), {"content-type": f"multipart/form-data; boundary={boundary}"}
+        )
+
+
+def sample_submission(index: int) -> Dict[str, Any]:
+    return {
+        "customer_info": {
+            "first_name": "Benchmark",
+            "last_name": f"Customer{index}",
+            "email": f"benchmark.customer{index}@example.com",
+            "phone": "+91 98765 43210",
+            "age": 35,
+            "body_type": "Athletic",
+            "special_considerations": "Prefers slightly tapered fit"
+        },
+        "measurements": {
+            "height": 180.5,
+            "weight": 75.2,
+            "outseam": 108.0,
+            "waist": 84.0,
+            "hip_seat": 98.0,
+            "thigh": 58.0,
+            "crotch_rise": 28.5,
+            "bottom_opening": 18.0,
+            "unit": "cm"
+        },
+        "product_selected": "Premium Tailored Trousers",
+        "fabric_choice": "Wool",
+        "style_preferences": "Classic fit",
+        "notes": "Benchmark order"
+    }
+
+
+class LoadTest:
+    def __init__(self, customers: int, concurrency: int):
+        self.customers = customers
+        self.concurrency = concurrency
+        self.client = ASGIClient(server.app)
+        self.latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.errors: Dict[str, int] = {step: 0 for step in STEPS}
+        self.uploaded_files: List[str] = []
+
+    async def _timed(self, step: str, call) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        status_code, body = await call
+        self.latencies[step].append(time.perf_counter() - started)
+        if status_code != 200:
+            self.errors[step] += 1
+            return None
+        return json.loads(body)
+
+    async def run_customer(self, index: int) -> None:
+        submission = await self._timed(
+            "submit_measurements",
+            self.client.post_json("/api/measurements", sample_submission(index))
+        )
+        if not submission:
+            return
+        submission_id = submission["submission_id"]
+
+        upload = await self._timed(
+            "upload_image",
+            self.client.post_multipart(
+                "/api/upload-image", {"image_type": "front_view"}, "file",
+                "front_view.png", SAMPLE_PNG, "image/png"
+            )
+        )
+        if upload:
+            self.uploaded_files.append(upload["filename"])
+
+        order = await self._timed(
+            "create_payment_order",
+            self.client.post_json("/api/create-payment-order", {"submission_id": submission_id, "quantity": 1})
+        )
+        if not order:
+            return
+
+        payment_id = f"pay_{uuid.uuid4().hex[:14]}"
+        signature = hmac.new(
+            os.environ["RAZORPAY_KEY_SECRET"].encode(),
+            f"{order['order_id']}|{payment_id}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        await self._timed(
+            "verify_payment",
+            self.client.post_json("/api/verify-payment", {
+                "razorpay_order_id": order["order_id"],
+                "razorpay_payment_id": payment_id,
+                "razorpay_signature": signature,
+                "submission_id": submission_id
+            })
+        )
+
+    async def run(self) -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(index: int) -> None:
+            async with semaphore:
+                await self.run_customer(index)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(limited(index) for index in range(self.customers)))
+        elapsed = time.perf_counter() - started
+        await self.client.drain()
+        return self.summarize(elapsed)
+
+    def summarize(self, elapsed: float) -> Dict[str, Any]:
+        total_requests = sum(len(values) for values in self.latencies.values())
+        steps = {}
+        for step, values in self.latencies.items():
+            ordered = sorted(values)
+            steps[step] = {
+                "requests": len(ordered),
+                "errors": self.errors[step],
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "max_ms": round((ordered[-1] if ordered else 0) * 1000, 2)
+            }
+        return {
+            "customers": self.customers,
+            "concurrency": self.concurrency,
+            "elapsed_seconds": round(elapsed, 3),
+            "total_requests": total_requests,
+            "requests_per_second": round(total_requests / elapsed, 1) if elapsed else 0,
+            "orders_per_second": round(self.customers / elapsed, 1) if elapsed else 0,
+            "steps": steps
+        }
+
+    def cleanup(self) -> None:
+        for filename in self.uploaded_files:
+            try:
+                (server.UPLOAD_DIR / filename).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def print_report(results: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+    print(f"\nOrder flow benchmark: {results['customers']} customers, concurrency {results['concurrency']}")
+    print(f"Elapsed {results['elapsed_seconds']}s, {results['requests_per_second']} req/s, "
+          f"{results['orders_per_second']} orders/s")
+    print(f"\n{'step':<22}{'reqs':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, stats in results["steps"].items():
+        print(f"{step:<22}{stats['requests']:>7}{stats['errors']:>8}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+
+    if previous:
+        print("\nChange against previous run (p95):")
+        for step, stats in results["steps"].items():
+            before = previous.get("steps", {}).get(step, {}).get("p95_ms")
+            if before:
+                change = (stats["p95_ms"] - before) / before * 100
+                print(f"  {step:<22}{before:>10} -> {stats['p95_ms']:<10} ({change:+.1f}%)")
+        before_rps = previous.get("requests_per_second")
+        if before_rps:
+            change = (results["requests_per_second"] - before_rps) / before_rps * 100
+            print(f"  {'requests/second':<22}{before_rps:>10} -> {results['requests_per_second']:<10} ({change:+.1f}%)")
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    install_fakes(server, latency=args.external_latency_ms / 1000)
+    await server.app.router.startup()
+    warm_up = LoadTest(min(5, args.customers), 1)
+    load_test = LoadTest(args.customers, args.concurrency)
+    try:
+        # Warm up connections and code paths before measuring
+        await warm_up.run()
+        return await load_test.run()
+    finally:
+        warm_up.cleanup()
+        load_test.cleanup()
+        await server.client.drop_database(os.environ["DB_NAME"])
+        await server.app.router.shutdown()
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent order flow benchmark")
+    parser.add_argument("--customers", type=int, default=200, help="Number of complete order flows")
+    parser.add_argument("--concurrency", type=int, default=20, help="Customers running at the same time")
+    parser.add_argument("--external-latency-ms", type=float, default=0.0,
+                        help="Artificial latency added to each fake Razorpay, email and Sheets call")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+
+    previous = None
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare) as previous_file:
+            previous = json.load(previous_file)
+    print_report(results, previous)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"\nResults written to {args.output}")
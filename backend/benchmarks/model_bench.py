@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for TailoringSubmission validation and serialization.
+
+Measures, for a typical and a worst-case payload:
+  - validation: building TailoringSubmission from request JSON (nested models, regex
+    fields and validate_positive_measurements)
+  - to_dict:    submission.dict(), as used to build the Mongo document
+  - to_json:    JSON encoding of the submission
+  - to_bson:    BSON encoding of the Mongo document, the work insert_one does
+
+Results are compared with a saved baseline; the run fails when any result is slower
+than the baseline by more than the tolerance. Baselines are machine specific, so save
+one on the machine that runs the comparison.
+
+Usage (from the backend directory):
+    python -m benchmarks.model_bench --save-baseline
+    python -m benchmarks.model_bench --tolerance 0.2
+"""
+
+import os
+import sys
+import json
+import timeit
+import argparse
+import warnings
+from pathlib import Path
+from typing import Dict, Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson  # noqa: E402
+from server import TailoringSubmission  # noqa: E402
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "model_bench.json"
+
+TYPICAL_PAYLOAD: Dict[str, Any] = {
+    "customer_info": {
+        "first_name": "Alexander",
+        "last_name": "Sterling",
+        "email": "alexander.sterling@luxurymail.com",
+        "phone": "+44 20 7123 4567"
+    },
+    "measurements": {
+        "height": 180.5,
+        "weight": 75.2,
+        "waist": 84.0,
+        "unit": "cm"
+    },
+    "fabric_choice": "Wool"
+}
+
+WORST_CASE_PAYLOAD: Dict[str, Any] = {
+    "customer_info": {
+        "first_name": "A" * 50,
+        "last_name": "B" * 50,
+        "email": ("very.long.local.part." * 3) + "@" + ("sub." * 10) + "example.com",
+        "phone": "+" + "(91) 98765-43210 " * 4,
+        "age": 120,
+        "body_type": "Athletic build with broad shoulders",
+        "special_considerations": "Requires alterations for formal events " * 10
+    },
+    "measurements": {
+        "height": 249.9,
+        "weight": 299.9,
+        "outseam": 149.9,
+        "waist": 149.9,
+        "hip_seat": 179.9,
+        "thigh": 99.9,
+        "crotch_rise": 49.9,
+        "bottom_opening": 39.9,
+        "unit": "in"
+    },
+    "product_selected": "Premium Tailored Trousers",
+    "fabric_choice": "Silk Blend",
+    "style_preferences": "Classic fit with modern details " * 10,
+    "notes": "N" * 500,
+    "quantity": 10,
+    "images": {
+        "front_view": "/uploads/015506cf-89c2-4ccd-b7eb-b1479456c69d_front_view.png",
+        "side_view": "/uploads/2412adf2-5076-4e5d-bece-3ad17707a51c_side_view.png",
+        "reference_fit": "/uploads/d9c0417c-843c-4a02-a626-d3953c598d29_reference_fit.png"
+    },
+    "session_id": "session_" + "x" * 64,
+    "urgent": True
+}
+
+PAYLOADS = {"typical": TYPICAL_PAYLOAD, "worst_case": WORST_CASE_PAYLOAD}
+
+
+def to_json(submission: TailoringSubmission) -> str:
+    if hasattr(submission, "model_dump_json"):
+        return submission.model_dump_json()
+    return submission.json()
+
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    cases: Dict[str, Callable[[], Any]] = {}
+    for payload_name, payload in PAYLOADS.items():
+        submission = TailoringSubmission(**payload)
+        document = submission.dict()
+        cases[f"{payload_name}.validation"] = lambda payload=payload: TailoringSubmission(**payload)
+        cases[f"{payload_name}.to_dict"] = submission.dict
+        cases[f"{payload_name}.to_json"] = lambda submission=submission: to_json(submission)
+        cases[f"{payload_name}.to_bson"] = lambda document=document: bson.encode(document)
+    return cases
+
+
+def measure(function: Callable[[], Any], repeat: int, min_time: float) -> float:
+    """Best time per call in microseconds"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1_000_000
+
+
+def run(repeat: int, min_time: float) -> Dict[str, float]:
+    with warnings.catch_warnings():
+        # .dict() and .json() are deprecated aliases on pydantic v2 but are what the app calls
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return {name: round(measure(function, repeat, min_time), 3) for name, function in build_cases().items()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="TailoringSubmission micro-benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats per case (best is kept)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Approximate seconds per repeat")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline, as a fraction (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    if not args.save_baseline and not baseline_path.exists():
+        # Without a baseline there is nothing to gate on, so a CI run must not pass silently
+        print(f"No baseline at {baseline_path}; run with --save-baseline on this machine to create one")
+        return 2
+
+    results = run(args.repeat, args.min_time)
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        for name, value in results.items():
+            print(f"{name:<28}{value:>10.2f} µs")
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text())
+    regressions = []
+    print(f"{'case':<28}{'µs/call':>10}{'baseline':>10}{'change':>9}")
+    for name, value in results.items():
+        before = baseline.get(name)
+        if before:
+            change = (value - before) / before
+            flag = "  SLOWER" if change > args.tolerance else ""
+            print(f"{name:<28}{value:>10.2f}{before:>10.2f}{change:>+8.1%}{flag}")
+            if change > args.tolerance:
+                regressions.append(name)
+        else:
+            print(f"{name:<28}{value:>10.2f}{'-':>10}{'-':>9}")
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
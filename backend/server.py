@@ -1,17 +1,19 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Form, status, BackgroundTasks, Request, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Form, status, BackgroundTasks, Request, UploadFile, File, Depends, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone
 from enum import Enum
 import uuid
 import os
+import time
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
-import razorpay
 
 # Load environment variables
 load_dotenv()
@@ -20,27 +22,60 @@ import hashlib
 import json
 from services.gmail_service import gmail_service
 from services.sheets_service import sheets_service
+from services.reminder_service import reminder_service, build_payment_link
+from services.digest_service import notification_digest
+from services.template_service import template_engine
+from services.loop_monitor import loop_monitor
+from services.tracing import tracer, parse_traceparent, mongo_trace_listener, TraceContext
+from services.mongo_profiler import mongo_profiler, mongo_profiler_listener
+from services.rate_limiter import admission_control, rate_limited_requests_total
+from services.upload_service import upload_service, UploadError
+from services.upload_gc import upload_gc
+from services.archive_service import archive_service
+from services.scheduling_service import fitting_scheduler, SlotUnavailableError
+from services.size_recommender import size_recommender
+from services.pagination import keyset_page, InvalidCursorError
+from services.counters_service import business_counters
+from services.analytics_service import measurement_analytics
+from services.log_pipeline import log_pipeline, request_id_var
+from services.job_tracker import job_tracker
+from services.health_service import readiness_probe
+from services.mongo_settings import mongo_settings
+from services.warmup_service import startup_warmup
+from services.metrics import (
+    metrics, track_external, track_background_task, mongo_command_listener, mongo_pool_listener,
+    http_requests_total, http_request_duration_seconds, http_requests_in_flight
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection, created per worker process in the startup hook
+client: Optional[AsyncIOMotorClient] = None
+db = None
+# Same database with the read preference and read concern for read-only endpoints
+read_db = None
+
+# Razorpay client, created on first use
+razorpay_client = None
 
-# Razorpay configuration
-razorpay_client = razorpay.Client(auth=(
-    os.environ.get('RAZORPAY_KEY_ID'),
-    os.environ.get('RAZORPAY_KEY_SECRET')
-))
+def get_razorpay_client():
+    """Return the Razorpay client, importing the SDK and creating it on first use"""
+    global razorpay_client
+    if razorpay_client is None:
+        import razorpay
+        razorpay_client = razorpay.Client(auth=(
+            os.environ.get('RAZORPAY_KEY_ID'),
+            os.environ.get('RAZORPAY_KEY_SECRET')
+        ))
+    return razorpay_client
 
 # Business configuration
 BASE_PRICE_PAISE = int(os.environ.get('BASE_PRICE_PAISE', '45000'))  # Default ₹450
 
 # Create uploads directory
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+UPLOAD_DIR = Path(os.environ.get('UPLOAD_DIR', 'uploads'))
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 # Create the main app
 app = FastAPI(title="Stallion & Co. Luxury Tailoring API")
@@ -48,13 +83,24 @@ app = FastAPI(title="Stallion & Co. Luxury Tailoring API")
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging; each worker switches to the queued writer thread in its startup hook
+log_pipeline.configure(logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Allow admin and debug endpoints only with the ADMIN_API_KEY header"""
+    admin_key = os.environ.get('ADMIN_API_KEY')
+    if not admin_key:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin API not configured"
+        )
+    if not x_admin_key or not hmac.compare_digest(x_admin_key, admin_key):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin key"
+        )
+
 # Data Models
 class MeasurementUnit(str, Enum):
     CENTIMETERS = "cm"
@@ -113,6 +159,7 @@ class TailoringSubmission(BaseModel):
     payment_id: Optional[str] = Field(None, description="Razorpay payment ID")
     razorpay_order_id: Optional[str] = Field(None, description="Razorpay order ID")
     total_amount: Optional[int] = Field(None, description="Total amount in paise")
+    urgent: bool = Field(default=False, description="Notify the tailors immediately instead of via the digest")
     
     class Config:
         json_encoders = {
@@ -129,6 +176,15 @@ class PaymentVerificationRequest(BaseModel):
     razorpay_signature: str
     submission_id: str
 
+class ResumableUploadCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str
+    image_type: str
+    total_size: int = Field(..., gt=0, description="Size of the whole file in bytes")
+
+class ResumableUploadFinish(BaseModel):
+    sha256: str = Field(..., pattern=r'^[0-9a-fA-F]{64}$', description="SHA-256 of the whole file, hex encoded")
+
 class VirtualFittingRequest(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     customer_info: CustomerInfo
@@ -166,6 +222,7 @@ async def submit_measurements(submission: TailoringSubmission):
     """Submit customer measurements for tailoring"""
     try:
         # Store in MongoDB
+        tracer.set_attribute("submission_id", submission.id)
         submission_dict = submission.dict()
         result = await db.measurements.insert_one(submission_dict)
         
@@ -174,6 +231,7 @@ async def submit_measurements(submission: TailoringSubmission):
                 status_code=500,
                 detail="Failed to store measurement data"
             )
+        await business_counters.record("submitted", pending_delta=1)
         
         logger.info(f"Measurements submitted for customer: {submission.customer_info.email}")
         
@@ -192,12 +250,32 @@ async def submit_measurements(submission: TailoringSubmission):
             detail="Internal server error occurred"
         )
 
+@api_router.get("/virtual-fitting/availability")
+async def get_fitting_availability(date: str):
+    """Open fitting slots for a date (YYYY-MM-DD)"""
+    return fitting_scheduler.availability(date)
+
 @api_router.post("/virtual-fitting", response_model=Dict[str, Any])
 async def book_virtual_fitting(request: VirtualFittingRequest):
     """Book a virtual fitting consultation"""
+    slot = None
     try:
-        # Store in MongoDB
         request_dict = request.dict()
+        
+        # Requests without a date and time stay unscheduled for staff to follow up
+        if request.preferred_date and request.preferred_time:
+            try:
+                slot = await fitting_scheduler.book(request.preferred_date, request.preferred_time)
+            except SlotUnavailableError as e:
+                raise HTTPException(
+                    status_code=409,
+                    detail=str(e)
+                )
+            request_dict["slot_id"] = slot["slot_id"]
+            request_dict["stylist"] = slot["stylist"]
+            request_dict["status"] = "scheduled"
+        
+        # Store in MongoDB
         result = await db.virtual_fittings.insert_one(request_dict)
         
         if not result.inserted_id:
@@ -205,6 +283,7 @@ async def book_virtual_fitting(request: VirtualFittingRequest):
                 status_code=500,
                 detail="Failed to book virtual fitting"
             )
+        await business_counters.record("fitting_booked")
         
         logger.info(f"Virtual fitting booked for customer: {request.customer_info.email}")
         
@@ -212,22 +291,34 @@ async def book_virtual_fitting(request: VirtualFittingRequest):
             "status": "success",
             "message": "Virtual fitting consultation booked successfully",
             "booking_id": request.id,
+            "slot": slot,
             "timestamp": request.created_at.isoformat(),
             "customer_email": request.customer_info.email
         }
         
+    except HTTPException as e:
+        if slot and e.status_code >= 500:
+            await fitting_scheduler.release(slot["slot_id"])
+        raise
     except Exception as e:
         logger.error(f"Error booking virtual fitting: {str(e)}")
+        if slot:
+            await fitting_scheduler.release(slot["slot_id"])
         raise HTTPException(
             status_code=500,
             detail="Internal server error occurred"
         )
 
+@api_router.post("/size-recommendation")
+async def recommend_sizes(measurements: MeasurementData):
+    """Suggest missing measurements from similar past orders and flag unusual entries"""
+    return size_recommender.recommend(measurements.dict())
+
 @api_router.get("/measurements/{submission_id}")
 async def get_measurement(submission_id: str):
     """Get measurement data by ID"""
     try:
-        measurement = await db.measurements.find_one({"id": submission_id})
+        measurement = await find_submission(submission_id)
         if not measurement:
             raise HTTPException(
                 status_code=404,
@@ -250,9 +341,10 @@ async def get_measurement(submission_id: str):
 @api_router.post("/create-payment-order")
 async def create_payment_order(request: PaymentOrderRequest):
     """Create Razorpay order for payment"""
+    tracer.set_attribute("submission_id", request.submission_id)
     try:
-        # Get the submission data
-        submission = await db.measurements.find_one({"id": request.submission_id})
+        # Get the submission data, moving it back if it was archived
+        submission = await archive_service.restore(db, request.submission_id)
         if not submission:
             raise HTTPException(
                 status_code=404,
@@ -267,16 +359,17 @@ async def create_payment_order(request: PaymentOrderRequest):
         
         try:
             # Try real Razorpay first
-            razorpay_order = razorpay_client.order.create({
-                "amount": total_amount,
-                "currency": "INR",
-                "receipt": f"order_{request.submission_id}",
-                "notes": {
-                    "submission_id": request.submission_id,
-                    "customer_email": submission["customer_info"]["email"],
-                    "quantity": str(request.quantity)
-                }
-            })
+            with track_external("razorpay", "order_create"):
+                razorpay_order = get_razorpay_client().order.create({
+                    "amount": total_amount,
+                    "currency": "INR",
+                    "receipt": f"order_{request.submission_id}",
+                    "notes": {
+                        "submission_id": request.submission_id,
+                        "customer_email": submission["customer_info"]["email"],
+                        "quantity": str(request.quantity)
+                    }
+                })
             order_id = razorpay_order["id"]
             logger.info(f"Real Razorpay order created: {order_id}")
             
@@ -319,9 +412,10 @@ async def create_payment_order(request: PaymentOrderRequest):
 @api_router.post("/verify-payment")
 async def verify_payment(request: PaymentVerificationRequest, background_tasks: BackgroundTasks):
     """Verify Razorpay payment and process order"""
+    tracer.set_attribute("submission_id", request.submission_id)
     try:
-        # Get submission data first
-        submission = await db.measurements.find_one({"id": request.submission_id})
+        # Get submission data first, moving it back if it was archived
+        submission = await archive_service.restore(db, request.submission_id)
         if not submission:
             raise HTTPException(
                 status_code=404,
@@ -349,8 +443,8 @@ async def verify_payment(request: PaymentVerificationRequest, background_tasks:
             # Mock payment verification for testing
             logger.info(f"Mock payment verification for testing: {request.razorpay_payment_id}")
         
-        # Update order status to paid
-        await db.measurements.update_one(
+        # Update order status to paid, reading the previous status for the counters
+        previous = await db.measurements.find_one_and_update(
             {"id": request.submission_id},
             {
                 "$set": {
@@ -358,14 +452,22 @@ async def verify_payment(request: PaymentVerificationRequest, background_tasks:
                     "payment_id": request.razorpay_payment_id,
                     "payment_verified_at": datetime.now(timezone.utc)
                 }
-            }
+            },
+            projection={"_id": 0, "order_status": 1, "total_amount": 1},
+            return_document=ReturnDocument.BEFORE
         )
+        if previous:
+            await business_counters.record_transition(
+                previous.get("order_status"), "paid", amount=previous.get("total_amount") or 0
+            )
         
         # Process order in background (email + sheets) - THIS IS WHERE DATA GOES TO SHEETS
         background_tasks.add_task(
             process_successful_payment,
             submission,
-            request.razorpay_payment_id
+            request.razorpay_payment_id,
+            trace_context=tracer.current_context(),
+            job_id=begin_order_processing(submission, request.razorpay_payment_id)
         )
         
         logger.info(f"Payment verified successfully for order {request.submission_id}")
@@ -387,37 +489,78 @@ async def verify_payment(request: PaymentVerificationRequest, background_tasks:
             detail="Payment verification failed"
         )
 
-async def process_successful_payment(submission_data: dict, payment_id: str):
+ORDER_PROCESSING_STEPS = ["size_index", "confirmation_email", "notify_tailors", "push_to_sheets"]
+
+def begin_order_processing(submission_data: dict, payment_id: str) -> str:
+    """Register the order's background work when it is scheduled, so a shutdown before it starts keeps it"""
+    return job_tracker.begin("order_processing", {"submission": submission_data, "payment_id": payment_id})
+
+async def process_successful_payment(submission_data: dict, payment_id: str, trace_context: Optional[TraceContext] = None,
+                                     job_id: Optional[str] = None, steps_done: Optional[List[str]] = None):
     """Background task to process successful payments"""
+    job_id = job_id or begin_order_processing(submission_data, payment_id)
+    with track_background_task("process_successful_payment"), tracer.span(
+        "background.process_successful_payment",
+        parent=trace_context,
+        submission_id=submission_data['id']
+    ):
+        await _process_successful_payment(submission_data, payment_id, job_id, set(steps_done or []))
+    # Not reached when the task is cancelled, so a cut-off job is saved at shutdown
+    job_tracker.finish(job_id)
+
+async def _process_successful_payment(submission_data: dict, payment_id: str, job_id: str, steps_done: set):
     try:
         logger.info(f"Processing successful payment for order {submission_data['id']}")
         
+        # Paid orders feed the size recommendations
+        if "size_index" not in steps_done:
+            size_recommender.add(submission_data['id'], submission_data.get('measurements'))
+            job_tracker.step_done(job_id, "size_index")
+        
         # Send confirmation email to customer
-        email_sent = await gmail_service.send_order_confirmation(submission_data)
-        if not email_sent:
-            logger.error(f"Failed to send confirmation email for order {submission_data['id']}")
+        if "confirmation_email" not in steps_done:
+            with tracer.span("background.send_order_confirmation"):
+                email_sent = await gmail_service.send_order_confirmation(submission_data)
+            job_tracker.step_done(job_id, "confirmation_email")
+            if not email_sent:
+                logger.error(f"Failed to send confirmation email for order {submission_data['id']}")
         
         # Send internal notification
-        notification_sent = await gmail_service.send_internal_notification(submission_data, payment_id)
-        if not notification_sent:
-            logger.error(f"Failed to send internal notification for order {submission_data['id']}")
+        if "notify_tailors" not in steps_done:
+            with tracer.span("background.notify_tailors"):
+                notification_sent = await notification_digest.notify(
+                    submission_data,
+                    payment_id,
+                    urgent=submission_data.get('urgent', False)
+                )
+            job_tracker.step_done(job_id, "notify_tailors")
+            if not notification_sent:
+                logger.error(f"Failed to send internal notification for order {submission_data['id']}")
         
         # Push to Google Sheets
-        sheets_updated = await sheets_service.push_order_data(submission_data, payment_id)
-        if not sheets_updated:
-            logger.error(f"Failed to update Google Sheets for order {submission_data['id']}")
+        if "push_to_sheets" not in steps_done:
+            with tracer.span("background.push_to_sheets"):
+                sheets_updated = await sheets_service.push_order_data(submission_data, payment_id)
+            job_tracker.step_done(job_id, "push_to_sheets")
+            if not sheets_updated:
+                logger.error(f"Failed to update Google Sheets for order {submission_data['id']}")
         
         logger.info(f"Order processing completed for {submission_data['id']}")
         
     except Exception as e:
         logger.error(f"Error in background order processing: {str(e)}")
 
+async def resume_order_processing(payload: Dict[str, Any], job_id: str, steps_done: List[str]):
+    """Run the remaining steps of order processing saved by a previous shutdown"""
+    job_tracker.begin("order_processing", payload, job_id, steps_done)
+    await process_successful_payment(payload["submission"], payload["payment_id"], job_id=job_id, steps_done=steps_done)
+
 @api_router.post("/test-payment-success/{submission_id}")
 async def test_payment_success(submission_id: str, background_tasks: BackgroundTasks):
     """Test endpoint to simulate successful payment (for development/testing only)"""
     try:
-        # Get submission data
-        submission = await db.measurements.find_one({"id": submission_id})
+        # Get submission data, moving it back if it was archived
+        submission = await archive_service.restore(db, submission_id)
         if not submission:
             raise HTTPException(
                 status_code=404,
@@ -427,8 +570,8 @@ async def test_payment_success(submission_id: str, background_tasks: BackgroundT
         # Generate mock payment ID
         mock_payment_id = f"pay_test_{uuid.uuid4().hex[:8]}"
         
-        # Update order status to paid
-        await db.measurements.update_one(
+        # Update order status to paid, reading the previous status for the counters
+        previous = await db.measurements.find_one_and_update(
             {"id": submission_id},
             {
                 "$set": {
@@ -436,14 +579,22 @@ async def test_payment_success(submission_id: str, background_tasks: BackgroundT
                     "payment_id": mock_payment_id,
                     "payment_verified_at": datetime.now(timezone.utc)
                 }
-            }
+            },
+            projection={"_id": 0, "order_status": 1, "total_amount": 1},
+            return_document=ReturnDocument.BEFORE
         )
+        if previous:
+            await business_counters.record_transition(
+                previous.get("order_status"), "paid", amount=previous.get("total_amount") or 0
+            )
         
         # Process order in background (THIS WILL PUSH TO SHEETS & SEND EMAILS)
         background_tasks.add_task(
             process_successful_payment,
             submission,
-            mock_payment_id
+            mock_payment_id,
+            trace_context=tracer.current_context(),
+            job_id=begin_order_processing(submission, mock_payment_id)
         )
         
         logger.info(f"TEST: Payment marked as successful for order {submission_id}")
@@ -466,28 +617,33 @@ async def test_payment_success(submission_id: str, background_tasks: BackgroundT
 @api_router.post("/payment-failed")
 async def handle_payment_failure(submission_id: str, background_tasks: BackgroundTasks):
     """Handle failed or abandoned payments"""
+    tracer.set_attribute("submission_id", submission_id)
     try:
-        # Update order status
-        await db.measurements.update_one(
+        # Update order status and read the order back in the same round trip; the
+        # previous status is kept for the counters and the update applied locally
+        failure_update = {
+            "order_status": "payment_failed",
+            "payment_failed_at": datetime.now(timezone.utc),
+            "reminder_sent_at": datetime.now(timezone.utc)
+        }
+        previous = await db.measurements.find_one_and_update(
             {"id": submission_id},
-            {
-                "$set": {
-                    "order_status": "payment_failed",
-                    "payment_failed_at": datetime.now(timezone.utc)
-                }
-            }
+            {"$set": failure_update},
+            return_document=ReturnDocument.BEFORE
         )
         
         # Optionally send reminder email
-        submission = await db.measurements.find_one({"id": submission_id})
-        if submission:
-            # Create new payment link (you can implement this)
-            payment_link = f"{os.environ.get('FRONTEND_URL', 'http://localhost:3000')}/payment/{submission_id}"
+        if previous:
+            await business_counters.record_transition(previous.get("order_status"), "payment_failed")
+            submission = {**previous, **failure_update}
+            payment_link = build_payment_link(submission_id)
             
             background_tasks.add_task(
-                gmail_service.send_payment_reminder,
+                send_payment_reminder,
                 submission,
-                payment_link
+                payment_link,
+                trace_context=tracer.current_context(),
+                job_id=job_tracker.begin("payment_reminder", {"submission": submission, "payment_link": payment_link})
             )
         
         return {"status": "Payment failure recorded"}
@@ -499,11 +655,26 @@ async def handle_payment_failure(submission_id: str, background_tasks: Backgroun
             detail="Failed to handle payment failure"
         )
 
+async def send_payment_reminder(submission_data: dict, payment_link: str, trace_context: Optional[TraceContext] = None,
+                                job_id: Optional[str] = None):
+    """Background task to send a payment reminder inside the request's trace"""
+    job_id = job_id or job_tracker.begin("payment_reminder", {"submission": submission_data, "payment_link": payment_link})
+    with tracer.span("background.send_payment_reminder", parent=trace_context, submission_id=submission_data['id']):
+        await gmail_service.send_payment_reminder(submission_data, payment_link)
+    job_tracker.finish(job_id)
+
+async def resume_payment_reminder(payload: Dict[str, Any], job_id: str, steps_done: List[str]):
+    job_tracker.begin("payment_reminder", payload, job_id, steps_done)
+    await send_payment_reminder(payload["submission"], payload["payment_link"], job_id=job_id)
+
+job_tracker.register("order_processing", resume_order_processing)
+job_tracker.register("payment_reminder", resume_payment_reminder)
+
 @api_router.get("/order-status/{submission_id}")
 async def get_order_status(submission_id: str):
     """Get order status"""
     try:
-        submission = await db.measurements.find_one({"id": submission_id})
+        submission = await find_submission(submission_id)
         if not submission:
             raise HTTPException(
                 status_code=404,
@@ -607,20 +778,291 @@ async def upload_image(file: UploadFile = File(...), image_type: str = Form(...)
             detail="Failed to upload image"
         )
 
+def upload_error_response(error: UploadError) -> JSONResponse:
+    """Protocol errors carry the server's offset so the client can resume from it"""
+    content: Dict[str, Any] = {"detail": error.detail}
+    headers = {}
+    if error.offset is not None:
+        content["offset"] = error.offset
+        headers["Upload-Offset"] = str(error.offset)
+    return JSONResponse(status_code=error.status_code, content=content, headers=headers)
+
+@api_router.post("/upload-image/resumable")
+async def create_resumable_upload(request: ResumableUploadCreate):
+    """Start a chunked upload; chunks are then sent with PATCH at the returned offset"""
+    try:
+        return upload_service.create(request.filename, request.content_type, request.image_type, request.total_size)
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        logger.error(f"Error creating resumable upload: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to start upload"
+        )
+
+@api_router.get("/upload-image/resumable/{upload_id}")
+async def get_resumable_upload(upload_id: str):
+    """Bytes received so far, used to resume after a failed chunk"""
+    try:
+        upload = upload_service.status(upload_id)
+        return JSONResponse(content=upload, headers={"Upload-Offset": str(upload["offset"])})
+    except UploadError as e:
+        return upload_error_response(e)
+
+@api_router.patch("/upload-image/resumable/{upload_id}")
+async def append_resumable_upload(upload_id: str, request: Request, upload_offset: int = Header(..., alias="Upload-Offset")):
+    """Append the raw request body at Upload-Offset"""
+    try:
+        upload = await upload_service.append(upload_id, upload_offset, request.stream())
+        return JSONResponse(content=upload, headers={"Upload-Offset": str(upload["offset"])})
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        logger.error(f"Error appending to upload {upload_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to store upload chunk"
+        )
+
+@api_router.post("/upload-image/resumable/{upload_id}/finish")
+async def finish_resumable_upload(upload_id: str, request: ResumableUploadFinish):
+    """Verify the checksum and publish the photo; returns the same shape as /upload-image"""
+    try:
+        return await upload_service.finish(upload_id, request.sha256)
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        logger.error(f"Error finishing upload {upload_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to upload image"
+        )
+
 @api_router.get("/health")
+@api_router.get("/health/live")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness: the process is up and serving requests, without checking dependencies"""
     return {
         "status": "healthy",
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "service": "Stallion & Co. API"
     }
 
+@api_router.get("/health/ready")
+async def readiness_check():
+    """Readiness: 503 unless this worker can take orders right now"""
+    report = await readiness_probe.check()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@api_router.get("/debug/event-loop", dependencies=[Depends(require_admin)])
+async def event_loop_report():
+    """Event loop lag and the stacks of recent blocking calls"""
+    return loop_monitor.report()
+
+@api_router.get("/debug/mongo-profile", dependencies=[Depends(require_admin)])
+async def mongo_profile_report():
+    """Mongo query timings, slow queries and endpoints with extra round trips"""
+    return mongo_profiler.report()
+
+@api_router.get("/debug/email-templates", dependencies=[Depends(require_admin)])
+async def email_template_report():
+    """Render counts and timings per email template in this worker"""
+    return template_engine.stats()
+
+@api_router.post("/admin/uploads/gc", dependencies=[Depends(require_admin)])
+async def collect_orphaned_uploads(dry_run: bool = True):
+    """Report uploads no submission refers to; pass dry_run=false to delete them"""
+    return await upload_gc.collect(dry_run=dry_run)
+
+SUBMISSION_SUMMARY_FIELDS = {
+    "id": 1, "created_at": 1, "order_status": 1, "customer_info.first_name": 1, "customer_info.last_name": 1,
+    "customer_info.email": 1, "product_selected": 1, "fabric_choice": 1, "quantity": 1, "total_amount": 1,
+    "payment_id": 1, "urgent": 1
+}
+
+FITTING_SUMMARY_FIELDS = {
+    "id": 1, "created_at": 1, "status": 1, "customer_info.first_name": 1, "customer_info.last_name": 1,
+    "customer_info.email": 1, "preferred_date": 1, "preferred_time": 1, "fitting_type": 1, "stylist": 1
+}
+
+def created_range_query(status_field: str, status_value: Optional[str],
+                        created_from: Optional[datetime], created_to: Optional[datetime]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if status_value:
+        query[status_field] = status_value
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+    return query
+
+@api_router.get("/admin/submissions", dependencies=[Depends(require_admin)])
+async def list_submissions(
+    order_status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
+):
+    """Newest submissions first; pass next_cursor back as cursor for the following page"""
+    try:
+        return await keyset_page(
+            read_db.measurements,
+            created_range_query("order_status", order_status, created_from, created_to),
+            SUBMISSION_SUMMARY_FIELDS,
+            limit,
+            cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+@api_router.get("/admin/fittings", dependencies=[Depends(require_admin)])
+async def list_fittings(
+    fitting_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
+):
+    """Newest fitting bookings first; pass next_cursor back as cursor for the following page"""
+    try:
+        return await keyset_page(
+            read_db.virtual_fittings,
+            created_range_query("status", fitting_status, created_from, created_to),
+            FITTING_SUMMARY_FIELDS,
+            limit,
+            cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+@api_router.get("/admin/dashboard", dependencies=[Depends(require_admin)])
+async def business_dashboard(days: int = Query(7, ge=1, le=90)):
+    """Order, revenue and booking counts from the precomputed day and hour buckets"""
+    return await business_counters.dashboard(days)
+
+@api_router.get("/admin/analytics/measurements", dependencies=[Depends(require_admin)])
+async def measurement_analytics_report():
+    """Measurement distributions, percentiles by body type and fabric mix of paid orders"""
+    return await measurement_analytics.report()
+
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus metrics for requests, background tasks and outside calls"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.middleware("http")
+async def limit_expensive_requests(request: Request, call_next):
+    """Reject over-limit clients with 429 before the request body is read"""
+    if job_tracker.draining:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server is shutting down, please retry"},
+            headers={"Retry-After": "1", "Connection": "close"}
+        )
+    
+    limit = admission_control.limit_for(request.method, request.url.path) if admission_control.enabled else None
+    if limit is None:
+        return await call_next(request)
+    
+    limit_name, rate_limited = limit
+    if rate_limited:
+        client_ip = admission_control.client_ip(request.headers, request.client.host if request.client else None)
+        retry_after = admission_control.check(limit_name, client_ip, request.headers.get("x-session-id"))
+        if retry_after > 0:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests, please retry later"},
+                headers={"Retry-After": admission_control.retry_after_header(retry_after)}
+            )
+    
+    if limit_name != "upload":
+        return await call_next(request)
+    
+    if not admission_control.upload_slots.try_acquire():
+        rate_limited_requests_total.inc(limit="upload", reason="concurrency")
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too many uploads in progress, please retry shortly"},
+            headers={"Retry-After": "1"}
+        )
+    try:
+        return await call_next(request)
+    finally:
+        admission_control.upload_slots.release()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    http_requests_in_flight.inc()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        http_requests_in_flight.dec()
+        # Label by route template, not raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        limit = admission_control.limit_for(request.method, request.url.path) if status_code == 429 else None
+        if route is not None:
+            route_path = route.path
+        elif limit is not None:
+            # Admission control answers before routing, so label the rejection with its limit
+            route_path = f"rate_limit:{limit[0]}"
+        elif request.url.path.startswith("/uploads/"):
+            route_path = "/uploads"
+        else:
+            route_path = "unmatched"
+        http_request_duration_seconds.observe(
+            time.perf_counter() - started, method=request.method, route=route_path
+        )
+        http_requests_total.inc(method=request.method, route=route_path, status=str(status_code))
+
+@app.middleware("http")
+async def profile_mongo_commands(request: Request, call_next):
+    with mongo_profiler.request() as profile:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if profile is not None and route is not None:
+            profile["route"] = f"{request.method} {route.path}"
+        return response
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    try:
+        with tracer.span(
+            f"{request.method} {request.url.path}",
+            parent=parse_traceparent(request.headers.get("traceparent")),
+            http_method=request.method
+        ) as span:
+            response = await call_next(request)
+            route = request.scope.get("route")
+            if route is not None:
+                span.name = f"{request.method} {route.path}"
+            span.set_attribute("http_status", response.status_code)
+            response.headers["X-Trace-Id"] = span.trace_id
+            response.headers["X-Request-Id"] = request_id
+            return response
+    finally:
+        request_id_var.reset(token)
+
 # Serve uploaded files
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 # CORS middleware
 app.add_middleware(
@@ -631,6 +1073,101 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup_db_client():
+    global client, db, read_db
+    # The log writer thread is started here so every worker, pre-forked or not, has its own
+    log_pipeline.start()
+    # Created after the worker process starts so pre-forked workers never share sockets
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], event_listeners=[
+        mongo_command_listener(),
+        mongo_pool_listener(),
+        mongo_trace_listener(),
+        mongo_profiler_listener()
+    ], **mongo_settings.client_options())
+    db = client[os.environ['DB_NAME']]
+    read_db = mongo_settings.read_db(db)
+
+async def find_submission(submission_id: str) -> Optional[dict]:
+    """Read-only submission lookup; falls back to the primary if a lagging secondary has not seen it yet"""
+    submission = await archive_service.find(read_db, submission_id)
+    if submission is None and read_db is not db:
+        submission = await archive_service.find(db, submission_id)
+    return submission
+
+async def ensure_indexes():
+    """Create the indexes every order and fitting lookup relies on"""
+    try:
+        await db.measurements.create_index([("id", ASCENDING)], unique=True, name="id_unique")
+        await db.virtual_fittings.create_index([("id", ASCENDING)], unique=True, name="id_unique")
+        # Keyset pagination for the admin lists, with and without a status filter
+        await db.measurements.create_index([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id")
+        await db.measurements.create_index(
+            [("order_status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="order_status_created_at_id"
+        )
+        await db.virtual_fittings.create_index([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id")
+        await db.virtual_fittings.create_index(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="status_created_at_id"
+        )
+        await reminder_service.ensure_indexes(db)
+        await archive_service.ensure_indexes(db)
+        await fitting_scheduler.ensure_indexes(db)
+        await measurement_analytics.ensure_indexes(db)
+        await job_tracker.ensure_indexes(db)
+        readiness_probe.mark_indexes(True)
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
+        readiness_probe.mark_indexes(False)
+
+@app.on_event("startup")
+async def start_background_jobs():
+    loop_monitor.start()
+    template_engine.load()
+    readiness_probe.start(db, ensure_indexes)
+    startup_warmup.start(db, get_razorpay_client)
+    await ensure_indexes()
+    mongo_profiler.start(db)
+    business_counters.start(db)
+    reminder_service.start(db)
+    notification_digest.start()
+    upload_service.start()
+    upload_gc.start(db)
+    archive_service.start(db)
+    fitting_scheduler.start(db)
+    size_recommender.start(db)
+    measurement_analytics.start(db)
+    # Work cut off by the previous shutdown or a crashed worker, leased so only one worker runs it
+    await job_tracker.resume(db)
+    job_tracker.start(db)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    # Let running order jobs finish while email, Sheets and MongoDB are still up
+    await job_tracker.drain()
+    await job_tracker.stop()
+    await startup_warmup.stop()
+    await loop_monitor.stop()
+    await mongo_profiler.stop()
+    await reminder_service.stop()
+    await notification_digest.stop()
+    # Save cut-off jobs and digest orders that could not be sent, to run on the next start
+    unsent_notifications = [{
+        "kind": "order_processing",
+        "payload": {"submission": order_data, "payment_id": payment_id},
+        "steps_done": [step for step in ORDER_PROCESSING_STEPS if step != "notify_tailors"]
+    } for order_data, payment_id in notification_digest.take_pending()]
+    if db is not None:
+        await job_tracker.persist(db, unsent_notifications)
+    await upload_service.stop()
+    await upload_gc.stop()
+    await archive_service.stop()
+    await fitting_scheduler.stop()
+    await size_recommender.stop()
+    await measurement_analytics.stop()
+    await gmail_service.close()
+    if client is not None:
+        client.close()
+    tracer.shutdown()
+    log_pipeline.shutdown()
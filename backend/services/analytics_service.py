@@ -0,0 +1,212 @@
+import os
+import re
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from services.size_recommender import FIELDS, to_vector
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (10, 25, 50, 75, 90)
+ALL_BODY_TYPES = "_all"
+
+
+def rollup_key(value: Optional[str]) -> str:
+    """Free text made safe to use as a MongoDB field name"""
+    key = re.sub(r"[.$\s]+", "_", (value or "").strip().lower())[:40]
+    return key or "unspecified"
+
+
+def histogram_percentiles(histogram: Dict[str, int]) -> Dict[str, Any]:
+    """Percentiles from a histogram of 1 unit wide bins, interpolated inside the bin"""
+    import numpy as np
+
+    if not histogram:
+        return {"count": 0}
+    bins = np.array(sorted(int(key) for key in histogram), dtype=np.float64)
+    counts = np.array([histogram[str(int(key))] for key in bins], dtype=np.float64)
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1]
+    result: Dict[str, Any] = {"count": int(total)}
+    for pct in PERCENTILES:
+        target = total * pct / 100
+        index = int(np.searchsorted(cumulative, target))
+        before = cumulative[index - 1] if index else 0.0
+        result[f"p{pct}"] = round(float(bins[index] + (target - before) / counts[index]), 1)
+    return result
+
+
+class MeasurementAnalytics:
+    """Measurement histograms, percentiles by body type and fabric mix for paid orders.
+
+    A scheduled job folds newly paid orders into one materialized document in
+    analytics_rollups: 1 cm (or kg) histogram counts per field and body type, fabric counts
+    and a watermark on (payment_verified_at, id). Each batch is applied with $inc only if the
+    watermark is still the one the batch started from, so workers running the job at the same
+    time never count an order twice. Batches are paced so the job does not compete with
+    checkout traffic. Percentiles are derived from the histograms when the report is read.
+
+    The watermark only moves past orders paid more than ANALYTICS_SETTLE_SECONDS ago, and the
+    orders are read from the primary. An order whose write lands late, because its app host
+    clock is behind or its commit was slow, still has a timestamp ahead of the watermark when
+    it becomes visible, so it is never skipped.
+    """
+
+    ROLLUP_ID = "measurement_distributions"
+
+    def __init__(self):
+        self.enabled = os.getenv('ANALYTICS_ENABLED', 'true').lower() == 'true'
+        self.interval = int(os.getenv('ANALYTICS_INTERVAL_SECONDS', '3600'))
+        self.batch_size = int(os.getenv('ANALYTICS_BATCH_SIZE', '1000'))
+        self.batch_pause = float(os.getenv('ANALYTICS_BATCH_PAUSE_SECONDS', '1'))
+        self.settle_seconds = int(os.getenv('ANALYTICS_SETTLE_SECONDS', '300'))
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self, db) -> None:
+        """Create the index backing the watermark range query"""
+        await db.measurements.create_index(
+            [("order_status", ASCENDING), ("payment_verified_at", ASCENDING), ("id", ASCENDING)],
+            name="order_status_payment_verified_at_id"
+        )
+
+    def start(self, db) -> None:
+        """Start the background rollup loop"""
+        self._db = db
+        if not self.enabled:
+            logger.info("Measurement analytics disabled")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                with tracer.span("background.analytics_rollup"):
+                    await self.update()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Measurement analytics rollup failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def update(self) -> int:
+        """Fold every order paid since the watermark into the rollup, returns the number added"""
+        rollups = self._db.analytics_rollups
+        # A secondary may not have an order yet when the watermark passes its timestamp
+        source = self._db.measurements
+        settled_before = datetime.now(timezone.utc) - timedelta(seconds=self.settle_seconds)
+        added = 0
+        while True:
+            rollup = await rollups.find_one({"_id": self.ROLLUP_ID}, projection={"watermark": 1})
+            watermark = rollup.get("watermark") if rollup else None
+
+            query: Dict[str, Any] = {"order_status": "paid", "payment_verified_at": {"$ne": None, "$lte": settled_before}}
+            if watermark:
+                query["$or"] = [
+                    {"payment_verified_at": {"$gt": watermark["at"]}},
+                    {"payment_verified_at": watermark["at"], "id": {"$gt": watermark["id"]}}
+                ]
+            batch = await source.find(
+                query,
+                projection={"_id": 0, "id": 1, "payment_verified_at": 1, "measurements": 1,
+                            "customer_info.body_type": 1, "fabric_choice": 1}
+            ).sort([("payment_verified_at", ASCENDING), ("id", ASCENDING)]).limit(self.batch_size).to_list(self.batch_size)
+            if not batch:
+                break
+
+            last = batch[-1]
+            new_watermark = {"at": last["payment_verified_at"], "id": last["id"]}
+            update = {
+                "$inc": self._increments(batch),
+                "$set": {"watermark": new_watermark, "updated_at": datetime.now(timezone.utc)}
+            }
+            try:
+                # Compare-and-set on the watermark: if another worker moved it, re-read and continue from there
+                result = await rollups.update_one(
+                    {"_id": self.ROLLUP_ID, "watermark": watermark}, update, upsert=watermark is None
+                )
+            except DuplicateKeyError:
+                continue
+            if result.matched_count or result.upserted_id is not None:
+                added += len(batch)
+
+            if len(batch) < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+
+        if added:
+            logger.info(f"Measurement analytics added {added} paid orders")
+        return added
+
+    @staticmethod
+    def _increments(batch: List[Dict[str, Any]]) -> Dict[str, int]:
+        import numpy as np
+
+        increments: Counter = Counter()
+        increments["orders"] = len(batch)
+
+        matrix = np.vstack([to_vector(doc.get("measurements") or {}) for doc in batch])
+        body_keys = [rollup_key((doc.get("customer_info") or {}).get("body_type")) for doc in batch]
+        body_names, body_index = np.unique(np.array(body_keys), return_inverse=True)
+
+        for column, field in enumerate(FIELDS):
+            values = matrix[:, column]
+            present = ~np.isnan(values)
+            if not present.any():
+                continue
+            bins = np.floor(values[present]).astype(np.int64)
+            bodies = body_index[present]
+            # Count (body type, bin) pairs in one pass
+            pairs, counts = np.unique(np.stack([bodies, bins], axis=1), axis=0, return_counts=True)
+            for (body, bin_start), count in zip(pairs, counts):
+                increments[f"histograms.{field}.{body_names[body]}.{bin_start}"] += int(count)
+            all_bins, all_counts = np.unique(bins, return_counts=True)
+            for bin_start, count in zip(all_bins, all_counts):
+                increments[f"histograms.{field}.{ALL_BODY_TYPES}.{bin_start}"] += int(count)
+
+        for doc in batch:
+            increments[f"fabric_mix.{rollup_key(doc.get('fabric_choice'))}"] += 1
+        return dict(increments)
+
+    async def report(self) -> Dict[str, Any]:
+        """Histograms, percentiles by body type and fabric mix from the materialized rollup"""
+        rollup = await self._db.analytics_rollups.find_one({"_id": self.ROLLUP_ID}) or {}
+        histograms = rollup.get("histograms", {})
+        percentiles = {
+            field: {body: histogram_percentiles(histogram) for body, histogram in by_body.items()}
+            for field, by_body in histograms.items()
+        }
+        fabric_mix = rollup.get("fabric_mix", {})
+        total_fabric = sum(fabric_mix.values()) or 1
+        watermark = rollup.get("watermark")
+        return {
+            "orders": rollup.get("orders", 0),
+            "updated_at": rollup.get("updated_at"),
+            "watermark": watermark["at"] if watermark else None,
+            "units": {"height": "cm", "weight": "kg", "other": "cm"},
+            "histograms": {field: by_body.get(ALL_BODY_TYPES, {}) for field, by_body in histograms.items()},
+            "percentiles": percentiles,
+            "fabric_mix": {
+                fabric: {"orders": count, "share": round(count / total_fabric, 3)}
+                for fabric, count in sorted(fabric_mix.items(), key=lambda item: -item[1])
+            }
+        }
+
+
+# Create singleton instance
+measurement_analytics = MeasurementAnalytics()
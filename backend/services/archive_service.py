@@ -0,0 +1,205 @@
+import os
+import gzip
+import asyncio
+import logging
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from bson import json_util
+from pymongo import ASCENDING, ReplaceOne
+from pymongo.errors import DuplicateKeyError
+from services.tracing import tracer
+from services.counters_service import business_counters
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveService:
+    """Moves cold submissions out of db.measurements so the hot collection stays small.
+
+    Unpaid submissions (pending_payment, payment_failed) older than ARCHIVE_UNPAID_AFTER_DAYS and
+    completed orders older than ARCHIVE_COMPLETED_AFTER_DAYS are moved in batches, oldest first.
+    With ARCHIVE_BACKEND=collection the full documents go to measurements_archive. With
+    ARCHIVE_BACKEND=ndjson they are appended to gzip NDJSON files in ARCHIVE_DIR and
+    measurements_archive keeps a small pointer per order (id, file, status, images), which
+    lookups and the upload garbage collector use.
+
+    Paying for an archived order (for example from a reminder link) first moves it back with
+    `restore`. A restored order is left alone by the unpaid rules for ARCHIVE_UNPAID_AFTER_DAYS.
+    """
+
+    collection_name = "measurements_archive"
+
+    def __init__(self):
+        self.enabled = os.getenv('ARCHIVE_ENABLED', 'true').lower() == 'true'
+        self.backend = os.getenv('ARCHIVE_BACKEND', 'collection').lower()
+        self.archive_dir = Path(os.getenv('ARCHIVE_DIR', 'archive'))
+        self.interval = int(os.getenv('ARCHIVE_INTERVAL_SECONDS', '86400'))
+        self.batch_size = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+        self.batch_pause = float(os.getenv('ARCHIVE_BATCH_PAUSE_SECONDS', '0.5'))
+        self.unpaid_statuses = os.getenv('ARCHIVE_UNPAID_STATUSES', 'pending_payment,payment_failed').split(',')
+        self.unpaid_after = timedelta(days=int(os.getenv('ARCHIVE_UNPAID_AFTER_DAYS', '30')))
+        self.completed_statuses = os.getenv('ARCHIVE_COMPLETED_STATUSES', 'paid,delivered').split(',')
+        self.completed_after = timedelta(days=int(os.getenv('ARCHIVE_COMPLETED_AFTER_DAYS', '365')))
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self, db) -> None:
+        await db[self.collection_name].create_index([("id", ASCENDING)], unique=True, name="id_unique")
+
+    def start(self, db) -> None:
+        """Start the background archive loop"""
+        self._db = db
+        if not self.enabled:
+            logger.info("Submission archiver disabled")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Submission archiver started (every {self.interval}s, backend {self.backend})")
+
+    async def stop(self) -> None:
+        """Cancel the background archive loop"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                with tracer.span("background.archive"):
+                    await self.archive_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Submission archiving failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def _rules(self, now: datetime) -> List[Tuple[str, Dict[str, Any]]]:
+        # One rule per unpaid status, so archived pending checkouts can be taken off the pending gauge
+        rules = [
+            (status, {
+                "order_status": status,
+                "created_at": {"$lt": now - self.unpaid_after},
+                # A checkout resumed from the archive is not moved out again while it is being paid
+                "$or": [{"restored_at": None}, {"restored_at": {"$lt": now - self.unpaid_after}}]
+            })
+            for status in self.unpaid_statuses
+        ]
+        rules.append(
+            ("completed", {"order_status": {"$in": self.completed_statuses}, "created_at": {"$lt": now - self.completed_after}})
+        )
+        return rules
+
+    async def archive_once(self) -> Dict[str, int]:
+        """Archive every submission currently matching a rule, returns the count moved per rule"""
+        now = datetime.now(timezone.utc)
+        moved: Dict[str, int] = {}
+        archive_file = self.archive_dir / f"measurements-{now.strftime('%Y%m%dT%H%M%S')}.ndjson.gz"
+        for name, query in self._rules(now):
+            moved[name] = 0
+            while True:
+                # Uses the (order_status, created_at) index
+                batch = await self._db.measurements.find(query).sort("created_at", ASCENDING).to_list(self.batch_size)
+                if not batch:
+                    break
+                count = await self._move(batch, query, archive_file)
+                moved[name] += count
+                if name == "pending_payment":
+                    await business_counters.adjust_pending(-count)
+                if len(batch) < self.batch_size:
+                    break
+                await asyncio.sleep(self.batch_pause)
+        if any(moved.values()):
+            logger.info(f"Archived submissions: {moved}")
+        return moved
+
+    def _write_ndjson(self, path: Path, documents: List[Dict[str, Any]]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Appending adds a gzip member per batch; readers see one continuous stream
+        with gzip.open(path, "at", encoding="utf-8") as archive:
+            for document in documents:
+                archive.write(json_util.dumps(document) + "\n")
+
+    async def _move(self, batch: List[Dict[str, Any]], query: Dict[str, Any], archive_file: Path) -> int:
+        archive = self._db[self.collection_name]
+        now = datetime.now(timezone.utc)
+        if self.backend == "ndjson":
+            await asyncio.to_thread(self._write_ndjson, archive_file, batch)
+            records = [{
+                "id": doc["id"],
+                "archive_file": archive_file.name,
+                "order_status": doc.get("order_status"),
+                "created_at": doc.get("created_at"),
+                "images": doc.get("images"),
+                "archived_at": now
+            } for doc in batch]
+        else:
+            records = [{**doc, "archived_at": now} for doc in batch]
+
+        # Upserts keep a retried batch from failing on documents copied last time
+        await archive.bulk_write([ReplaceOne({"id": record["id"]}, record, upsert=True) for record in records], ordered=False)
+
+        ids = [doc["id"] for doc in batch]
+        # Re-check the rule so an order paid after it was read stays in the hot collection
+        result = await self._db.measurements.delete_many({"id": {"$in": ids}, **query})
+        if result.deleted_count < len(ids):
+            still_hot = [doc["id"] async for doc in self._db.measurements.find({"id": {"$in": ids}}, {"_id": 0, "id": 1})]
+            if still_hot:
+                await archive.delete_many({"id": {"$in": still_hot}})
+        return result.deleted_count
+
+    def _read_ndjson(self, filename: str, submission_id: str) -> Optional[Dict[str, Any]]:
+        path = self.archive_dir / Path(filename).name
+        if not path.exists():
+            return None
+        marker = f'"id": "{submission_id}"'
+        with gzip.open(path, "rt", encoding="utf-8") as archive:
+            for line in archive:
+                if marker in line:
+                    document = json_util.loads(line)
+                    if document.get("id") == submission_id:
+                        return document
+        return None
+
+    async def find(self, db, submission_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a submission in the hot collection, falling back to the archive"""
+        submission = await db.measurements.find_one({"id": submission_id})
+        if submission:
+            return submission
+        archived = await db[self.collection_name].find_one({"id": submission_id})
+        if not archived:
+            return None
+        if "archive_file" in archived:
+            archived = await asyncio.to_thread(self._read_ndjson, archived["archive_file"], submission_id)
+        return archived
+
+    async def restore(self, db, submission_id: str) -> Optional[Dict[str, Any]]:
+        """The submission from the hot collection, moving it back from the archive first if needed"""
+        submission = await db.measurements.find_one({"id": submission_id})
+        if submission:
+            return submission
+        archived = await self.find(db, submission_id)
+        if not archived:
+            return None
+
+        restored = {key: value for key, value in archived.items() if key not in ("_id", "archived_at")}
+        restored["restored_at"] = datetime.now(timezone.utc)
+        try:
+            result = await db.measurements.replace_one({"id": submission_id}, restored, upsert=True)
+        except DuplicateKeyError:
+            # Another request restored it at the same moment
+            return await db.measurements.find_one({"id": submission_id})
+        await db[self.collection_name].delete_one({"id": submission_id})
+        if result.upserted_id is not None:
+            if restored.get("order_status") == "pending_payment":
+                await business_counters.adjust_pending(1)
+            logger.info(f"Restored submission {submission_id} from the archive")
+        return await db.measurements.find_one({"id": submission_id})
+
+
+# Create singleton instance
+archive_service = ArchiveService()
@@ -0,0 +1,102 @@
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from zoneinfo import ZoneInfo
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+EVENTS = ("submitted", "paid", "payment_failed", "fitting_booked")
+
+
+class BusinessCounters:
+    """Order and booking counters kept up with $inc as each state change happens.
+
+    Every event increments a day bucket and an hour bucket in db.counters (in one bulk
+    write), and transitions in and out of pending_payment move a single pending checkouts
+    gauge. The dashboard reads buckets only, so its cost depends on the time range asked
+    for, not on the number of orders.
+    """
+
+    GAUGE_ID = "gauge:pending_checkouts"
+
+    def __init__(self):
+        self.timezone = ZoneInfo(os.getenv('COUNTERS_TIMEZONE', 'Asia/Kolkata'))
+        self._db = None
+
+    def start(self, db) -> None:
+        self._db = db
+
+    def _bucket_ids(self, at: datetime):
+        local = at.astimezone(self.timezone)
+        return f"day:{local.strftime('%Y-%m-%d')}", f"hour:{local.strftime('%Y-%m-%dT%H')}"
+
+    async def record(self, event: str, amount: int = 0, pending_delta: int = 0) -> bool:
+        """Count one event; failures are logged so they never break the order flow"""
+        try:
+            day_id, hour_id = self._bucket_ids(datetime.now(timezone.utc))
+            increments: Dict[str, int] = {event: 1}
+            if amount:
+                increments["revenue_paise"] = amount
+            operations = [
+                UpdateOne({"_id": day_id}, {"$inc": increments, "$setOnInsert": {"period": "day"}}, upsert=True),
+                UpdateOne({"_id": hour_id}, {"$inc": increments, "$setOnInsert": {"period": "hour"}}, upsert=True),
+            ]
+            if pending_delta:
+                operations.append(UpdateOne({"_id": self.GAUGE_ID}, {"$inc": {"value": pending_delta}}, upsert=True))
+            await self._db.counters.bulk_write(operations, ordered=False)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to record {event} counter: {str(e)}")
+            return False
+
+    async def record_transition(self, previous_status: Optional[str], new_status: str, amount: int = 0) -> bool:
+        """Count an order status change, moving the pending gauge when it leaves pending_payment"""
+        if previous_status == new_status:
+            return True
+        pending_delta = -1 if previous_status == "pending_payment" else 0
+        return await self.record(new_status, amount=amount if new_status == "paid" else 0, pending_delta=pending_delta)
+
+    async def adjust_pending(self, delta: int) -> None:
+        """Move the pending gauge for orders that leave the hot collection, e.g. when archived"""
+        if delta:
+            await self._db.counters.update_one({"_id": self.GAUGE_ID}, {"$inc": {"value": delta}}, upsert=True)
+
+    @staticmethod
+    def _totals(buckets: List[Dict[str, Any]]) -> Dict[str, int]:
+        totals = {event: 0 for event in EVENTS}
+        totals["revenue_paise"] = 0
+        for bucket in buckets:
+            for key in totals:
+                totals[key] += bucket.get(key, 0)
+        return totals
+
+    async def dashboard(self, days: int = 7) -> Dict[str, Any]:
+        """Today, the last `days` days and today's hours, read straight from the buckets"""
+        now = datetime.now(timezone.utc).astimezone(self.timezone)
+        day_ids = [f"day:{(now - timedelta(days=offset)).strftime('%Y-%m-%d')}" for offset in range(days)]
+        hour_ids = [f"hour:{now.strftime('%Y-%m-%d')}T{hour:02d}" for hour in range(now.hour + 1)]
+
+        found = {
+            doc["_id"]: doc
+            async for doc in self._db.counters.find({"_id": {"$in": day_ids + hour_ids + [self.GAUGE_ID]}})
+        }
+
+        def bucket(bucket_id: str, label: str) -> Dict[str, Any]:
+            counts = self._totals([found.get(bucket_id, {})])
+            return {label: bucket_id.split(":", 1)[1], **counts}
+
+        daily = [bucket(day_id, "date") for day_id in reversed(day_ids)]
+        return {
+            "timezone": str(self.timezone),
+            "pending_checkouts": max(0, found.get(self.GAUGE_ID, {}).get("value", 0)),
+            "today": self._totals([found.get(day_ids[0], {})]),
+            "period": self._totals([found.get(day_id, {}) for day_id in day_ids]),
+            "days": daily,
+            "hours_today": [bucket(hour_id, "hour") for hour_id in hour_ids]
+        }
+
+
+# Create singleton instance
+business_counters = BusinessCounters()
@@ -0,0 +1,99 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Any, List, Tuple, Optional
+from services.gmail_service import gmail_service
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDigest:
+    """Collects paid orders and sends the tailors one combined notification per time window"""
+
+    def __init__(self):
+        self.enabled = os.getenv('NOTIFICATION_DIGEST_ENABLED', 'false').lower() == 'true'
+        self.window = int(os.getenv('NOTIFICATION_DIGEST_WINDOW_SECONDS', '900'))
+        self.max_orders = int(os.getenv('NOTIFICATION_DIGEST_MAX_ORDERS', '50'))
+        self._pending: List[Tuple[Dict[str, Any], str]] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        """Start the periodic digest flush loop"""
+        if not self.enabled:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Order notification digest enabled (window {self.window}s, max {self.max_orders} orders)")
+
+    async def stop(self) -> None:
+        """Stop the flush loop and send whatever is still queued"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        while self._pending:
+            if not await self.flush():
+                break
+
+    def take_pending(self) -> List[Tuple[Dict[str, Any], str]]:
+        """Remove and return queued orders, e.g. to save them when a shutdown could not send them"""
+        pending, self._pending = self._pending, []
+        return pending
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.window)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Order digest flush failed: {str(e)}")
+
+    async def notify(self, order_data: Dict[str, Any], payment_id: str, urgent: bool = False) -> bool:
+        """Queue an order for the next digest, or notify immediately when urgent or digests are off"""
+        if not self.enabled or urgent:
+            return await gmail_service.send_internal_notification(order_data, payment_id)
+
+        async with self._lock:
+            self._pending.append((order_data, payment_id))
+            digest_full = len(self._pending) >= self.max_orders
+
+        logger.info(f"Order {order_data['id']} queued for notification digest")
+        if digest_full:
+            return await self.flush()
+        return True
+
+    async def flush(self) -> bool:
+        """Send one digest with up to max_orders queued orders"""
+        async with self._lock:
+            batch = self._pending[:self.max_orders]
+            self._pending = self._pending[self.max_orders:]
+
+        if not batch:
+            return True
+
+        if len(batch) == 1:
+            digest_sent = await gmail_service.send_internal_notification(*batch[0])
+        else:
+            digest_sent = await gmail_service.send_order_digest(batch)
+
+        if not digest_sent:
+            # Put the orders back at the front so the next window retries them
+            async with self._lock:
+                self._pending = batch + self._pending
+            logger.error(f"Failed to send order digest for {len(batch)} orders")
+            return False
+
+        logger.info(f"Order digest sent for {len(batch)} orders")
+        return True
+
+
+# Create singleton instance
+notification_digest = NotificationDigest()
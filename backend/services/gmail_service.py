@@ -1,212 +1,181 @@
 import os
-import base64
-import json
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from typing import Dict, Any
+import html
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import make_msgid
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 from datetime import datetime
+from services.template_service import template_engine
+from services.mail_transport import create_transport
+from services.metrics import track_external
 
 logger = logging.getLogger(__name__)
 
 class GmailService:
     def __init__(self):
-        self.client_id = os.getenv('GMAIL_CLIENT_ID')
-        self.client_secret = os.getenv('GMAIL_CLIENT_SECRET')
-        self.redirect_uri = os.getenv('GMAIL_REDIRECT_URI')
-        self.refresh_token = os.getenv('GMAIL_REFRESH_TOKEN')
-        self.enabled = all([self.client_id, self.client_secret, self.refresh_token])
+        self.transport = create_transport()
+        self.enabled = self.transport.enabled
         
         if not self.enabled:
-            logger.warning("Gmail OAuth credentials not configured. Email functionality will be mocked.")
+            logger.warning("Email transport not configured. Email functionality will be mocked.")
         else:
-            logger.info("Gmail service enabled with OAuth credentials")
+            logger.info(f"Email service enabled with {self.transport.name} transport")
     
-    def _get_credentials(self):
-        """Get authenticated Gmail credentials"""
-        creds = Credentials(
-            token=None,
-            refresh_token=self.refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=self.client_id,
-            client_secret=self.client_secret
-        )
-        return creds
+    def _build_message(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> EmailMessage:
+        """Assemble a plain text or multipart/alternative message"""
+        message = EmailMessage(policy=SMTP)
+        message['To'] = to_email
+        message['From'] = os.getenv('COMPANY_EMAIL', 'orders@stallionandco.com')
+        message['Subject'] = subject
+        message['Message-ID'] = make_msgid(domain='stallionandco.com')
+        message.set_content(body)
+        if html_body is not None:
+            message.add_alternative(html_body, subtype='html')
+        return message
     
-    async def send_email(self, to_email: str, subject: str, body: str, is_html: bool = False) -> bool:
-        """Send email using Gmail API"""
+    async def send_email(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> bool:
+        """Send email using the configured transport"""
         if not self.enabled:
-            logger.warning(f"Gmail not configured. Would send email to {to_email} with subject: {subject}")
+            logger.warning(f"Email not configured. Would send email to {to_email} with subject: {subject}")
             return True  # Return True for development/testing
             
         try:
-            creds = self._get_credentials()
-            service = build('gmail', 'v1', credentials=creds)
+            message = self._build_message(to_email, subject, body, html_body)
+            with track_external(self.transport.name, "send"):
+                message_id = await self.transport.send(message)
             
-            message = MIMEMultipart()
-            message['to'] = to_email
-            message['from'] = os.getenv('COMPANY_EMAIL', 'orders@stallionandco.com')
-            message['subject'] = subject
-            
-            if is_html:
-                message.attach(MIMEText(body, 'html'))
-            else:
-                message.attach(MIMEText(body, 'plain'))
-            
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-            
-            send_message = service.users().messages().send(
-                userId='me',
-                body={'raw': raw_message}
-            ).execute()
-            
-            logger.info(f"Email sent successfully to {to_email}. Message ID: {send_message['id']}")
+            logger.info(f"Email sent successfully to {to_email}. Message ID: {message_id}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    async def warm_up(self) -> bool:
+        """Fetch credentials and open transport connections before the first email"""
+        if not self.enabled:
+            return False
+        with track_external(self.transport.name, "warm_up"):
+            await self.transport.warm_up()
+        return True
+    
+    async def close(self) -> None:
+        """Close pooled transport connections"""
+        await self.transport.close()
+    
+    async def send_template(self, to_email: str, template_name: str, context: Dict[str, Any]) -> bool:
+        """Render a template and send its text and HTML parts"""
+        rendered = template_engine.render(template_name, context)
+        return await self.send_email(to_email, rendered.subject, rendered.text, rendered.html)
+    
+    @staticmethod
+    def _display(value: Any, default: str) -> Any:
+        return default if value is None or value == '' else value
+    
+    def _order_context(self, order_data: Dict[str, Any], payment_id: Optional[str] = None) -> Dict[str, Any]:
+        """Template variables shared by every order email"""
+        customer_info = order_data['customer_info']
+        measurements = order_data['measurements']
+        unit = measurements.get('unit', 'cm')
+        measurement_rows = [
+            (key.replace('_', ' ').title(), f"{value} {unit}")
+            for key, value in measurements.items()
+            if key not in ['unit'] and value is not None
+        ]
+        
+        return {
+            "order_id": order_data['id'],
+            "payment_id": payment_id or order_data.get('payment_id') or '',
+            "customer_name": f"{customer_info['first_name']} {customer_info['last_name']}",
+            "email": customer_info['email'],
+            "phone": self._display(customer_info.get('phone'), 'Not provided'),
+            "age": self._display(customer_info.get('age'), 'Not provided'),
+            "body_type": self._display(customer_info.get('body_type'), 'Not specified'),
+            "special_considerations": self._display(customer_info.get('special_considerations'), 'None'),
+            "product": self._display(order_data.get('product_selected'), 'Premium Tailored Trousers'),
+            "quantity": self._display(order_data.get('quantity'), 1),
+            "fabric_choice": self._display(order_data.get('fabric_choice'), 'Not specified'),
+            "style_preferences": self._display(order_data.get('style_preferences'), 'Not specified'),
+            "notes": self._display(order_data.get('notes'), 'No additional notes'),
+            "order_status": self._display(order_data.get('order_status'), 'Paid'),
+            "height": measurements['height'],
+            "weight": measurements['weight'],
+            "waist": self._display(measurements.get('waist'), 'N/A'),
+            "hip_seat": self._display(measurements.get('hip_seat'), 'N/A'),
+            "measurements_text": "\n".join(f"{label}: {value}" for label, value in measurement_rows),
+            "measurements_html": "".join(
+                f"<tr><td>{html.escape(label)}</td><td>{html.escape(value)}</td></tr>"
+                for label, value in measurement_rows
+            )
+        }
+    
     async def send_order_confirmation(self, order_data: Dict[str, Any]) -> bool:
         """Send order confirmation email to customer"""
         try:
             customer_email = order_data['customer_info']['email']
-            customer_name = f"{order_data['customer_info']['first_name']} {order_data['customer_info']['last_name']}"
-            order_id = order_data['id']
-            
-            subject = f"Order Confirmation - {order_id} | Stallion & Co."
-            
-            body = f"""
-            Dear {customer_name},
-            
-            Thank you for choosing Stallion & Co. for your luxury tailoring needs!
-            
-            Your order has been confirmed and payment has been successfully processed.
-            
-            ORDER DETAILS:
-            Order ID: {order_id}
-            Product: {order_data.get('product_selected', 'Premium Tailored Trousers')}
-            Quantity: {order_data.get('quantity', 1)}
-            
-            MEASUREMENTS RECEIVED:
-            Height: {order_data['measurements']['height']} cm
-            Weight: {order_data['measurements']['weight']} kg
-            Waist: {order_data['measurements'].get('waist', 'N/A')} cm
-            Hip/Seat: {order_data['measurements'].get('hip_seat', 'N/A')} cm
-            
-            NEXT STEPS:
-            Our master tailors will carefully review your measurements and begin crafting your bespoke garment. 
-            We will contact you within 2-3 business days to confirm the details and provide an estimated completion timeline.
-            
-            If you have any questions, please don't hesitate to contact us.
-            
-            Best regards,
-            The Stallion & Co. Team
-            
-            ---
-            This is an automated confirmation. Please do not reply to this email.
-            """
-            
-            return await self.send_email(customer_email, subject, body)
+            return await self.send_template(customer_email, 'order_confirmation', self._order_context(order_data))
             
         except Exception as e:
             logger.error(f"Failed to send order confirmation: {str(e)}")
             return False
     
+    def _internal_order_details(self, order_data: Dict[str, Any], payment_id: str) -> Dict[str, Any]:
+        """Render the order, measurement and customer details shown to the tailors"""
+        context = self._order_context(order_data, payment_id)
+        details = template_engine.render('order_details', context)
+        context["order_details_text"] = details.text.rstrip()
+        context["order_details_html"] = details.html
+        return context
+    
     async def send_internal_notification(self, order_data: Dict[str, Any], payment_id: str) -> bool:
         """Send internal notification to Stallion & Co. team"""
         try:
             notification_email = os.getenv('NOTIFICATION_EMAIL', 'tailors@stallionandco.com')
-            order_id = order_data['id']
-            customer_name = f"{order_data['customer_info']['first_name']} {order_data['customer_info']['last_name']}"
+            context = self._internal_order_details(order_data, payment_id)
+            context["order_date"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            subject = f"New Order Received - {order_id} | Payment Confirmed"
+            return await self.send_template(notification_email, 'internal_notification', context)
             
-            # Create detailed order information
-            measurements_info = "\n".join([
-                f"{key.replace('_', ' ').title()}: {value} {order_data['measurements'].get('unit', 'cm')}"
-                for key, value in order_data['measurements'].items()
-                if key not in ['unit'] and value is not None
-            ])
-            
-            body = f"""
-            NEW TAILORING ORDER RECEIVED
-            
-            ORDER INFORMATION:
-            Order ID: {order_id}
-            Payment ID: {payment_id}
-            Customer: {customer_name}
-            Email: {order_data['customer_info']['email']}
-            Phone: {order_data['customer_info'].get('phone', 'Not provided')}
-            
-            PRODUCT DETAILS:
-            Product: {order_data.get('product_selected', 'Premium Tailored Trousers')}
-            Quantity: {order_data.get('quantity', 1)}
-            Fabric Choice: {order_data.get('fabric_choice', 'Not specified')}
-            Style Preferences: {order_data.get('style_preferences', 'Not specified')}
-            
-            CUSTOMER MEASUREMENTS:
-            {measurements_info}
-            
-            ADDITIONAL NOTES:
-            {order_data.get('notes', 'No additional notes')}
-            
-            CUSTOMER PROFILE:
-            Age: {order_data['customer_info'].get('age', 'Not provided')}
-            Body Type: {order_data['customer_info'].get('body_type', 'Not specified')}
-            Special Considerations: {order_data['customer_info'].get('special_considerations', 'None')}
-            
-            Order Status: {order_data.get('order_status', 'Paid')}
-            Order Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        except Exception as e:
+            logger.error(f"Failed to send internal notification: {str(e)}")
+            return False
+    
+    async def send_order_digest(self, orders: List[Tuple[Dict[str, Any], str]]) -> bool:
+        """Send one internal notification covering several paid orders"""
+        try:
+            notification_email = os.getenv('NOTIFICATION_EMAIL', 'tailors@stallionandco.com')
             
-            Please review the measurements and begin preparation for this custom order.
+            sections_text = []
+            sections_html = []
+            for index, (order_data, payment_id) in enumerate(orders, start=1):
+                details = self._internal_order_details(order_data, payment_id)
+                heading = f"ORDER {index} OF {len(orders)}"
+                sections_text.append(f"{'-' * 60}\n{heading}\n\n{details['order_details_text']}")
+                sections_html.append(f"<h3 style=\"color: #6E0A13;\">{heading}</h3>{details['order_details_html']}")
             
-            ---
-            Stallion & Co. Order Management System
-            """
+            context = {
+                "order_count": len(orders),
+                "order_ids": ', '.join(order_data['id'] for order_data, _ in orders),
+                "digest_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "orders_text": "\n\n".join(sections_text),
+                "orders_html": "".join(sections_html)
+            }
             
-            return await self.send_email(notification_email, subject, body)
+            return await self.send_template(notification_email, 'order_digest', context)
             
         except Exception as e:
-            logger.error(f"Failed to send internal notification: {str(e)}")
+            logger.error(f"Failed to send order digest: {str(e)}")
             return False
     
     async def send_payment_reminder(self, order_data: Dict[str, Any], payment_link: str) -> bool:
         """Send payment reminder for abandoned orders"""
         try:
             customer_email = order_data['customer_info']['email']
-            customer_name = f"{order_data['customer_info']['first_name']} {order_data['customer_info']['last_name']}"
-            order_id = order_data['id']
-            
-            subject = f"Complete Your Order - {order_id} | Stallion & Co."
-            
-            body = f"""
-            Dear {customer_name},
-            
-            We noticed that your recent order with Stallion & Co. is still pending payment.
-            
-            ORDER DETAILS:
-            Order ID: {order_id}
-            Product: {order_data.get('product_selected', 'Premium Tailored Trousers')}
-            
-            To complete your order and secure your spot in our crafting queue, please complete your payment using the link below:
-            
-            Complete Payment: {payment_link}
-            
-            If you have any questions or need assistance, please don't hesitate to contact us.
-            
-            We look forward to creating your perfect tailored garment!
-            
-            Best regards,
-            The Stallion & Co. Team
-            
-            ---
-            This reminder will expire in 48 hours.
-            """
+            context = self._order_context(order_data)
+            context["payment_link"] = payment_link
             
-            return await self.send_email(customer_email, subject, body)
+            return await self.send_template(customer_email, 'payment_reminder', context)
             
         except Exception as e:
             logger.error(f"Failed to send payment reminder: {str(e)}")
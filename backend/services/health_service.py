@@ -0,0 +1,137 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Awaitable, Callable, Optional
+from services.gmail_service import gmail_service
+from services.sheets_service import sheets_service
+from services.digest_service import notification_digest
+from services.job_tracker import job_tracker
+from services.loop_monitor import loop_monitor
+from services.warmup_service import startup_warmup
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+worker_ready = metrics.gauge(
+    "worker_ready", "1 when the last readiness check passed, 0 otherwise"
+)
+
+
+class ReadinessProbe:
+    """Decides whether this worker should receive traffic.
+
+    The worker is ready when startup warm-up has finished, MongoDB answers a ping, the startup
+    indexes were created, the event loop is keeping up, background work is not piling up and
+    no shutdown has started. The Gmail and Sheets clients are reported too, but only count
+    when READINESS_REQUIRE_GOOGLE is set: orders are still taken without them, and every
+    worker shares the same credentials, so failing on them would take the whole site out of
+    rotation.
+
+    Checks that call MongoDB or Google are cached for READINESS_CACHE_SECONDS and run once for
+    all probes waiting at the same time, so frequent load balancer checks add no load. Lag,
+    queue depth and draining are read from memory on every probe.
+    """
+
+    def __init__(self):
+        self.cache_seconds = float(os.getenv('READINESS_CACHE_SECONDS', '5'))
+        self.mongo_timeout = float(os.getenv('READINESS_MONGO_TIMEOUT_SECONDS', '2'))
+        self.max_loop_lag = float(os.getenv('READINESS_MAX_LOOP_LAG_SECONDS', '1.0'))
+        self.max_background_jobs = int(os.getenv('READINESS_MAX_BACKGROUND_JOBS', '200'))
+        self.require_google = os.getenv('READINESS_REQUIRE_GOOGLE', 'false').lower() == 'true'
+        self.indexes_ready = False
+        self._db = None
+        self._ensure_indexes: Optional[Callable[[], Awaitable[None]]] = None
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def start(self, db, ensure_indexes: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+        """ensure_indexes is retried by later checks if it failed at startup"""
+        self._db = db
+        self._ensure_indexes = ensure_indexes
+
+    def mark_indexes(self, ready: bool) -> None:
+        """Record whether the startup indexes were created"""
+        self.indexes_ready = ready
+
+    async def _check_mongo(self) -> Dict[str, Any]:
+        if self._db is None:
+            return {"ok": False, "error": "not connected"}
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._db.command("ping"), timeout=self.mongo_timeout)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": f"ping timed out after {self.mongo_timeout}s"}
+        except Exception as e:
+            # The full message names hosts and replica set members, so it goes to the log only
+            logger.error(f"Readiness: MongoDB ping failed: {str(e)}")
+            return {"ok": False, "error": type(e).__name__}
+        return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    @staticmethod
+    async def _check_google() -> Dict[str, Any]:
+        # The first access builds the Sheets client from the service account file
+        sheets_client = await asyncio.to_thread(lambda: sheets_service.client)
+        sheets_configured = bool(sheets_service.sheet_id) and sheets_service.sheet_id != 'your_sheet_id_here'
+        return {
+            "ok": gmail_service.enabled and sheets_client is not None and sheets_configured,
+            "email": gmail_service.transport.name if gmail_service.enabled else "not configured",
+            "sheets": "ready" if sheets_client is not None and sheets_configured else "not configured"
+        }
+
+    async def _dependency_checks(self) -> Dict[str, Any]:
+        """MongoDB and Google checks, from cache when fresh"""
+        if self._cached is not None and time.monotonic() - self._cached_at < self.cache_seconds:
+            return self._cached
+        async with self._lock:
+            # Another probe may have refreshed the cache while this one waited
+            if self._cached is not None and time.monotonic() - self._cached_at < self.cache_seconds:
+                return self._cached
+            mongo, google = await asyncio.gather(self._check_mongo(), self._check_google())
+            if mongo["ok"] and not self.indexes_ready and self._ensure_indexes is not None:
+                await self._ensure_indexes()
+            self._cached = {
+                "mongo": mongo,
+                "google": google,
+                "checked_at": datetime.now(timezone.utc).isoformat()
+            }
+            self._cached_at = time.monotonic()
+            return self._cached
+
+    async def check(self) -> Dict[str, Any]:
+        """Readiness report; `ready` is False when the worker should not get traffic"""
+        dependencies = await self._dependency_checks()
+        background_jobs = job_tracker.in_flight + notification_digest.pending_count
+        checks = {
+            "warmup": startup_warmup.report(),
+            "mongo": dependencies["mongo"],
+            "indexes": {"ok": self.indexes_ready},
+            "google": {**dependencies["google"], "required": self.require_google},
+            "background_queue": {
+                "ok": background_jobs <= self.max_background_jobs,
+                "depth": background_jobs,
+                "limit": self.max_background_jobs
+            },
+            "event_loop": {
+                "ok": loop_monitor.current_lag <= self.max_loop_lag,
+                "lag_seconds": round(loop_monitor.current_lag, 4),
+                "limit_seconds": self.max_loop_lag
+            },
+            "shutdown": {"ok": not job_tracker.draining}
+        }
+        ready = all(
+            check["ok"] for name, check in checks.items()
+            if name != "google" or self.require_google
+        )
+        worker_ready.set(1 if ready else 0)
+        return {
+            "ready": ready,
+            "checked_at": dependencies["checked_at"],
+            "checks": checks
+        }
+
+
+# Create singleton instance
+readiness_probe = ReadinessProbe()
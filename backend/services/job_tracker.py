@@ -0,0 +1,200 @@
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Set
+from pymongo import ASCENDING, ReplaceOne, ReturnDocument
+from services.metrics import metrics
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+background_jobs_in_flight = metrics.gauge(
+    "background_jobs_in_flight", "Order background jobs started and not yet finished"
+)
+
+JobHandler = Callable[[Dict[str, Any], str, List[str]], Awaitable[None]]
+
+
+class BackgroundJobTracker:
+    """Keeps track of order background work so a shutdown can drain it or hand it to the next start.
+
+    Every job records which of its steps are done. On shutdown the tracker stops taking new
+    work and waits up to SHUTDOWN_DRAIN_SECONDS for running jobs. Anything still unfinished is
+    saved to db.pending_jobs with the steps it has left. Workers claim saved jobs at startup
+    and every PENDING_JOB_SWEEP_SECONDS after that, and run only the steps that are left.
+
+    A claim is a lease (owner and lease_until), not a delete. The document is removed only
+    when the job finishes. If the worker crashes first, the lease runs out after
+    PENDING_JOB_LEASE_SECONDS and another worker claims the job again. A step interrupted
+    mid-way runs again, so delivery is at least once.
+    """
+
+    def __init__(self):
+        self.drain_seconds = float(os.getenv('SHUTDOWN_DRAIN_SECONDS', '20'))
+        self.lease_seconds = int(os.getenv('PENDING_JOB_LEASE_SECONDS', '600'))
+        self.sweep_interval = int(os.getenv('PENDING_JOB_SWEEP_SECONDS', '60'))
+        self.draining = False
+        self._db = None
+        self._claimed: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._handlers: Dict[str, JobHandler] = {}
+        self._resumed: Set[asyncio.Task] = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def worker_id(self) -> str:
+        # Read on every claim, so a forked worker never uses its parent's id
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    async def ensure_indexes(self, db) -> None:
+        """Create the index saved jobs are upserted and deleted by"""
+        await db.pending_jobs.create_index([("job_id", ASCENDING)], unique=True, name="job_id_unique")
+
+    def start(self, db) -> None:
+        """Keep claiming saved jobs, including ones whose lease ran out after a crash"""
+        self._db = db
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                with tracer.span("background.resume_pending_jobs"):
+                    await self.resume(self._db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to resume saved background jobs: {str(e)}")
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Handler used to run a saved job of this kind: handler(payload, job_id, steps_done)"""
+        self._handlers[kind] = handler
+
+    def begin(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None,
+              steps_done: Optional[List[str]] = None) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "kind": kind,
+            "payload": payload,
+            "steps_done": list(steps_done or []),
+            "created_at": datetime.now(timezone.utc)
+        }
+        self._idle.clear()
+        background_jobs_in_flight.set(len(self._jobs))
+        return job_id
+
+    def step_done(self, job_id: str, step: str) -> None:
+        job = self._jobs.get(job_id)
+        if job is not None and step not in job["steps_done"]:
+            job["steps_done"].append(step)
+
+    def finish(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+        background_jobs_in_flight.set(len(self._jobs))
+        if not self._jobs:
+            self._idle.set()
+        if job_id in self._claimed:
+            self._claimed.discard(job_id)
+            self._track(asyncio.create_task(self._delete_claimed(job_id)))
+
+    async def _delete_claimed(self, job_id: str) -> None:
+        try:
+            await self._db.pending_jobs.delete_one({"job_id": job_id, "owner": self.worker_id})
+        except Exception as e:
+            # The lease will run out and the job runs again, which is safe but repeats its last step
+            logger.error(f"Failed to delete finished saved job {job_id}: {str(e)}")
+
+    def _track(self, task: asyncio.Task) -> None:
+        self._resumed.add(task)
+        task.add_done_callback(self._resumed.discard)
+
+    async def drain(self) -> int:
+        """Stop taking new work and wait for running jobs; returns how many are left"""
+        self.draining = True
+        if self._jobs:
+            logger.info(f"Waiting up to {self.drain_seconds}s for {len(self._jobs)} background jobs")
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=self.drain_seconds)
+            except asyncio.TimeoutError:
+                logger.error(f"{len(self._jobs)} background jobs still running after {self.drain_seconds}s")
+        return len(self._jobs)
+
+    async def persist(self, db, extra: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Save unfinished jobs, plus any extra ones, for the next start"""
+        jobs = [dict(job) for job in self._jobs.values()] + (extra or [])
+        if not jobs:
+            return 0
+        for job in jobs:
+            job.setdefault("job_id", str(uuid.uuid4()))
+            job.setdefault("steps_done", [])
+            job.setdefault("created_at", datetime.now(timezone.utc))
+            job["saved_at"] = datetime.now(timezone.utc)
+        try:
+            # Replacing by job_id hands a resumed job back with its progress and without our lease
+            await db.pending_jobs.bulk_write(
+                [ReplaceOne({"job_id": job["job_id"]}, job, upsert=True) for job in jobs], ordered=False
+            )
+            logger.info(f"Saved {len(jobs)} unfinished background jobs for the next start")
+        except Exception as e:
+            logger.error(f"Failed to save {len(jobs)} unfinished background jobs: {str(e)}")
+            return 0
+        return len(jobs)
+
+    async def resume(self, db) -> int:
+        """Lease jobs saved by a shutdown, or left by a crashed worker, and run their remaining steps"""
+        self._db = db
+        resumed = 0
+        seen: Set[str] = set()
+        while not self.draining:
+            now = datetime.now(timezone.utc)
+            try:
+                job = await db.pending_jobs.find_one_and_update(
+                    {"$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+                    {"$set": {"owner": self.worker_id, "lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                    sort=[("saved_at", 1)],
+                    return_document=ReturnDocument.AFTER
+                )
+            except Exception as e:
+                logger.error(f"Failed to load saved background jobs: {str(e)}")
+                break
+            if job is None or job["job_id"] in seen:
+                break
+            seen.add(job["job_id"])
+            handler = self._handlers.get(job["kind"])
+            if handler is None:
+                logger.error(f"No handler for saved background job {job['job_id']} of kind {job['kind']}")
+                continue
+            if job["job_id"] in self._jobs:
+                # Still running here past its lease; keep the new lease and let it finish
+                self._claimed.add(job["job_id"])
+                continue
+            self._claimed.add(job["job_id"])
+            self._track(asyncio.create_task(handler(job["payload"], job["job_id"], job.get("steps_done", []))))
+            resumed += 1
+        if resumed:
+            logger.info(f"Resumed {resumed} saved background jobs")
+        return resumed
+
+
+# Create singleton instance
+job_tracker = BackgroundJobTracker()
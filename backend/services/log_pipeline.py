@@ -0,0 +1,155 @@
+import os
+import re
+import sys
+import json
+import queue
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from contextvars import ContextVar
+from typing import Optional
+from services.tracing import tracer
+from services.metrics import metrics
+
+log_records_dropped_total = metrics.counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full", ("level",)
+)
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+EMAIL_PATTERN = re.compile(r"([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9.-]+\.[A-Za-z]{2,})")
+# Digit runs with phone punctuation that are not part of an id, date or time
+PHONE_PATTERN = re.compile(r"(?<![\w\-:.(])\+?\(?\d[\d\s\-()]{8,}\d(?![\w\-:.])")
+
+
+def _mask_phone(match: "re.Match[str]") -> str:
+    return "[phone]" if sum(char.isdigit() for char in match.group()) >= 10 else match.group()
+
+
+def redact(text: str) -> str:
+    """Mask email addresses and phone numbers in a log message"""
+    text = EMAIL_PATTERN.sub(r"\1***@\2", text)
+    return PHONE_PATTERN.sub(_mask_phone, text)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Queues records without ever blocking the caller.
+
+    Request and trace ids are read here, on the calling thread, because contextvars are not
+    visible to the writer thread. INFO and lower records are sampled per trace, so a kept
+    request keeps all of its lines. When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]", info_sample_rate: float):
+        super().__init__(log_queue)
+        self.info_sample_rate = info_sample_rate
+
+    def _sampled_out(self, record: logging.LogRecord, trace_id: Optional[str]) -> bool:
+        if record.levelno > logging.INFO or self.info_sample_rate >= 1:
+            return False
+        if trace_id:
+            return int(trace_id[:8], 16) / 0xFFFFFFFF >= self.info_sample_rate
+        return random.random() >= self.info_sample_rate
+
+    def emit(self, record: logging.LogRecord) -> None:
+        span = tracer.current_span()
+        trace_id = span.trace_id if span is not None else None
+        if self._sampled_out(record, trace_id):
+            return
+        record.trace_id = trace_id
+        record.span_id = span.span_id if span is not None else None
+        record.request_id = request_id_var.get()
+        try:
+            self.enqueue(self.prepare(record))
+        except queue.Full:
+            log_records_dropped_total.inc(level=record.levelname)
+        except Exception:
+            self.handleError(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.queue.put_nowait(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with PII redacted; runs on the writer thread.
+
+    QueueHandler.prepare has already merged any traceback into the message.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage())
+        }
+        for key in ("request_id", "trace_id", "span_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class RedactingFormatter(logging.Formatter):
+    """The original text format, with PII redacted"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class LogPipeline:
+    """Root logging through a bounded queue drained by a writer thread.
+
+    LOG_FORMAT is ``json`` (default) or ``text``; LOG_FILE writes to a file instead of
+    stderr. LOG_INFO_SAMPLE_RATE keeps that fraction of INFO lines, LOG_QUEUE_SIZE bounds
+    the records waiting to be written.
+
+    ``configure`` runs at import and writes directly to the output. The queue and its writer
+    thread are started by ``start`` in each worker's startup hook, because a thread started
+    before a pre-fork (gunicorn ``--preload``) would exist only in the master.
+    """
+
+    def __init__(self):
+        self.output: Optional[logging.Handler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def _use(self, handler: logging.Handler) -> None:
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+
+    def configure(self, level: int = logging.INFO) -> None:
+        """Set the log format and level, writing synchronously until start()"""
+        if self.output is not None:
+            return
+        log_file = os.getenv('LOG_FILE')
+        self.output = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler(sys.stderr)
+        if os.getenv('LOG_FORMAT', 'json').lower() == 'json':
+            self.output.setFormatter(JsonFormatter())
+        else:
+            self.output.setFormatter(RedactingFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        self._use(self.output)
+        logging.getLogger().setLevel(level)
+
+    def start(self) -> None:
+        """Switch this process to the queue and start its writer thread"""
+        if self.output is None:
+            self.configure()
+        if self.listener is not None:
+            return
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+        self.listener = logging.handlers.QueueListener(log_queue, self.output, respect_handler_level=True)
+        self.listener.start()
+        self._use(ContextQueueHandler(log_queue, float(os.getenv('LOG_INFO_SAMPLE_RATE', '1.0'))))
+
+    def shutdown(self) -> None:
+        """Write out everything still queued, stop the writer thread and log directly again"""
+        if self.listener is not None:
+            self._use(self.output)
+            self.listener.stop()
+            self.listener = None
+
+# Create singleton instance
+log_pipeline = LogPipeline()
@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = str(Path(__file__).parent.parent)
+
+event_loop_lag_seconds = metrics.gauge(
+    "event_loop_lag_seconds", "Most recent event loop scheduling lag"
+)
+event_loop_lag_histogram = metrics.histogram(
+    "event_loop_lag_distribution_seconds", "Event loop scheduling lag samples",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+event_loop_stalls_total = metrics.counter(
+    "event_loop_stalls_total", "Event loop stalls past the threshold by blocking code location", ("location",)
+)
+slow_callbacks_total = metrics.counter(
+    "event_loop_slow_callbacks_total", "Callbacks reported by asyncio debug mode as slower than the threshold"
+)
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Collects asyncio debug-mode 'Executing ... took N seconds' warnings"""
+
+    def __init__(self, monitor: "LoopMonitor"):
+        super().__init__(level=logging.WARNING)
+        self.monitor = monitor
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if message.startswith('Executing') and ' took ' in message:
+            slow_callbacks_total.inc()
+            self.monitor.slow_callbacks.append({
+                "detected_at": datetime.now(timezone.utc).isoformat(),
+                "message": message
+            })
+
+
+class LoopMonitor:
+    """Samples event loop lag and captures the stack of code that blocks the loop.
+
+    An asyncio task wakes up every interval and records how late it was scheduled. A watchdog
+    thread watches that heartbeat; when it stops for longer than the stall threshold, the
+    watchdog grabs the loop thread's current stack, which is the code blocking the loop.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('LOOP_MONITOR_ENABLED', 'true').lower() == 'true'
+        self.interval = float(os.getenv('LOOP_MONITOR_INTERVAL_SECONDS', '0.5'))
+        self.stall_threshold = float(os.getenv('LOOP_STALL_THRESHOLD_SECONDS', '0.25'))
+        self.slow_callback_debug = os.getenv('LOOP_SLOW_CALLBACK_DEBUG', 'false').lower() == 'true'
+        history = int(os.getenv('LOOP_STALL_HISTORY', '50'))
+        self.stalls: deque = deque(maxlen=history)
+        self.slow_callbacks: deque = deque(maxlen=history)
+        self.current_lag = 0.0
+        self.max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._active_stall: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        """Start the lag sampler and the stall watchdog for the running loop"""
+        if not self.enabled or (self._task and not self._task.done()):
+            return
+
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+
+        if self.slow_callback_debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.stall_threshold
+            logging.getLogger('asyncio').addHandler(_SlowCallbackHandler(self))
+
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop monitor started (interval {self.interval}s, stall threshold {self.stall_threshold}s)")
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _sample(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            self.current_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            event_loop_lag_seconds.set(lag)
+            event_loop_lag_histogram.observe(lag)
+
+    def _watch(self) -> None:
+        poll_interval = min(self.stall_threshold, self.interval) / 2
+        while not self._stopped.wait(poll_interval):
+            silent_for = time.monotonic() - self._heartbeat - self.interval
+            if silent_for > self.stall_threshold:
+                if self._active_stall is None:
+                    self._active_stall = self._capture_stall()
+                self._active_stall["duration_seconds"] = round(silent_for, 4)
+            elif self._active_stall is not None:
+                # The loop is running again; the last duration seen is how long it was blocked
+                logger.warning(
+                    f"Event loop blocked for {self._active_stall['duration_seconds']}s at {self._active_stall['location']}"
+                )
+                self._active_stall = None
+
+    def _capture_stall(self) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.extract_stack(frame) if frame is not None else []
+        location = self._blocking_location(stack)
+        stall = {
+            "detected_at": datetime.now(timezone.utc).isoformat(),
+            "duration_seconds": 0.0,
+            "location": location,
+            "stack": [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in stack]
+        }
+        self.stalls.append(stall)
+        event_loop_stalls_total.inc(location=location)
+        return stall
+
+    @staticmethod
+    def _blocking_location(stack: List[traceback.FrameSummary]) -> str:
+        """The innermost frame in our own code, which is the handler or service that blocked"""
+        for entry in reversed(stack):
+            if entry.filename.startswith(BACKEND_DIR) and 'site-packages' not in entry.filename:
+                return f"{os.path.relpath(entry.filename, BACKEND_DIR)}:{entry.lineno} in {entry.name}"
+        if stack:
+            return f"{stack[-1].filename}:{stack[-1].lineno} in {stack[-1].name}"
+        return "unknown"
+
+    def report(self) -> Dict[str, Any]:
+        """Current lag and recent stalls for the debug endpoint"""
+        return {
+            "enabled": self.enabled and self._task is not None,
+            "interval_seconds": self.interval,
+            "stall_threshold_seconds": self.stall_threshold,
+            "current_lag_seconds": round(self.current_lag, 4),
+            "max_lag_seconds": round(self.max_lag, 4),
+            "stalls": list(reversed(self.stalls)),
+            "slow_callbacks": list(reversed(self.slow_callbacks))
+        }
+
+
+# Create singleton instance
+loop_monitor = LoopMonitor()
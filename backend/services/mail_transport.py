@@ -0,0 +1,214 @@
+import os
+import base64
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import Optional
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+smtp_open_connections = metrics.gauge(
+    "smtp_open_connections", "SMTP connections open in this worker's pool, idle or in use"
+)
+
+
+class MailTransport(ABC):
+    """Delivers fully built email messages. Subclasses implement one delivery backend."""
+
+    name = "base"
+    enabled = False
+
+    @abstractmethod
+    async def send(self, message: EmailMessage) -> str:
+        """Deliver one message and return a provider message ID; raises on failure"""
+
+    async def warm_up(self) -> None:
+        """Open connections and fetch credentials ahead of the first send"""
+
+    async def close(self) -> None:
+        """Release any open connections"""
+
+
+class GmailApiTransport(MailTransport):
+    """Sends messages through the Gmail REST API using an OAuth refresh token"""
+
+    name = "gmail_api"
+
+    def __init__(self):
+        self.client_id = os.getenv('GMAIL_CLIENT_ID')
+        self.client_secret = os.getenv('GMAIL_CLIENT_SECRET')
+        self.refresh_token = os.getenv('GMAIL_REFRESH_TOKEN')
+        self.enabled = all([self.client_id, self.client_secret, self.refresh_token])
+        self._service = None
+        self._credentials = None
+        self._lock = asyncio.Lock()
+
+    def _get_credentials(self):
+        """Get authenticated Gmail credentials"""
+        from google.oauth2.credentials import Credentials
+
+        return Credentials(
+            token=None,
+            refresh_token=self.refresh_token,
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id=self.client_id,
+            client_secret=self.client_secret
+        )
+
+    def _get_service(self):
+        # Built once so the discovery document, HTTP connection and access token are reused
+        if self._service is None:
+            from googleapiclient.discovery import build
+
+            self._credentials = self._get_credentials()
+            self._service = build('gmail', 'v1', credentials=self._credentials, cache_discovery=False)
+        return self._service
+
+    def _warm_up_sync(self) -> None:
+        from google.auth.transport.requests import Request
+
+        self._get_service()
+        # The service holds the same credentials object, so the first send reuses this token
+        self._credentials.refresh(Request())
+
+    def _send_sync(self, raw_message: str) -> str:
+        response = self._get_service().users().messages().send(
+            userId='me',
+            body={'raw': raw_message}
+        ).execute()
+        return response['id']
+
+    async def send(self, message: EmailMessage) -> str:
+        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('ascii')
+        # The cached httplib2 connection is not thread safe, so sends are serialised
+        async with self._lock:
+            return await asyncio.to_thread(self._send_sync, raw_message)
+
+    async def warm_up(self) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._warm_up_sync)
+
+    async def close(self) -> None:
+        if self._service is not None:
+            self._service.close()
+            self._service = None
+
+
+class SmtpTransport(MailTransport):
+    """Sends messages over SMTP, keeping a pool of open, authenticated connections.
+
+    For local testing point it at a stand-in server, for example
+    ``python -m aiosmtpd -n -l localhost:1025`` with ``SMTP_HOST=localhost``,
+    ``SMTP_PORT=1025`` and ``SMTP_START_TLS=false``.
+    """
+
+    name = "smtp"
+
+    def __init__(self):
+        self.host = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+        self.port = int(os.getenv('SMTP_PORT', '587'))
+        self.username = os.getenv('SMTP_USERNAME')
+        self.password = os.getenv('SMTP_PASSWORD')
+        self.use_tls = os.getenv('SMTP_USE_TLS', 'false').lower() == 'true'
+        self.start_tls = os.getenv('SMTP_START_TLS', 'true').lower() == 'true'
+        self.timeout = float(os.getenv('SMTP_TIMEOUT_SECONDS', '30'))
+        self.pool_size = int(os.getenv('SMTP_POOL_SIZE', '4'))
+        self.enabled = bool(self.host)
+        self._idle: Optional[asyncio.Queue] = None
+        # One slot per connection in use; a failed connection gives its slot back so a waiting sender can reconnect
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _connect(self):
+        import aiosmtplib
+
+        client = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls if not self.use_tls else False,
+            timeout=self.timeout
+        )
+        await client.connect()
+        smtp_open_connections.inc()
+        logger.info(f"Opened SMTP connection to {self.host}:{self.port}")
+        return client
+
+    async def _acquire(self):
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+        await self._slots.acquire()
+        try:
+            if self._idle.empty():
+                return await self._connect()
+            client = self._idle.get_nowait()
+            if not client.is_connected:
+                try:
+                    await client.connect()
+                except Exception:
+                    smtp_open_connections.dec()
+                    raise
+            return client
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, client) -> None:
+        self._idle.put_nowait(client)
+        self._slots.release()
+
+    async def _discard(self, client) -> None:
+        smtp_open_connections.dec()
+        try:
+            client.close()
+        except Exception:
+            pass
+        self._slots.release()
+
+    async def send(self, message: EmailMessage) -> str:
+        import aiosmtplib
+
+        client = await self._acquire()
+        try:
+            try:
+                await client.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                # The server dropped an idle pooled connection; reconnect once and retry
+                await client.connect()
+                await client.send_message(message)
+        except Exception:
+            await self._discard(client)
+            raise
+
+        self._release(client)
+        return message['Message-ID']
+
+    async def warm_up(self) -> None:
+        # One open, authenticated connection left idle in the pool
+        self._release(await self._acquire())
+
+    async def close(self) -> None:
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+            smtp_open_connections.dec()
+
+
+def create_transport() -> MailTransport:
+    """Create the transport selected by MAIL_TRANSPORT (gmail_api or smtp)"""
+    transport_name = os.getenv('MAIL_TRANSPORT', 'gmail_api').lower()
+    if transport_name == 'smtp':
+        return SmtpTransport()
+    if transport_name != 'gmail_api':
+        logger.warning(f"Unknown MAIL_TRANSPORT '{transport_name}', falling back to gmail_api")
+    return GmailApiTransport()
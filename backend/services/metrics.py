@@ -0,0 +1,351 @@
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # Per label set: [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for index, upper_bound in enumerate(self.buckets):
+                cumulative += state[index]
+                bucket_label = f'le="{_format_value(upper_bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Create singleton instance
+metrics = MetricsRegistry()
+
+http_requests_total = metrics.counter(
+    "http_requests_total", "HTTP requests by route, method and status code", ("method", "route", "status")
+)
+http_request_duration_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+http_requests_in_flight = metrics.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+)
+external_call_duration_seconds = metrics.histogram(
+    "external_call_duration_seconds", "Latency of calls to outside services", ("service", "operation", "outcome")
+)
+background_task_duration_seconds = metrics.histogram(
+    "background_task_duration_seconds", "Duration of background tasks", ("task", "outcome"),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+mongo_pool_connections = metrics.gauge(
+    "mongo_pool_connections", "Open connections in the MongoDB pool by server", ("address",)
+)
+mongo_pool_checked_out = metrics.gauge(
+    "mongo_pool_checked_out_connections", "MongoDB connections currently in use by server", ("address",)
+)
+mongo_pool_wait_seconds = metrics.histogram(
+    "mongo_pool_wait_seconds", "Time spent waiting to check a connection out of the MongoDB pool", ("address",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+mongo_pool_checkout_failures_total = metrics.counter(
+    "mongo_pool_checkout_failures_total", "MongoDB connection checkouts that failed, by reason", ("address", "reason")
+)
+mongo_pool_cleared_total = metrics.counter(
+    "mongo_pool_cleared_total", "Times a MongoDB pool was cleared after a network error or failover", ("address",)
+)
+email_template_render_seconds = metrics.histogram(
+    "email_template_render_seconds", "Email template render time", ("template",),
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+)
+
+
+@contextmanager
+def track_external(service: str, operation: str):
+    """Time a call to Mongo, Razorpay, Gmail, Sheets or another outside service, inside a trace span"""
+    started = time.perf_counter()
+    outcome = "success"
+    try:
+        with tracer.span(f"{service}.{operation}", service=service):
+            yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        external_call_duration_seconds.observe(
+            time.perf_counter() - started, service=service, operation=operation, outcome=outcome
+        )
+
+
+@contextmanager
+def track_background_task(task: str):
+    """Time one run of a background task"""
+    started = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        background_task_duration_seconds.observe(time.perf_counter() - started, task=task, outcome=outcome)
+
+
+class MongoCommandMetrics:
+    """pymongo command listener that times every Mongo command"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event) -> None:
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ''
+
+    def _finish(self, event, outcome: str) -> None:
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), '')
+        external_call_duration_seconds.observe(
+            event.duration_micros / 1_000_000,
+            service="mongo",
+            operation=f"{event.command_name}:{collection}" if collection else event.command_name,
+            outcome=outcome
+        )
+
+    def succeeded(self, event) -> None:
+        self._finish(event, "success")
+
+    def failed(self, event) -> None:
+        self._finish(event, "error")
+
+
+def mongo_command_listener():
+    """Build a pymongo CommandListener that feeds Mongo timings into the registry"""
+    from pymongo import monitoring
+
+    class _Listener(MongoCommandMetrics, monitoring.CommandListener):
+        pass
+
+    return _Listener()
+
+
+class MongoPoolMetrics:
+    """pymongo pool listener that tracks pool size, connections in use and checkout wait time.
+
+    Motor checks connections out on its executor threads, and a checkout starts and ends on
+    the same thread, so the start time is kept per thread.
+    """
+
+    def __init__(self):
+        self._checkout_started = threading.local()
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event) -> None:
+        mongo_pool_connections.set(0, address=self._address(event))
+        mongo_pool_checked_out.set(0, address=self._address(event))
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        mongo_pool_cleared_total.inc(address=self._address(event))
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        mongo_pool_connections.inc(address=self._address(event))
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        mongo_pool_connections.dec(address=self._address(event))
+
+    def connection_check_out_started(self, event) -> None:
+        self._checkout_started.at = time.perf_counter()
+
+    def _waited(self) -> float:
+        started = getattr(self._checkout_started, "at", None)
+        self._checkout_started.at = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_check_out_failed(self, event) -> None:
+        address = self._address(event)
+        mongo_pool_wait_seconds.observe(self._waited(), address=address)
+        mongo_pool_checkout_failures_total.inc(address=address, reason=str(event.reason))
+
+    def connection_checked_out(self, event) -> None:
+        address = self._address(event)
+        mongo_pool_wait_seconds.observe(self._waited(), address=address)
+        mongo_pool_checked_out.inc(address=address)
+
+    def connection_checked_in(self, event) -> None:
+        mongo_pool_checked_out.dec(address=self._address(event))
+
+
+def mongo_pool_listener():
+    """Build a pymongo ConnectionPoolListener that feeds pool usage into the registry"""
+    from pymongo import monitoring
+
+    class _Listener(MongoPoolMetrics, monitoring.ConnectionPoolListener):
+        pass
+
+    return _Listener()
@@ -0,0 +1,295 @@
+import os
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+mongo_round_trips_per_request = metrics.histogram(
+    "mongo_round_trips_per_request", "Mongo commands issued while handling one request", ("route",),
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21)
+)
+mongo_slow_queries_total = metrics.counter(
+    "mongo_slow_queries_total", "Mongo commands slower than the slow query threshold", ("command", "collection")
+)
+
+# Commands that are driver housekeeping rather than application queries
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions",
+                    "explain", "buildInfo", "getMore", "killCursors", "createIndexes", "listIndexes"}
+
+_request_profile: ContextVar[Optional[Dict[str, Any]]] = ContextVar("mongo_request_profile", default=None)
+
+
+def filter_shape(value: Any) -> Any:
+    """Replace literal values with their type names so queries with the same shape group together"""
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [filter_shape(item) for item in value[:3]]
+    return type(value).__name__
+
+
+def _explain_target(command_name: str, collection: str, query_filter: Dict[str, Any]) -> Dict[str, Any]:
+    """The read to explain; each command names its filter differently"""
+    if command_name == "count":
+        return {"count": collection, "query": query_filter}
+    if command_name == "aggregate":
+        return {"aggregate": collection, "pipeline": [{"$match": query_filter}], "cursor": {}}
+    return {"find": collection, "filter": query_filter}
+
+
+def _command_filter(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    if command_name in ("find", "count", "distinct"):
+        return command.get("filter") or command.get("query") or {}
+    if command_name == "findAndModify":
+        return command.get("query") or {}
+    if command_name == "update":
+        updates = command.get("updates") or [{}]
+        return updates[0].get("q") or {}
+    if command_name == "delete":
+        deletes = command.get("deletes") or [{}]
+        return deletes[0].get("q") or {}
+    if command_name == "aggregate":
+        for stage in command.get("pipeline") or []:
+            if "$match" in stage:
+                return stage["$match"]
+    return {}
+
+
+def _documents_touched(command_name: str, reply: Dict[str, Any]) -> Optional[int]:
+    if command_name in ("find", "aggregate"):
+        cursor = reply.get("cursor") or {}
+        return len(cursor.get("firstBatch") or [])
+    if command_name == "findAndModify":
+        return (reply.get("lastErrorObject") or {}).get("n", 1 if reply.get("value") else 0)
+    if "n" in reply:
+        return reply["n"]
+    return None
+
+
+class MongoProfiler:
+    """Records duration, filter shape and documents touched for every Mongo command.
+
+    Commands are grouped per HTTP request so endpoints that make many round trips, or that
+    look up the same document more than once, are flagged. Slow reads can optionally be
+    explained afterwards to learn how many documents the server examined.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('MONGO_PROFILER_ENABLED', 'true').lower() == 'true'
+        self.slow_query_seconds = float(os.getenv('MONGO_SLOW_QUERY_MS', '100')) / 1000
+        self.max_round_trips = int(os.getenv('MONGO_PROFILER_MAX_ROUND_TRIPS', '3'))
+        self.explain_slow = os.getenv('MONGO_PROFILER_EXPLAIN_SLOW', 'false').lower() == 'true'
+        history = int(os.getenv('MONGO_PROFILER_HISTORY', '100'))
+        self.slow_queries: deque = deque(maxlen=history)
+        self.flagged_requests: deque = deque(maxlen=history)
+        self._pending: Dict[tuple, Dict[str, Any]] = {}
+        self._query_stats: Dict[tuple, Dict[str, Any]] = {}
+        self._route_stats: Dict[str, Dict[str, Any]] = {}
+        self._explain_queue: deque = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+
+    # Command listener callbacks, called from the driver's threads
+
+    def started(self, event) -> None:
+        if not self.enabled or event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        query_filter = _command_filter(event.command_name, event.command)
+        entry = {
+            "command": event.command_name,
+            "collection": collection if isinstance(collection, str) else "",
+            "shape": filter_shape(query_filter),
+            "filter": query_filter,
+            "profile": _request_profile.get()
+        }
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = entry
+
+    def succeeded(self, event) -> None:
+        self._finish(event, event.reply)
+
+    def failed(self, event) -> None:
+        self._finish(event, {})
+
+    def _finish(self, event, reply: Dict[str, Any]) -> None:
+        with self._lock:
+            entry = self._pending.pop((event.connection_id, event.request_id), None)
+        if entry is None:
+            return
+
+        duration = event.duration_micros / 1_000_000
+        documents = _documents_touched(entry["command"], reply)
+        shape_key = repr(entry["shape"])
+        key = (entry["command"], entry["collection"], shape_key)
+
+        with self._lock:
+            stats = self._query_stats.get(key)
+            if stats is None:
+                stats = self._query_stats[key] = {
+                    "command": entry["command"], "collection": entry["collection"], "shape": entry["shape"],
+                    "count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "documents": 0
+                }
+            stats["count"] += 1
+            stats["total_seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+            stats["documents"] += documents or 0
+
+        profile = entry["profile"]
+        if profile is not None:
+            profile["commands"].append((entry["command"], entry["collection"], shape_key))
+
+        if duration >= self.slow_query_seconds:
+            mongo_slow_queries_total.inc(command=entry["command"], collection=entry["collection"])
+            slow_query = {
+                "detected_at": datetime.now(timezone.utc).isoformat(),
+                "command": entry["command"],
+                "collection": entry["collection"],
+                "shape": entry["shape"],
+                "duration_ms": round(duration * 1000, 2),
+                "documents_returned": documents,
+                "route": profile["route"] if profile else None
+            }
+            self.slow_queries.append(slow_query)
+            if self.explain_slow and entry["command"] in ("find", "count", "aggregate"):
+                self._explain_queue.append((slow_query, entry["filter"]))
+
+    # Per-request accounting
+
+    @contextmanager
+    def request(self):
+        """Collect the Mongo commands issued while handling one request"""
+        if not self.enabled:
+            yield None
+            return
+        profile = {"route": None, "commands": []}
+        token = _request_profile.set(profile)
+        try:
+            yield profile
+        finally:
+            _request_profile.reset(token)
+            if profile["route"] is not None:
+                self._record_request(profile)
+
+    def _record_request(self, profile: Dict[str, Any]) -> None:
+        route = profile["route"]
+        commands = profile["commands"]
+        mongo_round_trips_per_request.observe(len(commands), route=route)
+
+        # The same filter shape on the same collection more than once usually means a read
+        # that could be folded into the write, e.g. find_one followed by update_one
+        seen: Dict[tuple, int] = {}
+        for command, collection, shape_key in commands:
+            seen[(collection, shape_key)] = seen.get((collection, shape_key), 0) + 1
+        repeated = [
+            {"collection": collection, "shape": shape_key, "times": count}
+            for (collection, shape_key), count in seen.items() if count > 1
+        ]
+        too_many = len(commands) > self.max_round_trips
+
+        with self._lock:
+            stats = self._route_stats.get(route)
+            if stats is None:
+                stats = self._route_stats[route] = {"requests": 0, "round_trips": 0, "max_round_trips": 0, "flagged": 0}
+            stats["requests"] += 1
+            stats["round_trips"] += len(commands)
+            stats["max_round_trips"] = max(stats["max_round_trips"], len(commands))
+            if repeated or too_many:
+                stats["flagged"] += 1
+
+        if repeated or too_many:
+            self.flagged_requests.append({
+                "detected_at": datetime.now(timezone.utc).isoformat(),
+                "route": route,
+                "round_trips": len(commands),
+                "commands": [f"{command} {collection}" for command, collection, _ in commands],
+                "repeated_lookups": repeated,
+                "too_many_round_trips": too_many
+            })
+
+    # Background explain of slow reads
+
+    def start(self, db) -> None:
+        self._db = db
+        if self.enabled and self.explain_slow and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._explain_loop())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _explain_loop(self) -> None:
+        while True:
+            await asyncio.sleep(5)
+            while self._explain_queue:
+                slow_query, query_filter = self._explain_queue.popleft()
+                try:
+                    explained = await self._db.command({
+                        "explain": _explain_target(slow_query["command"], slow_query["collection"], query_filter),
+                        "verbosity": "executionStats"
+                    })
+                    execution_stats = explained.get("executionStats") or {}
+                    slow_query["documents_examined"] = execution_stats.get("totalDocsExamined")
+                    slow_query["keys_examined"] = execution_stats.get("totalKeysExamined")
+                except Exception as e:
+                    logger.warning(f"Failed to explain slow {slow_query['command']} on {slow_query['collection']}: {str(e)}")
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            queries = sorted(self._query_stats.values(), key=lambda item: item["total_seconds"], reverse=True)
+            routes = {route: dict(stats) for route, stats in self._route_stats.items()}
+        for stats in routes.values():
+            stats["avg_round_trips"] = round(stats["round_trips"] / stats["requests"], 2) if stats["requests"] else 0
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_query_seconds * 1000,
+            "queries": [
+                {
+                    "command": item["command"],
+                    "collection": item["collection"],
+                    "shape": item["shape"],
+                    "count": item["count"],
+                    "avg_ms": round(item["total_seconds"] / item["count"] * 1000, 3),
+                    "max_ms": round(item["max_seconds"] * 1000, 3),
+                    "avg_documents": round(item["documents"] / item["count"], 2)
+                }
+                for item in queries
+            ],
+            "routes": routes,
+            "slow_queries": list(reversed(self.slow_queries)),
+            "flagged_requests": list(reversed(self.flagged_requests))
+        }
+
+
+# Create singleton instance
+mongo_profiler = MongoProfiler()
+
+
+def mongo_profiler_listener():
+    """Build a pymongo CommandListener that feeds the profiler"""
+    from pymongo import monitoring
+
+    class _Listener(monitoring.CommandListener):
+        def started(self, event):
+            mongo_profiler.started(event)
+
+        def succeeded(self, event):
+            mongo_profiler.succeeded(event)
+
+        def failed(self, event):
+            mongo_profiler.failed(event)
+
+    return _Listener()
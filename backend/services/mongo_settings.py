@@ -0,0 +1,89 @@
+import os
+import logging
+from typing import Dict, Any
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import (
+    Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+)
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest
+}
+
+# Environment variable -> pymongo client option, for integer options passed only when set
+INT_CLIENT_OPTIONS = {
+    "MONGO_MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+    "MONGO_WTIMEOUT_MS": "wTimeoutMS"
+}
+
+
+class MongoSettings:
+    """MongoDB client options and read routing, from the environment.
+
+    Values are read when the client is created in the startup hook, after .env is loaded,
+    so every worker process builds its own pool with the same settings. Options that are
+    not set fall back to the driver defaults or to anything given in MONGO_URL.
+
+    Writes and read-modify-write paths always use the primary. Read-only endpoints use
+    `read_db`, which follows MONGO_READ_PREFERENCE and MONGO_READ_CONCERN.
+    """
+
+    @staticmethod
+    def client_options() -> Dict[str, Any]:
+        options: Dict[str, Any] = {
+            "appname": os.getenv('MONGO_APP_NAME', 'stallion-api'),
+            "maxPoolSize": int(os.getenv('MONGO_MAX_POOL_SIZE', '100')),
+            "minPoolSize": int(os.getenv('MONGO_MIN_POOL_SIZE', '0')),
+            "maxConnecting": int(os.getenv('MONGO_MAX_CONNECTING', '2')),
+            "connectTimeoutMS": int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '10000')),
+            "serverSelectionTimeoutMS": int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '10000'))
+        }
+        for env_name, option in INT_CLIENT_OPTIONS.items():
+            value = os.getenv(env_name)
+            if value:
+                options[option] = int(value)
+
+        write_concern = os.getenv('MONGO_WRITE_CONCERN')
+        if write_concern:
+            options["w"] = int(write_concern) if write_concern.isdigit() else write_concern
+        journal = os.getenv('MONGO_WRITE_JOURNAL')
+        if journal:
+            options["journal"] = journal.lower() == 'true'
+        return options
+
+    @staticmethod
+    def read_options() -> Dict[str, Any]:
+        """Options for the read-only database handle; empty when reads stay on the primary"""
+        mode = os.getenv('MONGO_READ_PREFERENCE', 'primary')
+        if mode not in READ_PREFERENCES:
+            logger.error(f"Unknown MONGO_READ_PREFERENCE {mode!r}, reading from the primary")
+            mode = 'primary'
+
+        options: Dict[str, Any] = {}
+        if mode != 'primary':
+            max_staleness = int(os.getenv('MONGO_MAX_STALENESS_SECONDS', '-1'))
+            options["read_preference"] = READ_PREFERENCES[mode](max_staleness=max_staleness)
+        read_concern = os.getenv('MONGO_READ_CONCERN')
+        if read_concern:
+            options["read_concern"] = ReadConcern(read_concern)
+        return options
+
+    def read_db(self, db):
+        """`db` with the configured read preference and read concern, or `db` itself"""
+        options = self.read_options()
+        if not options:
+            return db
+        logger.info(f"Read-only endpoints use {', '.join(f'{key}={value}' for key, value in options.items())}")
+        return db.with_options(**options)
+
+
+# Create singleton instance
+mongo_settings = MongoSettings()
@@ -0,0 +1,56 @@
+import json
+import base64
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from pymongo import DESCENDING
+
+# Newest first; id breaks ties between documents created in the same millisecond
+SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+
+class InvalidCursorError(ValueError):
+    """The cursor was not produced by encode_cursor"""
+
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    payload = json.dumps({"created_at": document["created_at"].isoformat(), "id": document["id"]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["created_at"]), str(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+
+async def keyset_page(collection, query: Dict[str, Any], projection: Dict[str, Any],
+                      limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """One page of documents ordered by (created_at, id) descending.
+
+    The cursor holds the last (created_at, id) returned, and the next page is a range
+    query that starts after it. With an index on the sort keys, which follow any
+    equality filters, every page costs the same however deep it is.
+    """
+    query = dict(query)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        after = {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": last_id}}
+        ]}
+        query = {"$and": [query, after]} if query else after
+
+    # One extra document tells us whether another page exists without a count
+    documents: List[Dict[str, Any]] = await collection.find(
+        query, projection={**projection, "_id": 0, "created_at": 1, "id": 1}
+    ).sort(SORT).limit(limit + 1).to_list(limit + 1)
+
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    return {
+        "items": documents,
+        "next_cursor": encode_cursor(documents[-1]) if has_more else None
+    }
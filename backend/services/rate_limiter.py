@@ -0,0 +1,146 @@
+import os
+import math
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+rate_limited_requests_total = metrics.counter(
+    "rate_limited_requests_total", "Requests rejected with 429 by admission control", ("limit", "reason")
+)
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by client, refilled continuously at rate_per_minute up to burst.
+
+    Buckets live in an LRU so memory stays bounded no matter how many clients appear.
+    State is per worker process, so the effective limit is multiplied by the worker count.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def _bucket(self, key: str, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            tokens, updated = bucket
+            bucket[0] = min(float(self.burst), tokens + (now - updated) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def retry_after(self, key: str, now: float) -> float:
+        """Seconds until the key has a token, 0 if one is available now"""
+        tokens = self._bucket(key, now)[0]
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self.rate if self.rate > 0 else 60.0
+
+    def consume(self, key: str) -> None:
+        self._buckets[key][0] -= 1
+
+
+class ConcurrencyLimiter:
+    """Caps how many requests of one kind run at once; callers are rejected, never queued.
+
+    The count lives in the worker process, so the cap applies per worker, not per deployment.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active = max(0, self.active - 1)
+
+
+class AdmissionControl:
+    """Per-IP and per-session rate limits plus an upload concurrency cap for expensive endpoints.
+
+    Behind a proxy or ingress every request comes from the proxy's address, so set
+    TRUST_PROXY_HEADERS=true there to key clients by X-Forwarded-For. Sessions are keyed by the
+    X-Session-Id header the frontend sends. Buckets and the upload cap are per worker process.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+        self.trust_proxy_headers = os.getenv('TRUST_PROXY_HEADERS', 'false').lower() == 'true'
+        # (method, path prefix, limit name, takes a rate-limit token), most specific prefix first.
+        # A resumable upload is charged once when it is created; its chunks and finish call
+        # only count against the concurrent upload cap, so a multi-photo order is not refused
+        self.routes: List[Tuple[str, str, str, bool]] = [
+            ("PATCH", "/api/upload-image/resumable/", "upload", False),
+            ("POST", "/api/upload-image/resumable/", "upload", False),
+            ("POST", "/api/upload-image", "upload", True),
+            ("POST", "/api/create-payment-order", "payment_order", True),
+            ("POST", "/api/test-payment-success/", "test_payment", True),
+        ]
+        self.limiters: Dict[str, TokenBucketLimiter] = {
+            "upload": TokenBucketLimiter(
+                float(os.getenv('RATE_LIMIT_UPLOAD_PER_MINUTE', '30')),
+                int(os.getenv('RATE_LIMIT_UPLOAD_BURST', '10'))
+            ),
+            "payment_order": TokenBucketLimiter(
+                float(os.getenv('RATE_LIMIT_PAYMENT_ORDER_PER_MINUTE', '10')),
+                int(os.getenv('RATE_LIMIT_PAYMENT_ORDER_BURST', '5'))
+            ),
+            "test_payment": TokenBucketLimiter(
+                float(os.getenv('RATE_LIMIT_TEST_PAYMENT_PER_MINUTE', '5')),
+                int(os.getenv('RATE_LIMIT_TEST_PAYMENT_BURST', '2'))
+            ),
+        }
+        self.upload_slots = ConcurrencyLimiter(int(os.getenv('MAX_CONCURRENT_UPLOADS', '8')))
+
+    def limit_for(self, method: str, path: str) -> Optional[Tuple[str, bool]]:
+        """Limit name of the request and whether it takes a token, or None if it is not limited"""
+        for route_method, prefix, name, rate_limited in self.routes:
+            if method == route_method and path.startswith(prefix):
+                return name, rate_limited
+        return None
+
+    def client_ip(self, headers, client_host: Optional[str]) -> str:
+        if self.trust_proxy_headers:
+            forwarded = headers.get('x-forwarded-for')
+            if forwarded:
+                return forwarded.split(',')[0].strip()
+        return client_host or 'unknown'
+
+    def check(self, name: str, client_ip: str, session_id: Optional[str]) -> float:
+        """Consume a token for every key of the request; returns Retry-After seconds when refused"""
+        limiter = self.limiters[name]
+        now = time.monotonic()
+        keys = [f"ip:{client_ip}"]
+        if session_id:
+            keys.append(f"session:{session_id}")
+
+        retry_after = max(limiter.retry_after(key, now) for key in keys)
+        if retry_after > 0:
+            rate_limited_requests_total.inc(limit=name, reason="rate")
+            return retry_after
+        for key in keys:
+            limiter.consume(key)
+        return 0.0
+
+    @staticmethod
+    def retry_after_header(seconds: float) -> str:
+        return str(max(1, math.ceil(seconds)))
+
+
+# Create singleton instance
+admission_control = AdmissionControl()
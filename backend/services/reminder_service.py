@@ -0,0 +1,155 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Optional
+from pymongo import ASCENDING, ReturnDocument
+from services.gmail_service import gmail_service
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+def build_payment_link(submission_id: str) -> str:
+    """Build the frontend link a customer uses to complete a pending payment"""
+    return f"{os.environ.get('FRONTEND_URL', 'http://localhost:3000')}/payment/{submission_id}"
+
+
+class ReminderService:
+    """Periodically sweeps abandoned pending_payment orders and sends reminders in small batches.
+
+    Each order is claimed with a lease (reminder_claimed_until) before sending and marked
+    reminder_sent_at once the email went out. If the worker dies mid-send, the claim runs out
+    after REMINDER_CLAIM_SECONDS and a later sweep retries. Every claim counts as an attempt,
+    so an order is tried at most REMINDER_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('REMINDER_SWEEP_ENABLED', 'true').lower() == 'true'
+        self.sweep_interval = int(os.getenv('REMINDER_SWEEP_INTERVAL_SECONDS', '300'))
+        self.stale_after = timedelta(minutes=int(os.getenv('REMINDER_STALE_AFTER_MINUTES', '60')))
+        # Reminder emails promise a 48 hour window, so older checkouts are left alone
+        self.max_age = timedelta(hours=int(os.getenv('REMINDER_MAX_AGE_HOURS', '48')))
+        self.batch_size = int(os.getenv('REMINDER_BATCH_SIZE', '20'))
+        self.send_interval = float(os.getenv('REMINDER_SEND_INTERVAL_SECONDS', '2'))
+        self.max_attempts = int(os.getenv('REMINDER_MAX_ATTEMPTS', '3'))
+        self.claim_seconds = int(os.getenv('REMINDER_CLAIM_SECONDS', '600'))
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self, db) -> None:
+        """Create the index backing the stale order range query"""
+        await db.measurements.create_index(
+            [("order_status", ASCENDING), ("created_at", ASCENDING)],
+            name="order_status_created_at"
+        )
+
+    def start(self, db) -> None:
+        """Start the background sweep loop"""
+        self._db = db
+        if not self.enabled:
+            logger.info("Payment reminder sweeper disabled")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Payment reminder sweeper started (every {self.sweep_interval}s, batch {self.batch_size})")
+
+    async def stop(self) -> None:
+        """Cancel the background sweep loop"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                with tracer.span("background.reminder_sweep"):
+                    await self.sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Payment reminder sweep failed: {str(e)}")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def sweep_once(self) -> int:
+        """Send reminders for one batch of stale pending_payment orders, returns the number sent"""
+        now = datetime.now(timezone.utc)
+        cursor = self._db.measurements.find(
+            {
+                "order_status": "pending_payment",
+                "created_at": {"$gte": now - self.max_age, "$lte": now - self.stale_after},
+                "reminder_sent_at": None,
+                "reminder_attempts": {"$not": {"$gte": self.max_attempts}},
+                "reminder_claimed_until": {"$not": {"$gte": now}}
+            },
+            projection={"_id": 0, "id": 1}
+        ).sort("created_at", ASCENDING).limit(self.batch_size)
+        candidate_ids = [doc["id"] async for doc in cursor]
+
+        sent = 0
+        for submission_id in candidate_ids:
+            submission = await self._claim(submission_id)
+            if not submission:
+                # Paid, failed or claimed by another worker since the query ran
+                continue
+
+            if await self._send(submission):
+                sent += 1
+            await asyncio.sleep(self.send_interval)
+
+        if candidate_ids:
+            logger.info(f"Payment reminder sweep sent {sent}/{len(candidate_ids)} reminders")
+        return sent
+
+    async def _claim(self, submission_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically lease an order for sending so no other sweep or worker sends it meanwhile"""
+        now = datetime.now(timezone.utc)
+        return await self._db.measurements.find_one_and_update(
+            {
+                "id": submission_id,
+                "order_status": "pending_payment",
+                "reminder_sent_at": None,
+                "reminder_attempts": {"$not": {"$gte": self.max_attempts}},
+                # Unclaimed, or claimed by a worker that died before finishing
+                "reminder_claimed_until": {"$not": {"$gte": now}}
+            },
+            {
+                "$set": {"reminder_claimed_until": now + timedelta(seconds=self.claim_seconds)},
+                "$inc": {"reminder_attempts": 1}
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _send(self, submission: Dict[str, Any]) -> bool:
+        submission_id = submission["id"]
+        try:
+            reminder_sent = await gmail_service.send_payment_reminder(
+                submission,
+                build_payment_link(submission_id)
+            )
+        except Exception as e:
+            logger.error(f"Error sending payment reminder for order {submission_id}: {str(e)}")
+            reminder_sent = False
+
+        if reminder_sent:
+            await self._db.measurements.update_one(
+                {"id": submission_id},
+                {"$set": {"reminder_sent_at": datetime.now(timezone.utc)}, "$unset": {"reminder_claimed_until": ""}}
+            )
+        else:
+            # Release the claim so a later sweep can retry, up to max_attempts
+            await self._db.measurements.update_one(
+                {"id": submission_id},
+                {"$unset": {"reminder_claimed_until": ""}}
+            )
+            logger.error(f"Failed to send payment reminder for order {submission_id}")
+        return reminder_sent
+
+
+# Create singleton instance
+reminder_service = ReminderService()
@@ -0,0 +1,185 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Optional
+from zoneinfo import ZoneInfo
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOT_TIMES = (
+    "09:00,09:30,10:00,10:30,11:00,11:30,12:00,12:30,"
+    "14:00,14:30,15:00,15:30,16:00,16:30,17:00,17:30,18:00"
+)
+
+
+class SlotUnavailableError(Exception):
+    """The requested fitting slot is not bookable or already full"""
+
+
+def parse_capacities(value: str) -> Dict[str, int]:
+    """Parse 'stylist:capacity,...'; a stylist without a number can take one fitting per slot"""
+    capacities: Dict[str, int] = {}
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, capacity = item.partition(':')
+        capacities[name.strip()] = int(capacity) if capacity else 1
+    return capacities
+
+
+class FittingScheduler:
+    """Fixed fitting slots with a capacity per stylist.
+
+    Bookings are counted in fitting_slots, one document per (date, time, stylist), and a
+    booking is a conditional $inc that only succeeds while the stylist has room, so two
+    workers can never overbook a slot. Each worker keeps the counts for the booking window
+    in memory; the booking path updates it and a periodic refresh picks up other workers'
+    bookings, so the availability endpoint never queries MongoDB.
+    """
+
+    def __init__(self):
+        self.slot_times = [slot.strip() for slot in os.getenv('FITTING_SLOT_TIMES', DEFAULT_SLOT_TIMES).split(',') if slot.strip()]
+        self.capacities = parse_capacities(os.getenv('FITTING_STYLISTS', 'stylist_1:1,stylist_2:1'))
+        self.days_ahead = int(os.getenv('FITTING_BOOKING_DAYS_AHEAD', '30'))
+        self.closed_weekdays = {int(day) for day in os.getenv('FITTING_CLOSED_WEEKDAYS', '6').split(',') if day.strip()}
+        self.timezone = ZoneInfo(os.getenv('FITTING_TIMEZONE', 'Asia/Kolkata'))
+        self.refresh_interval = int(os.getenv('FITTING_INDEX_REFRESH_SECONDS', '30'))
+        # date -> time -> stylist -> booked count
+        self._booked: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self, db) -> None:
+        """Create the index backing the booking window reload"""
+        await db.fitting_slots.create_index([("date", ASCENDING)], name="date")
+
+    def start(self, db) -> None:
+        """Load the booking window and keep it fresh in the background"""
+        self._db = db
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                with tracer.span("background.fitting_index_refresh"):
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Fitting availability refresh failed: {str(e)}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def _today(self) -> date:
+        return datetime.now(self.timezone).date()
+
+    def bookable_dates(self) -> List[str]:
+        """Dates customers can book: tomorrow through the booking window, open days only"""
+        today = self._today()
+        dates = []
+        for offset in range(1, self.days_ahead + 1):
+            day = today + timedelta(days=offset)
+            if day.weekday() not in self.closed_weekdays:
+                dates.append(day.isoformat())
+        return dates
+
+    async def refresh(self) -> None:
+        """Rebuild the in-memory counts for the booking window with one range query"""
+        dates = self.bookable_dates()
+        if not dates:
+            self._booked = {}
+            return
+        booked: Dict[str, Dict[str, Dict[str, int]]] = {}
+        cursor = self._db.fitting_slots.find(
+            {"date": {"$gte": dates[0], "$lte": dates[-1]}},
+            projection={"_id": 0, "date": 1, "time": 1, "stylist": 1, "booked": 1}
+        )
+        async for slot in cursor:
+            booked.setdefault(slot["date"], {}).setdefault(slot["time"], {})[slot["stylist"]] = slot["booked"]
+        self._booked = booked
+
+    def _free(self, day: str, time: str) -> Dict[str, int]:
+        counts = self._booked.get(day, {}).get(time, {})
+        return {
+            stylist: capacity - counts.get(stylist, 0)
+            for stylist, capacity in self.capacities.items()
+            if capacity - counts.get(stylist, 0) > 0
+        }
+
+    def availability(self, day: str) -> Dict[str, Any]:
+        """Open slots for one date, answered from memory"""
+        if day not in self.bookable_dates():
+            return {"date": day, "slots": []}
+        slots = []
+        for time in self.slot_times:
+            free = sum(self._free(day, time).values())
+            if free > 0:
+                slots.append({"time": time, "available": free})
+        return {"date": day, "slots": slots}
+
+    async def book(self, day: str, time: str) -> Dict[str, Any]:
+        """Atomically take one place in a slot, trying the least busy stylist first"""
+        if day not in self.bookable_dates() or time not in self.slot_times:
+            raise SlotUnavailableError(f"{day} {time} is not a bookable fitting slot")
+
+        candidates = sorted(self._free(day, time).items(), key=lambda item: -item[1])
+        # The index may be stale, so stylists it believes are full are still tried last
+        candidates += [(stylist, 0) for stylist in self.capacities if stylist not in dict(candidates)]
+        for stylist, _ in candidates:
+            slot = await self._take(day, time, stylist)
+            if slot is not None:
+                return slot
+
+        raise SlotUnavailableError(f"{day} {time} is fully booked")
+
+    async def _take(self, day: str, time: str, stylist: str) -> Optional[Dict[str, Any]]:
+        """One place with this stylist, or None when their slot is full"""
+        capacity = self.capacities[stylist]
+        slot_id = f"{day}T{time}|{stylist}"
+        # A duplicate key means the slot document exists and the filter did not match it. Either
+        # it is full, or another first booking inserted it concurrently, so try once more.
+        for _ in range(2):
+            try:
+                slot = await self._db.fitting_slots.find_one_and_update(
+                    {"_id": slot_id, "booked": {"$lt": capacity}},
+                    {"$inc": {"booked": 1}, "$setOnInsert": {"date": day, "time": time, "stylist": stylist}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                continue
+            self._set_count(day, time, stylist, slot["booked"])
+            return {"slot_id": slot_id, "date": day, "time": time, "stylist": stylist}
+        self._set_count(day, time, stylist, capacity)
+        return None
+
+    async def release(self, slot_id: str) -> None:
+        """Give back a place taken by book(), e.g. when saving the booking failed"""
+        slot = await self._db.fitting_slots.find_one_and_update(
+            {"_id": slot_id, "booked": {"$gt": 0}},
+            {"$inc": {"booked": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if slot:
+            self._set_count(slot["date"], slot["time"], slot["stylist"], slot["booked"])
+
+    def _set_count(self, day: str, time: str, stylist: str, booked: int) -> None:
+        self._booked.setdefault(day, {}).setdefault(time, {})[stylist] = booked
+
+
+# Create singleton instance
+fitting_scheduler = FittingScheduler()
@@ -1,22 +1,33 @@
 import os
-import gspread
-from google.oauth2.service_account import Credentials
+import asyncio
 from typing import Dict, Any, List
 import logging
 from datetime import datetime
 import json
+from services.metrics import track_external
 
 logger = logging.getLogger(__name__)
 
 class SheetsService:
     def __init__(self):
         self.sheet_id = os.getenv('GOOGLE_SHEET_ID')
-        self.client = None
-        self._initialize_client()
+        self._client = None
+        self._client_initialized = False
+        self._worksheet = None
+    
+    @property
+    def client(self):
+        """Google Sheets client, created on first use"""
+        if not self._client_initialized:
+            self._client_initialized = True
+            self._initialize_client()
+        return self._client
     
     def _initialize_client(self):
         """Initialize Google Sheets client using service account"""
         try:
+            import gspread
+            
             service_account_path = os.getenv('GOOGLE_SERVICE_ACCOUNT_PATH')
             logger.info(f"Looking for service account at: {service_account_path}")
             
@@ -27,15 +38,28 @@ class SheetsService:
             
             if os.path.exists(service_account_path):
                 # Use the service account file
-                self.client = gspread.service_account(filename=service_account_path)
+                self._client = gspread.service_account(filename=service_account_path)
                 logger.info(f"✅ Google Sheets client initialized with service account: {service_account_path}")
             else:
                 logger.error(f"❌ Service account file not found at: {service_account_path}")
-                self.client = None
+                self._client = None
                 
         except Exception as e:
             logger.error(f"Failed to initialize Google Sheets client: {str(e)}")
-            self.client = None
+            self._client = None
+    
+    def _get_worksheet(self):
+        """First worksheet of the order sheet, opened once and reused"""
+        if self._worksheet is None:
+            with track_external("sheets", "open_worksheet"):
+                self._worksheet = self.client.open_by_key(self.sheet_id).get_worksheet(0)
+        return self._worksheet
+    
+    async def warm_up(self) -> bool:
+        """Create the client, fetch an access token and open the worksheet before the first order"""
+        if not self.sheet_id or self.sheet_id == 'your_sheet_id_here':
+            return False
+        return await asyncio.to_thread(lambda: self.client is not None and self._get_worksheet() is not None)
     
     async def push_order_data(self, order_data: Dict[str, Any], payment_id: str) -> bool:
         """Push order data to Google Sheets"""
@@ -49,8 +73,7 @@ class SheetsService:
                 return False
             
             # Open the spreadsheet
-            sheet = self.client.open_by_key(self.sheet_id)
-            worksheet = sheet.get_worksheet(0)  # First worksheet
+            worksheet = self._get_worksheet()
             
             # Calculate total amount (assuming base price of 450 per item)
             base_price = 450
@@ -107,13 +130,16 @@ class SheetsService:
             ]
             
             # Append the row to the sheet
-            worksheet.append_row(row_data)
+            with track_external("sheets", "append_row"):
+                worksheet.append_row(row_data)
             
             logger.info(f"Order data pushed to Google Sheets successfully. Order ID: {order_data['id']}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to push order data to Google Sheets: {str(e)}")
+            # Open the worksheet again next time in case it was deleted or its access was revoked
+            self._worksheet = None
             return False
     
     async def setup_sheet_headers(self) -> bool:
@@ -123,11 +149,13 @@ class SheetsService:
                 logger.error("Google Sheets client not initialized or Sheet ID not configured")
                 return False
             
-            sheet = self.client.open_by_key(self.sheet_id)
-            worksheet = sheet.get_worksheet(0)
+            with track_external("sheets", "open_worksheet"):
+                sheet = self.client.open_by_key(self.sheet_id)
+                worksheet = sheet.get_worksheet(0)
             
             # Check if headers already exist
-            existing_headers = worksheet.row_values(1)
+            with track_external("sheets", "row_values"):
+                existing_headers = worksheet.row_values(1)
             if existing_headers:
                 logger.info("Sheet headers already exist")
                 return True
@@ -142,10 +170,12 @@ class SheetsService:
             ]
             
             # Insert headers
-            worksheet.insert_row(headers, 1)
+            with track_external("sheets", "insert_row"):
+                worksheet.insert_row(headers, 1)
             
             # Format headers (make them bold)
-            worksheet.format('1:1', {'textFormat': {'bold': True}})
+            with track_external("sheets", "format"):
+                worksheet.format('1:1', {'textFormat': {'bold': True}})
             
             logger.info("Sheet headers set up successfully")
             return True
@@ -161,18 +191,21 @@ class SheetsService:
                 logger.error("Google Sheets client not initialized")
                 return None
             
-            sheet = self.client.open_by_key(self.sheet_id)
-            worksheet = sheet.get_worksheet(0)
+            with track_external("sheets", "open_worksheet"):
+                sheet = self.client.open_by_key(self.sheet_id)
+                worksheet = sheet.get_worksheet(0)
             
             # Find the order by ID (assuming Order ID is in column B)
-            cell = worksheet.find(order_id)
+            with track_external("sheets", "find"):
+                cell = worksheet.find(order_id)
             if not cell:
                 logger.warning(f"Order {order_id} not found in sheets")
                 return None
             
             # Get the entire row
-            row_values = worksheet.row_values(cell.row)
-            headers = worksheet.row_values(1)
+            with track_external("sheets", "row_values"):
+                row_values = worksheet.row_values(cell.row)
+                headers = worksheet.row_values(1)
             
             # Create dictionary from headers and values
             order_data = dict(zip(headers, row_values))
@@ -0,0 +1,133 @@
+import os
+import html
+import time
+import logging
+from pathlib import Path
+from string import Template
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+from services.metrics import email_template_render_seconds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE_DIR = Path(__file__).parent.parent / 'templates' / 'emails'
+
+# A compiled template is a flat list of (literal, placeholder) pairs; placeholder is None for trailing text
+CompiledTemplate = List[Tuple[str, Optional[str]]]
+
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    text: str
+    html: Optional[str]
+
+
+class EmailTemplateEngine:
+    """Loads email templates from disk once, compiles them and renders text and HTML parts.
+
+    Each template ``<name>`` is made of ``<name>.txt`` (first line ``Subject: ...``) and an
+    optional ``<name>.html``. Templates use ``$placeholder`` syntax. Values are HTML escaped in
+    the HTML part unless the placeholder name ends in ``_html``.
+    """
+
+    def __init__(self, template_dir: Optional[str] = None):
+        self.template_dir = Path(template_dir or os.getenv('EMAIL_TEMPLATE_DIR') or DEFAULT_TEMPLATE_DIR)
+        self._templates: Dict[str, Dict[str, CompiledTemplate]] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def _compile(source: str) -> CompiledTemplate:
+        """Split a template into literal chunks and placeholder names"""
+        compiled: CompiledTemplate = []
+        position = 0
+        for match in Template.pattern.finditer(source):
+            literal = source[position:match.start()]
+            if match.group('escaped') is not None:
+                literal += '$'
+                compiled.append((literal, None))
+            else:
+                name = match.group('named') or match.group('braced')
+                if name is None:
+                    raise ValueError(f"Invalid placeholder at offset {match.start()}")
+                compiled.append((literal, name))
+            position = match.end()
+        compiled.append((source[position:], None))
+        return compiled
+
+    def load(self) -> None:
+        """Read and compile every template in the template directory"""
+        templates: Dict[str, Dict[str, CompiledTemplate]] = {}
+        for text_path in sorted(self.template_dir.glob('*.txt')):
+            name = text_path.stem
+            source = text_path.read_text(encoding='utf-8')
+            parts: Dict[str, CompiledTemplate] = {}
+
+            first_line, _, rest = source.partition('\n')
+            if first_line.startswith('Subject:'):
+                parts['subject'] = self._compile(first_line[len('Subject:'):].strip())
+                source = rest
+            parts['text'] = self._compile(source)
+
+            html_path = text_path.with_suffix('.html')
+            if html_path.exists():
+                parts['html'] = self._compile(html_path.read_text(encoding='utf-8'))
+
+            templates[name] = parts
+            self._stats.setdefault(name, {"renders": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+
+        self._templates = templates
+        logger.info(f"Loaded {len(templates)} email templates from {self.template_dir}")
+
+    def reload(self) -> None:
+        """Pick up edited template files without restarting"""
+        self.load()
+
+    @staticmethod
+    def _render_part(compiled: CompiledTemplate, context: Dict[str, Any], escape: bool) -> str:
+        chunks = []
+        for literal, name in compiled:
+            chunks.append(literal)
+            if name is not None:
+                value = context[name]
+                value = '' if value is None else str(value)
+                if escape and not name.endswith('_html'):
+                    value = html.escape(value)
+                chunks.append(value)
+        return ''.join(chunks)
+
+    def render(self, name: str, context: Dict[str, Any]) -> RenderedEmail:
+        """Render the subject, text and HTML parts of a template"""
+        if not self._templates:
+            self.load()
+        parts = self._templates.get(name)
+        if parts is None:
+            raise KeyError(f"Email template not found: {name}")
+
+        started = time.perf_counter()
+        subject = self._render_part(parts['subject'], context, escape=False) if 'subject' in parts else ''
+        text = self._render_part(parts['text'], context, escape=False)
+        html_body = self._render_part(parts['html'], context, escape=True) if 'html' in parts else None
+        elapsed = time.perf_counter() - started
+
+        stats = self._stats[name]
+        stats["renders"] += 1
+        stats["total_seconds"] += elapsed
+        stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+        email_template_render_seconds.observe(elapsed, template=name)
+
+        return RenderedEmail(subject, text, html_body)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Render counts and timings per template"""
+        return {
+            name: {
+                "renders": values["renders"],
+                "total_seconds": values["total_seconds"],
+                "avg_ms": (values["total_seconds"] / values["renders"] * 1000) if values["renders"] else 0.0,
+                "max_ms": values["max_seconds"] * 1000
+            }
+            for name, values in self._stats.items()
+        }
+
+
+# Create singleton instance
+template_engine = EmailTemplateEngine()
@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class TraceContext(NamedTuple):
+    """The identifiers needed to continue a trace in background work"""
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "attributes",
+                 "start_time", "_started", "duration", "status", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    @property
+    def context(self) -> TraceContext:
+        return TraceContext(self.trace_id, self.span_id, self.sampled)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": datetime.fromtimestamp(self.start_time, timezone.utc).isoformat(),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class ConsoleExporter:
+    def export(self, span: Span) -> None:
+        logger.info(f"TRACE {json.dumps(span.to_dict(), default=str)}")
+
+    def shutdown(self) -> None:
+        pass
+
+
+class FileExporter:
+    """Appends finished spans as JSON lines from a writer thread so the event loop never touches the file.
+
+    The thread is started by the first export in each process, not at import, so workers
+    forked from a preloaded master (gunicorn ``--preload``) each get their own writer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A thread started before a fork does not exist in the child; start over with a fresh queue
+            self._queue = queue.SimpleQueue()
+            self._thread = threading.Thread(target=self._write, args=(self._queue,), name="trace-file-exporter", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def export(self, span: Span) -> None:
+        self._ensure_started()
+        self._queue.put(span.to_dict())
+
+    def _write(self, records: "queue.SimpleQueue[Optional[Dict[str, Any]]]") -> None:
+        with open(self.path, "a", encoding="utf-8") as trace_file:
+            while True:
+                record = records.get()
+                if record is None:
+                    break
+                trace_file.write(json.dumps(record, default=str) + "\n")
+                if records.empty():
+                    trace_file.flush()
+
+    def shutdown(self) -> None:
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._pid = None
+        self._thread = None
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Minimal span tracer with a console or JSON-lines file exporter.
+
+    TRACE_EXPORTER selects ``none`` (default), ``console`` or ``file``; the file exporter
+    writes to TRACE_FILE. TRACE_SAMPLE_RATE sets the fraction of new traces that are kept.
+    """
+
+    def __init__(self):
+        exporter_name = os.getenv('TRACE_EXPORTER', 'none').lower()
+        self.sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))
+        self.exporter = None
+        if exporter_name == 'console':
+            self.exporter = ConsoleExporter()
+        elif exporter_name == 'file':
+            self.exporter = FileExporter(os.getenv('TRACE_FILE', 'traces.jsonl'))
+        self.enabled = self.exporter is not None
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def current_context(self) -> Optional[TraceContext]:
+        """Context to hand to background work so it joins the current trace"""
+        span = _current_span.get()
+        return span.context if span is not None else None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        span = _current_span.get()
+        if span is not None:
+            span.set_attribute(key, value)
+
+    def start_span(self, name: str, parent: Optional[TraceContext] = None, **attributes) -> Span:
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        if parent is not None:
+            return Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+        sampled = self.enabled and random.random() < self.sample_rate
+        return Span(name, f"{random.getrandbits(128):032x}", None, sampled, attributes)
+
+    def finish_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.end()
+        if error is not None:
+            span.status = "error"
+            span.error = f"{type(error).__name__}: {error}"
+        if span.sampled and self.exporter is not None:
+            try:
+                self.exporter.export(span)
+            except Exception as e:
+                logger.error(f"Failed to export span {span.name}: {str(e)}")
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[TraceContext] = None, **attributes):
+        """Run a block inside a new span that becomes the current span"""
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.finish_span(span, e)
+            raise
+        else:
+            self.finish_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[TraceContext]:
+    """Read a W3C traceparent header so callers can join their own traces"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return TraceContext(parts[1], parts[2], parts[3] == "01")
+
+
+class MongoCommandTracer:
+    """pymongo command listener that records a span per Mongo command"""
+
+    def __init__(self, tracer: "Tracer"):
+        self.tracer = tracer
+        self._spans: Dict[tuple, Span] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event) -> None:
+        # Motor copies the caller's context into its executor, so the request span is visible here
+        current = _current_span.get()
+        if current is None or not current.sampled:
+            return
+        collection = event.command.get(event.command_name)
+        span = self.tracer.start_span(
+            f"mongo.{event.command_name}",
+            database=event.database_name,
+            collection=collection if isinstance(collection, str) else None
+        )
+        with self._lock:
+            self._spans[(event.connection_id, event.request_id)] = span
+
+    def _finish(self, event, error: Optional[str] = None) -> None:
+        with self._lock:
+            span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is None:
+            return
+        # Use the driver's own timing rather than listener scheduling delays
+        span.duration = event.duration_micros / 1_000_000
+        if error:
+            span.status = "error"
+            span.error = error
+        self.tracer.finish_span(span)
+
+    def succeeded(self, event) -> None:
+        self._finish(event)
+
+    def failed(self, event) -> None:
+        self._finish(event, str(event.failure))
+
+
+# Create singleton instance
+tracer = Tracer()
+
+
+def mongo_trace_listener():
+    """Build a pymongo CommandListener that records Mongo command spans"""
+    from pymongo import monitoring
+
+    class _Listener(MongoCommandTracer, monitoring.CommandListener):
+        pass
+
+    return _Listener(tracer)
+
+
+def _print_trace(spans: List[Dict[str, Any]]) -> None:
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    span_ids = {span["span_id"] for span in spans}
+    for span in sorted(spans, key=lambda item: item["start"]):
+        parent = span["parent_id"] if span["parent_id"] in span_ids else None
+        children.setdefault(parent, []).append(span)
+
+    def walk(parent_id: Optional[str], depth: int) -> None:
+        for span in children.get(parent_id, []):
+            attributes = ", ".join(f"{key}={value}" for key, value in span["attributes"].items() if value is not None)
+            print(f"{'  ' * depth}{span['name']}  {span['duration_ms']:.1f} ms  [{span['status']}]  {attributes}")
+            walk(span["span_id"], depth + 1)
+
+    walk(None, 0)
+
+
+if __name__ == "__main__":
+    # Rebuild traces from a file exporter output:
+    #   python -m services.tracing traces.jsonl [trace_id or submission_id]
+    if len(sys.argv) < 2:
+        print("Usage: python -m services.tracing <trace file> [trace_id | submission_id]")
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding="utf-8") as trace_file:
+        records = [json.loads(line) for line in trace_file if line.strip()]
+
+    if len(sys.argv) > 2:
+        wanted = sys.argv[2]
+        trace_ids = {
+            record["trace_id"] for record in records
+            if record["trace_id"] == wanted or record["attributes"].get("submission_id") == wanted
+        }
+        records = [record for record in records if record["trace_id"] in trace_ids]
+
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        traces.setdefault(record["trace_id"], []).append(record)
+    for trace_id, spans in traces.items():
+        print(f"Trace {trace_id}")
+        _print_trace(spans)
+        print()
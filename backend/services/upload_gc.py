@@ -0,0 +1,197 @@
+import os
+import time
+import socket
+import asyncio
+import logging
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Set
+from pymongo.errors import DuplicateKeyError
+from services.tracing import tracer
+from services.archive_service import archive_service
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = ("front_view", "side_view", "reference_fit")
+
+
+def upload_filename(url: Optional[str]) -> Optional[str]:
+    """File name inside uploads/ for a stored image URL, absolute or relative"""
+    if not url or "/uploads/" not in url:
+        return None
+    name = url.rsplit("/uploads/", 1)[1].split("?", 1)[0]
+    return name or None
+
+
+class UploadGarbageCollector:
+    """Deletes files in uploads/ that no submission refers to.
+
+    The referenced set is built in one streaming pass over db.measurements and the archive
+    (images only), then compared with the directory listing. Files younger than the grace period are kept,
+    because a customer uploads photos before the submission that refers to them is saved.
+
+    Deleting is off by default (UPLOAD_GC_DRY_RUN=true). When it is on, a pass refuses to delete
+    anything if no submission refers to any upload, or if more than UPLOAD_GC_MAX_ORPHAN_RATIO
+    of the files would go, since that means the worker is looking at the wrong or an empty
+    database. The scheduled pass first waits one interval and then runs on one worker at a
+    time, under a lease in db.background_leases.
+    """
+
+    LEASE_ID = "upload_gc"
+
+    def __init__(self):
+        self.enabled = os.getenv('UPLOAD_GC_ENABLED', 'true').lower() == 'true'
+        self.interval = int(os.getenv('UPLOAD_GC_INTERVAL_SECONDS', '21600'))
+        self.grace_seconds = int(os.getenv('UPLOAD_GC_GRACE_HOURS', '48')) * 3600
+        self.dry_run = os.getenv('UPLOAD_GC_DRY_RUN', 'true').lower() == 'true'
+        self.max_orphan_ratio = float(os.getenv('UPLOAD_GC_MAX_ORPHAN_RATIO', '0.5'))
+        self.batch_size = int(os.getenv('UPLOAD_GC_BATCH_SIZE', '1000'))
+        self.upload_dir = Path(os.getenv('UPLOAD_DIR', 'uploads'))
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db) -> None:
+        """Start the background collection loop"""
+        self._db = db
+        if not self.enabled:
+            logger.info("Upload garbage collector disabled")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Upload garbage collector started (every {self.interval}s, dry run {self.dry_run})")
+
+    async def stop(self) -> None:
+        """Cancel the background collection loop"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # Sleep first, so a worker started against the wrong database can be stopped in time
+            await asyncio.sleep(self.interval)
+            try:
+                if not await self._acquire_lease():
+                    continue
+                with tracer.span("background.upload_gc"):
+                    await self.collect(dry_run=self.dry_run)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Upload garbage collection failed: {str(e)}")
+
+    async def _acquire_lease(self) -> bool:
+        """Take the collector lease for one interval; False while another worker holds it"""
+        now = datetime.now(timezone.utc)
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            await self._db.background_leases.find_one_and_update(
+                {"_id": self.LEASE_ID, "$or": [{"lease_until": {"$lt": now}}, {"owner": owner}]},
+                {"$set": {"owner": owner, "lease_until": now + timedelta(seconds=self.interval)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The lease exists and is held by another worker, so the upsert collided with it
+            return False
+        return True
+
+    async def referenced_files(self) -> Set[str]:
+        """Names of every upload a live or archived submission points to, streamed in batches"""
+        referenced: Set[str] = set()
+        # Archived records keep their images, so photos of archived orders are not collected
+        for collection in (self._db.measurements, self._db[archive_service.collection_name]):
+            cursor = collection.find(
+                {"images": {"$ne": None}},
+                projection={"_id": 0, "images": 1}
+            ).batch_size(self.batch_size)
+            async for doc in cursor:
+                images = doc.get("images") or {}
+                for field in IMAGE_FIELDS:
+                    name = upload_filename(images.get(field))
+                    if name:
+                        referenced.add(name)
+        return referenced
+
+    def _scan(self, referenced: Set[str], now: float) -> Dict[str, Any]:
+        files = 0
+        total_bytes = 0
+        orphans: List[Dict[str, Any]] = []
+        in_grace = 0
+        if self.upload_dir.exists():
+            for entry in os.scandir(self.upload_dir):
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                stat = entry.stat()
+                files += 1
+                total_bytes += stat.st_size
+                if entry.name in referenced:
+                    continue
+                if now - stat.st_mtime < self.grace_seconds:
+                    in_grace += 1
+                    continue
+                orphans.append({"filename": entry.name, "bytes": stat.st_size,
+                                "age_hours": round((now - stat.st_mtime) / 3600, 1)})
+        return {"files": files, "bytes": total_bytes, "orphans": orphans, "in_grace": in_grace}
+
+    def _delete(self, orphans: List[Dict[str, Any]]) -> int:
+        deleted = 0
+        for orphan in orphans:
+            try:
+                (self.upload_dir / orphan["filename"]).unlink()
+                deleted += 1
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.error(f"Could not delete orphaned upload {orphan['filename']}: {str(e)}")
+        return deleted
+
+    def _refusal(self, referenced: int, files: int, orphans: int) -> Optional[str]:
+        """Why deleting these orphans looks unsafe, or None"""
+        if not orphans:
+            return None
+        if referenced == 0:
+            return "no submission refers to any upload, is this the right database?"
+        if orphans > files * self.max_orphan_ratio:
+            return f"more than {self.max_orphan_ratio:.0%} of uploads would be deleted"
+        return None
+
+    async def collect(self, dry_run: bool = True) -> Dict[str, Any]:
+        """Find orphaned uploads past the grace period and delete them unless dry_run"""
+        started = time.time()
+        referenced = await self.referenced_files()
+        scan = await asyncio.to_thread(self._scan, referenced, started)
+        orphans = scan["orphans"]
+        refused = None if dry_run else self._refusal(len(referenced), scan["files"], len(orphans))
+        if refused:
+            logger.error(f"Upload GC refused to delete {len(orphans)} of {scan['files']} files: {refused}")
+        deleted = 0 if dry_run or refused else await asyncio.to_thread(self._delete, orphans)
+
+        report = {
+            "dry_run": dry_run,
+            "ran_at": started,
+            "duration_seconds": round(time.time() - started, 3),
+            "referenced": len(referenced),
+            "files": scan["files"],
+            "bytes": scan["bytes"],
+            "in_grace_period": scan["in_grace"],
+            "orphans": len(orphans),
+            "orphan_bytes": sum(orphan["bytes"] for orphan in orphans),
+            "deleted": deleted,
+            "refused": refused,
+            "orphan_files": orphans[:100]
+        }
+        self.last_report = report
+        if orphans and not refused:
+            action = "would delete" if dry_run else "deleted"
+            logger.info(f"Upload GC {action} {len(orphans) if dry_run else deleted} orphaned files "
+                        f"({report['orphan_bytes']} bytes) of {scan['files']}")
+        return report
+
+
+# Create singleton instance
+upload_gc = UploadGarbageCollector()
@@ -0,0 +1,232 @@
+import os
+import json
+import fcntl
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Any, AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_CONTENT_TYPES = ["image/jpeg", "image/jpg", "image/png", "image/webp"]
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
+ALLOWED_IMAGE_TYPES = {"front_view", "side_view", "reference_fit"}
+
+
+class UploadError(Exception):
+    """Raised for client errors in the resumable upload protocol"""
+
+    def __init__(self, status_code: int, detail: str, offset: Optional[int] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.offset = offset
+
+
+class ResumableUploadService:
+    """Chunked, resumable photo uploads.
+
+    An upload is created with its total size, then chunks are appended at the current
+    offset. The partial file on disk is the source of truth for the offset, so after a
+    dropped connection the client asks for the offset and resends only the missing bytes.
+    Finishing checks the size and SHA-256 and moves the file into the public uploads dir.
+
+    Appends and finish hold an exclusive flock on the partial file while they check the
+    offset and write, so workers sharing the directory can never interleave two chunks.
+    A request that finds the file locked gets 409 with the current offset and retries.
+    """
+
+    def __init__(self):
+        self.upload_dir = Path(os.getenv('UPLOAD_DIR', 'uploads'))
+        self.partial_dir = Path(os.getenv('RESUMABLE_UPLOAD_DIR', 'uploads_partial'))
+        self.max_bytes = int(os.getenv('RESUMABLE_UPLOAD_MAX_BYTES', str(20 * 1024 * 1024)))
+        self.chunk_size = int(os.getenv('RESUMABLE_UPLOAD_CHUNK_BYTES', str(512 * 1024)))
+        self.expiry_seconds = int(os.getenv('RESUMABLE_UPLOAD_EXPIRY_HOURS', '24')) * 3600
+        self.cleanup_interval = int(os.getenv('RESUMABLE_UPLOAD_CLEANUP_INTERVAL_SECONDS', '3600'))
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _paths(self, upload_id: str):
+        # upload_id is always a UUID we generated; reject anything else before touching the disk
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            raise UploadError(404, "Upload not found")
+        return self.partial_dir / f"{upload_id}.part", self.partial_dir / f"{upload_id}.json"
+
+    def _load_metadata(self, upload_id: str) -> Dict[str, Any]:
+        data_path, meta_path = self._paths(upload_id)
+        if not meta_path.exists() or not data_path.exists():
+            raise UploadError(404, "Upload not found")
+        return json.loads(meta_path.read_text())
+
+    @staticmethod
+    def _try_flock(handle, data_path: Path) -> None:
+        """Lock the partial file against other workers, or 409 if one is writing it"""
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError(409, "Upload is being written by another request", offset=data_path.stat().st_size)
+        # A finish in another worker may have published the file between our open and the lock
+        try:
+            if os.stat(data_path).st_ino != os.fstat(handle.fileno()).st_ino:
+                raise FileNotFoundError
+        except FileNotFoundError:
+            raise UploadError(404, "Upload not found")
+
+    def _lock(self, upload_id: str) -> asyncio.Lock:
+        lock = self._locks.get(upload_id)
+        if lock is None:
+            lock = self._locks[upload_id] = asyncio.Lock()
+        return lock
+
+    def create(self, filename: str, content_type: str, image_type: str, total_size: int) -> Dict[str, Any]:
+        """Start a new upload and return its ID"""
+        if content_type not in ALLOWED_CONTENT_TYPES:
+            raise UploadError(400, f"Invalid file type. Allowed: {', '.join(ALLOWED_CONTENT_TYPES)}")
+        if image_type not in ALLOWED_IMAGE_TYPES:
+            raise UploadError(400, f"Invalid image type. Allowed: {', '.join(sorted(ALLOWED_IMAGE_TYPES))}")
+        if total_size <= 0 or total_size > self.max_bytes:
+            raise UploadError(413, f"File size must be between 1 byte and {self.max_bytes} bytes")
+
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else 'jpg'
+        if extension not in ALLOWED_EXTENSIONS:
+            extension = 'jpg'
+
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        upload_id = str(uuid.uuid4())
+        data_path, meta_path = self._paths(upload_id)
+        data_path.touch()
+        meta_path.write_text(json.dumps({
+            "upload_id": upload_id,
+            "image_type": image_type,
+            "extension": extension,
+            "content_type": content_type,
+            "total_size": total_size,
+            "created_at": time.time()
+        }))
+
+        logger.info(f"Resumable upload {upload_id} created for {image_type} ({total_size} bytes)")
+        return {"upload_id": upload_id, "offset": 0, "total_size": total_size, "chunk_size": self.chunk_size}
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """Current offset, so a client knows which bytes still need to be sent"""
+        metadata = self._load_metadata(upload_id)
+        data_path, _ = self._paths(upload_id)
+        return {"upload_id": upload_id, "offset": data_path.stat().st_size, "total_size": metadata["total_size"]}
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """Append a chunk that starts at offset; a stale offset gets 409 with the real one"""
+        async with self._lock(upload_id):
+            metadata = self._load_metadata(upload_id)
+            data_path, _ = self._paths(upload_id)
+            written = 0
+            with open(data_path, "ab") as partial_file:
+                self._try_flock(partial_file, data_path)
+                current = os.fstat(partial_file.fileno()).st_size
+                if offset != current:
+                    raise UploadError(409, "Upload offset mismatch", offset=current)
+
+                async for chunk in chunks:
+                    if current + written + len(chunk) > metadata["total_size"]:
+                        partial_file.truncate(current)
+                        raise UploadError(413, "Chunk goes past the declared file size", offset=current)
+                    await asyncio.to_thread(partial_file.write, chunk)
+                    written += len(chunk)
+
+            # Touch the metadata so active uploads are not cleaned up as abandoned
+            os.utime(self._paths(upload_id)[1])
+            return {"upload_id": upload_id, "offset": current + written, "total_size": metadata["total_size"]}
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as source:
+            for block in iter(lambda: source.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    async def finish(self, upload_id: str, sha256: str) -> Dict[str, Any]:
+        """Verify size and checksum, then publish the file under /uploads"""
+        async with self._lock(upload_id):
+            metadata = self._load_metadata(upload_id)
+            data_path, meta_path = self._paths(upload_id)
+            with open(data_path, "r+b") as partial_file:
+                self._try_flock(partial_file, data_path)
+                size = os.fstat(partial_file.fileno()).st_size
+                if size != metadata["total_size"]:
+                    raise UploadError(409, "Upload is incomplete", offset=size)
+
+                actual = await asyncio.to_thread(self._sha256, data_path)
+                if actual != sha256.lower():
+                    # Corrupt data cannot be repaired by resending a tail, so start over
+                    partial_file.truncate(0)
+                    raise UploadError(422, "Checksum mismatch, upload restarted", offset=0)
+
+                self.upload_dir.mkdir(exist_ok=True)
+                unique_filename = f"{upload_id}_{metadata['image_type']}.{metadata['extension']}"
+                # Still locked, so no append can land in the file after it is published
+                os.replace(data_path, self.upload_dir / unique_filename)
+                meta_path.unlink(missing_ok=True)
+        self._locks.pop(upload_id, None)
+
+        logger.info(f"Resumable upload {upload_id} finished: /uploads/{unique_filename}")
+        return {
+            "status": "success",
+            "file_url": f"/uploads/{unique_filename}",
+            "filename": unique_filename,
+            "image_type": metadata["image_type"]
+        }
+
+    def cleanup_expired(self) -> int:
+        """Delete partial uploads that have not received data within the expiry window"""
+        if not self.partial_dir.exists():
+            return 0
+        cutoff = time.time() - self.expiry_seconds
+        removed = 0
+        for meta_path in self.partial_dir.glob("*.json"):
+            try:
+                if meta_path.stat().st_mtime >= cutoff:
+                    continue
+                meta_path.with_suffix(".part").unlink(missing_ok=True)
+                meta_path.unlink(missing_ok=True)
+                self._locks.pop(meta_path.stem, None)
+                removed += 1
+            except FileNotFoundError:
+                continue
+        # Data files whose metadata is already gone
+        for data_path in self.partial_dir.glob("*.part"):
+            if not data_path.with_suffix(".json").exists() and data_path.stat().st_mtime < cutoff:
+                data_path.unlink(missing_ok=True)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} abandoned partial uploads")
+        return removed
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.cleanup_expired)
+            except Exception as e:
+                logger.error(f"Partial upload cleanup failed: {str(e)}")
+            await asyncio.sleep(self.cleanup_interval)
+
+
+# Create singleton instance
+upload_service = ResumableUploadService()
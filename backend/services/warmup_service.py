@@ -0,0 +1,98 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Callable, Optional
+from services.gmail_service import gmail_service
+from services.sheets_service import sheets_service
+from services.metrics import track_external
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class StartupWarmup:
+    """Pays the one-off connection costs at startup instead of on the first orders.
+
+    It opens WARMUP_MONGO_CONNECTIONS pooled MongoDB connections, fetches the Gmail or SMTP
+    and Sheets credentials, opens the order worksheet and makes a keep-alive TLS connection
+    to Razorpay. The steps run concurrently under one WARMUP_TIMEOUT_SECONDS deadline. A
+    failed step is logged and left to happen on first use as before. The readiness check
+    stays failing until warm-up has finished, so traffic arrives once it is done.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('WARMUP_ENABLED', 'false').lower() == 'true'
+        self.timeout = float(os.getenv('WARMUP_TIMEOUT_SECONDS', '30'))
+        self.mongo_connections = max(1, int(os.getenv('WARMUP_MONGO_CONNECTIONS', os.getenv('MONGO_MIN_POOL_SIZE', '1'))))
+        self.finished = not self.enabled
+        self.results: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db, razorpay_client: Callable[[], Any]) -> None:
+        """Run warm-up in the background; the readiness check waits for it"""
+        if not self.enabled:
+            return
+        if self._task is None or self._task.done():
+            self.finished = False
+            self._task = asyncio.create_task(self._run(db, razorpay_client))
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self, db, razorpay_client: Callable[[], Any]) -> None:
+        started = time.perf_counter()
+        steps = {
+            "mongo": self._warm_mongo(db),
+            "email": gmail_service.warm_up(),
+            "sheets": sheets_service.warm_up(),
+            "razorpay": self._warm_razorpay(razorpay_client)
+        }
+        try:
+            with tracer.span("background.startup_warmup"):
+                outcomes = await asyncio.wait_for(
+                    asyncio.gather(*steps.values(), return_exceptions=True), timeout=self.timeout
+                )
+            for name, outcome in zip(steps, outcomes):
+                if isinstance(outcome, BaseException):
+                    logger.error(f"Warm-up of {name} failed: {str(outcome)}")
+                    self.results[name] = "failed"
+                else:
+                    self.results[name] = "ready" if outcome else "skipped"
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.error(f"Warm-up did not finish within {self.timeout}s, continuing without it")
+            self.results["timed_out"] = True
+        finally:
+            self.finished = True
+        logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s: {self.results}")
+
+    async def _warm_mongo(self, db) -> bool:
+        # Concurrent pings each check out their own connection, leaving that many in the pool
+        with track_external("mongo", "warm_up"):
+            await asyncio.gather(*(db.command("ping") for _ in range(self.mongo_connections)))
+        return True
+
+    @staticmethod
+    async def _warm_razorpay(razorpay_client: Callable[[], Any]) -> bool:
+        if not os.environ.get('RAZORPAY_KEY_ID'):
+            return False
+        client = razorpay_client()
+        # An unauthenticated request is enough to leave a TLS connection in the SDK's session pool
+        with track_external("razorpay", "warm_up"):
+            await asyncio.to_thread(client.session.head, client.base_url, timeout=10)
+        return True
+
+    def report(self) -> Dict[str, Any]:
+        return {"ok": self.finished, "enabled": self.enabled, **self.results}
+
+
+# Create singleton instance
+startup_warmup = StartupWarmup()
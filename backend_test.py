@@ -7,13 +7,17 @@ Tests all API endpoints for functionality, data validation, and error handling
 import requests
 import json
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import sys
 import os
+import subprocess
+import time
 
 # Backend URL configuration
 BACKEND_URL = "http://localhost:8001"
 API_BASE = f"{BACKEND_URL}/api"
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+STARTUP_BUDGET_SECONDS = float(os.environ.get("STARTUP_BUDGET_SECONDS", "3"))
 
 class Colors:
     GREEN = '\033[92m'
@@ -157,6 +161,15 @@ def test_measurement_submission():
     
     return None
 
+def find_open_fitting_slot():
+    """First (date, time) with a free place, from the availability endpoint"""
+    for offset in range(1, 15):
+        day = (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+        response = requests.get(f"{API_BASE}/virtual-fitting/availability", params={"date": day}, timeout=10)
+        if response.status_code == 200 and response.json().get("slots"):
+            return day, response.json()["slots"][0]["time"]
+    return None
+
 def test_virtual_fitting():
     """Test virtual fitting booking"""
     print_test_header("Virtual Fitting Booking")
@@ -172,13 +185,19 @@ def test_virtual_fitting():
             "body_type": "Petite",
             "special_considerations": "Requires alterations for formal events"
         },
-        "preferred_date": "2024-02-15",
-        "preferred_time": "14:30",
         "fitting_type": "virtual_consultation",
         "notes": "Interested in bespoke evening wear consultation"
     }
     
     try:
+        # Only slots from the availability endpoint can be booked
+        slot = find_open_fitting_slot()
+        if slot is None:
+            print_error("No open fitting slot found in the next 14 days")
+            return None
+        valid_fitting_request["preferred_date"], valid_fitting_request["preferred_time"] = slot
+        print_info(f"Booking open slot {slot[0]} {slot[1]}")
+        
         response = requests.post(
             f"{API_BASE}/virtual-fitting",
             json=valid_fitting_request,
@@ -283,6 +302,96 @@ def test_error_handling():
     except Exception as e:
         print_error(f"Non-existent measurement test failed: {str(e)}")
 
+def test_startup_time():
+    """Test that importing the app is fast and opens no outside connections"""
+    print_test_header("Startup Time")
+    
+    # Unroutable addresses make any import-time connection attempt hang or fail loudly
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://10.255.255.1:27017")
+    env.setdefault("DB_NAME", "startup_check")
+    
+    try:
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", "import server"],
+            cwd=BACKEND_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=60
+        )
+        elapsed = time.perf_counter() - started
+        
+        if result.returncode != 0:
+            print_error(f"Importing server failed: {result.stderr.strip().splitlines()[-1] if result.stderr else result.returncode}")
+            return None
+        
+        if elapsed <= STARTUP_BUDGET_SECONDS:
+            print_success(f"Server module imported in {elapsed:.2f}s (budget {STARTUP_BUDGET_SECONDS:.1f}s)")
+        else:
+            print_error(f"Server module import took {elapsed:.2f}s, over the {STARTUP_BUDGET_SECONDS:.1f}s budget")
+        
+        # Outside SDKs should only be imported on first use
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, server; print(','.join(m for m in ('razorpay', 'gspread', 'googleapiclient', 'numpy') if m in sys.modules))"],
+            cwd=BACKEND_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=60
+        )
+        eager_modules = result.stdout.strip()
+        if result.returncode == 0 and not eager_modules:
+            print_success("Razorpay, Google client libraries and NumPy are loaded lazily")
+        elif result.returncode == 0:
+            print_warning(f"Client libraries imported at startup: {eager_modules}")
+        
+        return elapsed
+    except Exception as e:
+        print_error(f"Startup time test failed: {str(e)}")
+    
+    return None
+
+def test_admission_routes():
+    """Test that every upload path is admitted, with resumable chunks charged no rate-limit token"""
+    print_test_header("Admission Control Routes")
+    
+    expected = [
+        ("POST", "/api/upload-image", ["upload", True]),
+        ("POST", "/api/upload-image/resumable", ["upload", True]),
+        ("PATCH", f"/api/upload-image/resumable/{uuid.uuid4()}", ["upload", False]),
+        ("POST", f"/api/upload-image/resumable/{uuid.uuid4()}/finish", ["upload", False]),
+        ("GET", f"/api/upload-image/resumable/{uuid.uuid4()}", None),
+        ("POST", "/api/create-payment-order", ["payment_order", True]),
+    ]
+    script = (
+        "import json, sys\n"
+        "from services.rate_limiter import admission_control\n"
+        "print(json.dumps([admission_control.limit_for(m, p) for m, p in json.loads(sys.argv[1])]))"
+    )
+    
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", script, json.dumps([[method, path] for method, path, _ in expected])],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            timeout=60
+        )
+        if result.returncode != 0:
+            print_error(f"Loading admission control failed: {result.stderr.strip().splitlines()[-1] if result.stderr else result.returncode}")
+            return
+        
+        limits = json.loads(result.stdout)
+        for (method, path, limit), actual in zip(expected, limits):
+            if actual == limit:
+                print_success(f"{method} {path} -> {limit or 'not limited'}")
+            else:
+                print_error(f"{method} {path} -> {actual or 'not limited'}, expected {limit or 'not limited'}")
+    except Exception as e:
+        print_error(f"Admission route test failed: {str(e)}")
+
 def run_all_tests():
     """Run all backend API tests"""
     print(f"{Colors.BOLD}Stallion & Co. Backend API Test Suite{Colors.ENDC}")
@@ -290,6 +399,8 @@ def run_all_tests():
     print(f"Timestamp: {datetime.now().isoformat()}")
     
     # Run all tests
+    test_startup_time()
+    test_admission_routes()
     test_api_health_check()
     test_product_catalog()
     submission_id = test_measurement_submission()
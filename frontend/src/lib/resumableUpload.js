@@ -0,0 +1,85 @@
+import axios from 'axios';
+
+const MAX_RETRIES = 5;
+const MAX_RESTARTS = 2;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const sha256Hex = async (file) => {
+  const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+};
+
+// Uploads a photo in chunks. After a failed chunk it asks the server for the
+// current offset and resends only the bytes the server does not have yet. If the
+// finished file fails the checksum, the server empties it and the upload restarts.
+export const uploadImageResumable = async (backendUrl, file, imageType) => {
+  const baseUrl = `${backendUrl}/api/upload-image/resumable`;
+  const checksum = sha256Hex(file);
+
+  const { data: upload } = await axios.post(baseUrl, {
+    filename: file.name,
+    content_type: file.type,
+    image_type: imageType,
+    total_size: file.size,
+  });
+
+  const uploadUrl = `${baseUrl}/${upload.upload_id}`;
+  let offset = upload.offset;
+  let retries = 0;
+  let restarts = 0;
+
+  for (;;) {
+    while (offset < file.size) {
+      const chunk = file.slice(offset, offset + upload.chunk_size);
+      try {
+        const { data } = await axios.patch(uploadUrl, chunk, {
+          headers: {
+            'Content-Type': 'application/octet-stream',
+            'Upload-Offset': String(offset),
+          },
+        });
+        offset = data.offset;
+        retries = 0;
+      } catch (error) {
+        const response = error.response;
+        if (response && response.status < 500 && response.status !== 409 && response.status !== 429) {
+          throw error;
+        }
+        if (++retries > MAX_RETRIES) {
+          throw error;
+        }
+        await sleep(Math.min(1000 * 2 ** (retries - 1), 8000));
+        if (response && response.status === 409 && response.data.offset !== undefined) {
+          offset = response.data.offset;
+        } else {
+          // The connection may have dropped mid-chunk; the server knows how much arrived
+          const { data } = await axios.get(uploadUrl);
+          offset = data.offset;
+        }
+      }
+    }
+
+    try {
+      const { data } = await axios.post(`${uploadUrl}/finish`, { sha256: await checksum });
+      return data;
+    } catch (error) {
+      const response = error.response;
+      // The server discarded corrupted data; send the whole file again
+      if (response && response.status === 422 && restarts < MAX_RESTARTS) {
+        restarts += 1;
+        offset = response.data.offset !== undefined ? response.data.offset : 0;
+        continue;
+      }
+      // Incomplete upload, e.g. a chunk was lost after the last offset check
+      if (response && response.status === 409 && response.data.offset !== undefined && retries < MAX_RETRIES) {
+        retries += 1;
+        offset = response.data.offset;
+        continue;
+      }
+      throw error;
+    }
+  }
+};
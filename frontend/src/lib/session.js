@@ -0,0 +1,17 @@
+import axios from 'axios';
+
+const SESSION_KEY = 'sessionId';
+
+const newSessionId = () =>
+  (crypto.randomUUID ? crypto.randomUUID() : `${Date.now().toString(16)}-${Math.random().toString(16).slice(2)}`);
+
+// Sends a per-tab session ID with every API call, so the server can rate-limit
+// a session on its own and not only the IP address it shares with others.
+export const installSessionHeader = () => {
+  let sessionId = sessionStorage.getItem(SESSION_KEY);
+  if (!sessionId) {
+    sessionId = newSessionId();
+    sessionStorage.setItem(SESSION_KEY, sessionId);
+  }
+  axios.defaults.headers.common['X-Session-Id'] = sessionId;
+};
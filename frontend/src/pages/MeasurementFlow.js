@@ -9,6 +9,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '.
 import { toast } from 'sonner';
 import axios from 'axios';
 import { ArrowLeft, ChevronRight, ChevronLeft } from 'lucide-react';
+import { uploadImageResumable } from '../lib/resumableUpload';
 
 const MeasurementFlow = () => {
   const navigate = useNavigate();
@@ -75,23 +76,29 @@ const MeasurementFlow = () => {
   const handleImageUpload = async (file, imageType) => {
     if (!file) return;
 
-    const formData = new FormData();
-    formData.append('file', file);
-    formData.append('image_type', imageType);
-
     try {
-      const response = await axios.post(
-        `${process.env.REACT_APP_BACKEND_URL}/api/upload-image`,
-        formData,
-        {
-          headers: {
-            'Content-Type': 'multipart/form-data',
-          },
-        }
-      );
+      let result;
+      if (window.crypto && window.crypto.subtle) {
+        result = await uploadImageResumable(process.env.REACT_APP_BACKEND_URL, file, imageType);
+      } else {
+        // SHA-256 needs a secure context; fall back to a single multipart upload
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('image_type', imageType);
+        const response = await axios.post(
+          `${process.env.REACT_APP_BACKEND_URL}/api/upload-image`,
+          formData,
+          {
+            headers: {
+              'Content-Type': 'multipart/form-data',
+            },
+          }
+        );
+        result = response.data;
+      }
 
-      if (response.data.status === 'success') {
-        const fileUrl = `${process.env.REACT_APP_BACKEND_URL}${response.data.file_url}`;
+      if (result.status === 'success') {
+        const fileUrl = `${process.env.REACT_APP_BACKEND_URL}${result.file_url}`;
         setUploadedImages(prev => ({
           ...prev,
           [imageType]: fileUrl
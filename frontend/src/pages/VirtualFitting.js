@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Button } from '../components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
@@ -12,6 +12,8 @@ import axios from 'axios';
 const VirtualFitting = () => {
   const navigate = useNavigate();
   const [isLoading, setIsLoading] = useState(false);
+  const [timeSlots, setTimeSlots] = useState([]);
+  const [slotsLoading, setSlotsLoading] = useState(false);
   
   const [formData, setFormData] = useState({
     first_name: '',
@@ -78,18 +80,52 @@ const VirtualFitting = () => {
       
     } catch (error) {
       console.error('Booking error:', error);
-      toast.error('Failed to book consultation. Please try again.');
+      if (error.response && error.response.status === 409) {
+        toast.error('That time slot was just taken. Please choose another.');
+        setTimeSlots(prev => prev.filter(time => time !== formData.preferred_time));
+        handleInputChange('preferred_time', '');
+      } else {
+        toast.error('Failed to book consultation. Please try again.');
+      }
     } finally {
       setIsLoading(false);
     }
   };
 
-  // Generate time slots
-  const timeSlots = [
-    '09:00', '09:30', '10:00', '10:30', '11:00', '11:30',
-    '12:00', '12:30', '14:00', '14:30', '15:00', '15:30',
-    '16:00', '16:30', '17:00', '17:30', '18:00'
-  ];
+  // Open slots for the chosen date, from the scheduler's availability index
+  useEffect(() => {
+    if (!formData.preferred_date) {
+      setTimeSlots([]);
+      return;
+    }
+
+    let cancelled = false;
+    setSlotsLoading(true);
+    axios
+      .get(`${process.env.REACT_APP_BACKEND_URL}/api/virtual-fitting/availability`, {
+        params: { date: formData.preferred_date },
+      })
+      .then((response) => {
+        if (cancelled) return;
+        const slots = response.data.slots.map((slot) => slot.time);
+        setTimeSlots(slots);
+        if (formData.preferred_time && !slots.includes(formData.preferred_time)) {
+          handleInputChange('preferred_time', '');
+        }
+      })
+      .catch((error) => {
+        console.error('Availability error:', error);
+        if (!cancelled) setTimeSlots([]);
+      })
+      .finally(() => {
+        if (!cancelled) setSlotsLoading(false);
+      });
+
+    return () => {
+      cancelled = true;
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [formData.preferred_date]);
 
   // Get minimum date (tomorrow)
   const getMinDate = () => {
@@ -227,7 +263,17 @@ const VirtualFitting = () => {
                     <Label htmlFor="preferredTime" data-testid="preferred-time-label">Preferred Time</Label>
                     <Select value={formData.preferred_time} onValueChange={(value) => handleInputChange('preferred_time', value)}>
                       <SelectTrigger data-testid="preferred-time-select">
-                        <SelectValue placeholder="Select time slot" />
+                        <SelectValue
+                          placeholder={
+                            !formData.preferred_date
+                              ? 'Select a date first'
+                              : slotsLoading
+                                ? 'Loading available slots...'
+                                : timeSlots.length
+                                  ? 'Select time slot'
+                                  : 'No slots available on this date'
+                          }
+                        />
                       </SelectTrigger>
                       <SelectContent>
                         {timeSlots.map((time) => (
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The services import each other as `services.*`, relative to the backend directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+# Tests that import the app must never write into a real uploads or archive directory
+_scratch = tempfile.mkdtemp(prefix="stallion_tests_")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+os.environ.setdefault("RESUMABLE_UPLOAD_DIR", os.path.join(_scratch, "uploads_partial"))
+os.environ.setdefault("ARCHIVE_DIR", os.path.join(_scratch, "archive"))
@@ -0,0 +1,321 @@
+"""A small in-memory stand-in for the motor collections the services use.
+
+It implements the query and update operators the services rely on ($or, $and, $in, $ne,
+$not, comparisons, $set, $inc, $unset, $setOnInsert, upserts and unique indexes), with
+the same awaitable API as motor. It is not a general MongoDB emulator.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+MISSING = object()
+
+
+def get_path(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def set_path(document: Dict[str, Any], path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.setdefault(part, {})
+    document[last] = value
+
+
+def unset_path(document: Dict[str, Any], path: str) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(last, None)
+
+
+def _equal(value: Any, expected: Any) -> bool:
+    if expected is None:
+        return value is MISSING or value is None
+    return value is not MISSING and value == expected
+
+
+def _compare(value: Any, operator: str, expected: Any) -> bool:
+    if value is MISSING or value is None:
+        return False
+    if operator == "$lt":
+        return value < expected
+    if operator == "$lte":
+        return value <= expected
+    if operator == "$gt":
+        return value > expected
+    return value >= expected
+
+
+def match_value(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for operator, argument in condition.items():
+            if operator == "$ne":
+                ok = not _equal(value, argument)
+            elif operator in ("$lt", "$lte", "$gt", "$gte"):
+                ok = _compare(value, operator, argument)
+            elif operator == "$in":
+                ok = any(_equal(value, item) for item in argument)
+            elif operator == "$not":
+                ok = not match_value(value, argument)
+            else:
+                raise NotImplementedError(operator)
+            if not ok:
+                return False
+        return True
+    return _equal(value, condition)
+
+
+def matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, part) for part in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, part) for part in condition):
+                return False
+        elif not match_value(get_path(document, key), condition):
+            return False
+    return True
+
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    included = [key for key, value in projection.items() if value and key != "_id"]
+    if included:
+        result: Dict[str, Any] = {}
+        if projection.get("_id", 1):
+            result["_id"] = document.get("_id")
+        for path in included:
+            value = get_path(document, path)
+            if value is not MISSING:
+                set_path(result, path, value)
+        return result
+    for key, value in projection.items():
+        if not value:
+            unset_path(document, key)
+    return document
+
+
+def sort_documents(documents: List[Dict[str, Any]], sort) -> List[Dict[str, Any]]:
+    if isinstance(sort, str):
+        sort = [(sort, 1)]
+    for key, direction in reversed(list(sort or [])):
+        def sort_key(document, key=key):
+            value = get_path(document, key)
+            return (0, 0) if value is MISSING or value is None else (1, value)
+        documents = sorted(documents, key=sort_key, reverse=direction < 0)
+    return documents
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, upserted_id: Any = None):
+        self.matched_count = matched_count
+        self.modified_count = matched_count
+        self.upserted_id = upserted_id
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict[str, Any]], projection: Optional[Dict[str, Any]]):
+        self._documents = documents
+        self._projection = projection
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        self._sort = [(key, direction)] if direction is not None else key
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    def _results(self) -> List[Dict[str, Any]]:
+        documents = sort_documents(self._documents, self._sort)
+        if self._limit:
+            documents = documents[:self._limit]
+        return [project(document, self._projection) for document in documents]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._results()
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        self._iterator = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: List[Dict[str, Any]] = []
+        self._unique: List[List[str]] = [["_id"]]
+        self._next_id = 0
+
+    async def create_index(self, keys, unique: bool = False, name: Optional[str] = None, **kwargs) -> str:
+        if unique:
+            self._unique.append([key for key, _ in keys])
+        return name or "_".join(key for key, _ in keys)
+
+    def _check_unique(self, candidate: Dict[str, Any], ignore: Optional[Dict[str, Any]] = None) -> None:
+        for fields in self._unique:
+            key = [get_path(candidate, field) for field in fields]
+            if any(value is MISSING for value in key):
+                continue
+            for document in self.documents:
+                if document is not ignore and [get_path(document, field) for field in fields] == key:
+                    raise DuplicateKeyError(f"duplicate key on {fields}: {key}")
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        document = copy.deepcopy(document)
+        if "_id" not in document:
+            self._next_id += 1
+            document["_id"] = f"{self.name}:{self._next_id}"
+        self._check_unique(document)
+        self.documents.append(document)
+        return document["_id"]
+
+    @staticmethod
+    def _apply(document: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> Dict[str, Any]:
+        updated = copy.deepcopy(document)
+        for operator, fields in update.items():
+            for path, value in fields.items():
+                if operator == "$set" or (operator == "$setOnInsert" and inserting):
+                    set_path(updated, path, copy.deepcopy(value))
+                elif operator == "$inc":
+                    current = get_path(updated, path)
+                    set_path(updated, path, (0 if current is MISSING else current) + value)
+                elif operator == "$unset":
+                    unset_path(updated, path)
+                elif operator != "$setOnInsert":
+                    raise NotImplementedError(operator)
+        return updated
+
+    @staticmethod
+    def _seed(query: Dict[str, Any]) -> Dict[str, Any]:
+        # Equality conditions of the filter become fields of an upserted document
+        seed: Dict[str, Any] = {}
+        for key, condition in query.items():
+            if key.startswith("$"):
+                continue
+            if isinstance(condition, dict) and any(str(k).startswith("$") for k in condition):
+                continue
+            set_path(seed, key, copy.deepcopy(condition))
+        return seed
+
+    def _matching(self, query: Dict[str, Any], sort=None) -> List[Dict[str, Any]]:
+        return sort_documents([document for document in self.documents if matches(document, query)], sort)
+
+    def _replace(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        self._check_unique(new, ignore=old)
+        self.documents[self.documents.index(old)] = new
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> FakeCursor:
+        return FakeCursor(self._matching(query or {}), projection)
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None):
+        found = self._matching(query or {})
+        return project(found[0], projection) if found else None
+
+    async def insert_one(self, document: Dict[str, Any]):
+        return UpdateResult(0, self._insert(document))
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        found = self._matching(query)
+        if found:
+            self._replace(found[0], self._apply(found[0], update, inserting=False))
+            return UpdateResult(1)
+        if upsert:
+            return UpdateResult(0, self._insert(self._apply(self._seed(query), update, inserting=True)))
+        return UpdateResult(0)
+
+    async def replace_one(self, query: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        found = self._matching(query)
+        if found:
+            new = copy.deepcopy(replacement)
+            new["_id"] = found[0]["_id"]
+            self._replace(found[0], new)
+            return UpdateResult(1)
+        if upsert:
+            return UpdateResult(0, self._insert({**self._seed(query), **replacement}))
+        return UpdateResult(0)
+
+    async def find_one_and_update(self, query: Dict[str, Any], update: Dict[str, Any], projection=None,
+                                  sort=None, upsert: bool = False,
+                                  return_document=ReturnDocument.BEFORE):
+        found = self._matching(query, sort)
+        if found:
+            before = found[0]
+            after = self._apply(before, update, inserting=False)
+            self._replace(before, after)
+        elif upsert:
+            before = None
+            after = self._apply(self._seed(query), update, inserting=True)
+            after["_id"] = self._insert(after)
+        else:
+            return None
+        result = after if return_document == ReturnDocument.AFTER else before
+        return project(result, projection) if result is not None else None
+
+    async def delete_one(self, query: Dict[str, Any]) -> DeleteResult:
+        found = self._matching(query)
+        if found:
+            self.documents.remove(found[0])
+        return DeleteResult(len(found[:1]))
+
+    async def delete_many(self, query: Dict[str, Any]) -> DeleteResult:
+        found = self._matching(query)
+        for document in found:
+            self.documents.remove(document)
+        return DeleteResult(len(found))
+
+    async def bulk_write(self, operations, ordered: bool = True):
+        for operation in operations:
+            update = operation._doc
+            if any(key.startswith("$") for key in update):
+                await self.update_one(operation._filter, update, upsert=operation._upsert)
+            else:
+                await self.replace_one(operation._filter, update, upsert=operation._upsert)
+
+
+class FakeDatabase:
+    """Collections are created on first access, by attribute or by name"""
+
+    def __init__(self):
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
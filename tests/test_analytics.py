@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from services.analytics_service import ALL_BODY_TYPES, MeasurementAnalytics, histogram_percentiles
+from tests.fake_mongo import FakeDatabase
+
+
+def make_analytics(monkeypatch, db):
+    monkeypatch.setenv("ANALYTICS_BATCH_SIZE", "2")
+    monkeypatch.setenv("ANALYTICS_BATCH_PAUSE_SECONDS", "0")
+    monkeypatch.setenv("ANALYTICS_SETTLE_SECONDS", "300")
+    analytics = MeasurementAnalytics()
+    analytics._db = db
+    return analytics
+
+
+def add_paid_order(db, index, paid_at, height=170.4):
+    db.measurements.documents.append({
+        "_id": f"order-{index}",
+        "id": f"order-{index}",
+        "order_status": "paid",
+        "payment_verified_at": paid_at,
+        "measurements": {"height": height, "weight": 70, "waist": 80, "unit": "cm"},
+        "customer_info": {"body_type": "Athletic"},
+        "fabric_choice": "Cotton"
+    })
+
+
+def rollup(db):
+    return db.analytics_rollups.documents[0]
+
+
+def test_paid_orders_are_folded_in_batches_and_counted_once(monkeypatch):
+    db = FakeDatabase()
+    an_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    for index in range(5):
+        add_paid_order(db, index, an_hour_ago + timedelta(seconds=index))
+    analytics = make_analytics(monkeypatch, db)
+
+    assert asyncio.run(analytics.update()) == 5
+    assert asyncio.run(analytics.update()) == 0
+
+    document = rollup(db)
+    assert document["orders"] == 5
+    assert document["histograms"]["height"]["athletic"]["170"] == 5
+    assert document["histograms"]["height"][ALL_BODY_TYPES]["170"] == 5
+    assert document["fabric_mix"]["cotton"] == 5
+    assert document["watermark"] == {"at": an_hour_ago + timedelta(seconds=4), "id": "order-4"}
+
+
+def test_orders_inside_the_settle_window_wait_for_a_later_run(monkeypatch):
+    db = FakeDatabase()
+    now = datetime.now(timezone.utc)
+    add_paid_order(db, 1, now - timedelta(hours=1))
+    add_paid_order(db, 2, now - timedelta(seconds=10))
+    analytics = make_analytics(monkeypatch, db)
+
+    assert asyncio.run(analytics.update()) == 1
+    # An order written late with an older timestamp is still ahead of the watermark
+    add_paid_order(db, 3, now - timedelta(minutes=30))
+    analytics.settle_seconds = 0
+    assert asyncio.run(analytics.update()) == 2
+    assert rollup(db)["orders"] == 3
+
+
+def test_a_batch_is_dropped_when_another_worker_moved_the_watermark(monkeypatch):
+    db = FakeDatabase()
+    an_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    for index in range(3):
+        add_paid_order(db, index, an_hour_ago + timedelta(seconds=index))
+    ours = make_analytics(monkeypatch, db)
+    theirs = make_analytics(monkeypatch, db)
+    rollups = db.analytics_rollups
+    update_one = rollups.update_one
+    raced = []
+
+    async def racing_update_one(query, update, upsert=False):
+        # The other worker finishes a full run between our read and our write
+        if not raced:
+            raced.append(True)
+            with monkeypatch.context() as patch:
+                patch.setattr(rollups, "update_one", update_one)
+                await theirs.update()
+        return await update_one(query, update, upsert=upsert)
+
+    monkeypatch.setattr(rollups, "update_one", racing_update_one)
+
+    assert asyncio.run(ours.update()) == 0
+    assert rollup(db)["orders"] == 3
+    assert rollup(db)["histograms"]["height"][ALL_BODY_TYPES]["170"] == 3
+
+
+def test_percentiles_interpolate_inside_one_unit_bins():
+    result = histogram_percentiles({"170": 5, "171": 5})
+    assert result["count"] == 10
+    assert result["p50"] == 171.0
+    assert result["p10"] == 170.2
+    assert histogram_percentiles({}) == {"count": 0}
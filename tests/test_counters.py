@@ -0,0 +1,94 @@
+import asyncio
+
+from services.counters_service import BusinessCounters
+from tests.fake_mongo import FakeDatabase
+
+
+def make_counters(monkeypatch):
+    monkeypatch.setenv("COUNTERS_TIMEZONE", "UTC")
+    counters = BusinessCounters()
+    db = FakeDatabase()
+    counters.start(db)
+    return counters, db
+
+
+def documents_by_period(db):
+    return {document["period"]: document for document in db.counters.documents if "period" in document}
+
+
+def pending_gauge(db):
+    gauge = [document for document in db.counters.documents if document["_id"] == BusinessCounters.GAUGE_ID]
+    return gauge[0]["value"] if gauge else 0
+
+
+def test_submission_counts_in_day_and_hour_buckets_and_raises_pending(monkeypatch):
+    counters, db = make_counters(monkeypatch)
+
+    assert asyncio.run(counters.record("submitted", pending_delta=1))
+
+    buckets = documents_by_period(db)
+    assert buckets["day"]["submitted"] == 1 and buckets["hour"]["submitted"] == 1
+    assert pending_gauge(db) == 1
+
+
+def test_payment_moves_the_order_out_of_pending_and_adds_revenue(monkeypatch):
+    counters, db = make_counters(monkeypatch)
+
+    async def scenario():
+        await counters.record("submitted", pending_delta=1)
+        await counters.record_transition("pending_payment", "paid", amount=45000)
+
+    asyncio.run(scenario())
+    day = documents_by_period(db)["day"]
+    assert day["paid"] == 1 and day["revenue_paise"] == 45000
+    assert pending_gauge(db) == 0
+
+
+def test_failed_payment_counts_no_revenue(monkeypatch):
+    counters, db = make_counters(monkeypatch)
+
+    async def scenario():
+        await counters.record("submitted", pending_delta=1)
+        await counters.record_transition("pending_payment", "payment_failed", amount=45000)
+
+    asyncio.run(scenario())
+    day = documents_by_period(db)["day"]
+    assert day["payment_failed"] == 1 and "revenue_paise" not in day
+    assert pending_gauge(db) == 0
+
+
+def test_repeated_status_is_not_counted_again(monkeypatch):
+    counters, db = make_counters(monkeypatch)
+
+    async def scenario():
+        await counters.record_transition("pending_payment", "paid", amount=45000)
+        await counters.record_transition("paid", "paid", amount=45000)
+
+    asyncio.run(scenario())
+    assert documents_by_period(db)["day"]["paid"] == 1
+
+
+def test_a_retried_payment_after_a_failure_does_not_touch_pending(monkeypatch):
+    counters, db = make_counters(monkeypatch)
+
+    asyncio.run(counters.record_transition("payment_failed", "paid", amount=45000))
+
+    assert documents_by_period(db)["day"]["paid"] == 1
+    assert pending_gauge(db) == 0
+
+
+def test_dashboard_reads_the_buckets(monkeypatch):
+    counters, db = make_counters(monkeypatch)
+
+    async def scenario():
+        for _ in range(3):
+            await counters.record("submitted", pending_delta=1)
+        await counters.record_transition("pending_payment", "paid", amount=45000)
+        await counters.adjust_pending(-1)
+        return await counters.dashboard(days=7)
+
+    dashboard = asyncio.run(scenario())
+    assert dashboard["today"]["submitted"] == 3
+    assert dashboard["period"]["revenue_paise"] == 45000
+    assert dashboard["pending_checkouts"] == 1
+    assert len(dashboard["days"]) == 7
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from services.job_tracker import BackgroundJobTracker
+from tests.fake_mongo import FakeDatabase
+
+
+class Worker(BackgroundJobTracker):
+    """A tracker with a fixed worker id, so one process can play several workers"""
+
+    def __init__(self, name, runs=None, finish=True):
+        super().__init__()
+        self.name = name
+        self.runs = runs if runs is not None else []
+        self.finish_jobs = finish
+        self.register("order_processing", self.handle)
+
+    @property
+    def worker_id(self):
+        return self.name
+
+    async def handle(self, payload, job_id, steps_done):
+        self.begin("order_processing", payload, job_id, steps_done)
+        self.runs.append((self.name, job_id, list(steps_done)))
+        if self.finish_jobs:
+            self.finish(job_id)
+
+    async def settle(self):
+        # Let resumed jobs and the deletes they schedule run
+        while self._resumed:
+            await asyncio.gather(*list(self._resumed))
+
+
+async def save_cut_off_job(db):
+    """A worker shuts down with one job that has done its first step"""
+    worker = Worker("old")
+    job_id = worker.begin("order_processing", {"submission": {"id": "order-1"}, "payment_id": "pay_1"})
+    worker.step_done(job_id, "size_index")
+    assert await worker.persist(db) == 1
+    return job_id
+
+
+def test_a_saved_job_is_leased_run_with_its_remaining_steps_and_deleted():
+    db = FakeDatabase()
+
+    async def scenario():
+        await db.pending_jobs.create_index([("job_id", 1)], unique=True)
+        job_id = await save_cut_off_job(db)
+        worker = Worker("a")
+        resumed = await worker.resume(db)
+        await worker.settle()
+        return job_id, resumed, worker.runs
+
+    job_id, resumed, runs = asyncio.run(scenario())
+    assert resumed == 1
+    assert runs == [("a", job_id, ["size_index"])]
+    assert db.pending_jobs.documents == []
+
+
+def test_a_leased_job_is_not_claimed_again_until_the_lease_runs_out():
+    db = FakeDatabase()
+    runs = []
+
+    async def scenario():
+        job_id = await save_cut_off_job(db)
+        # Worker a claims the job and then crashes without finishing it
+        crashed = Worker("a", runs, finish=False)
+        await crashed.resume(db)
+        await crashed.settle()
+        other = Worker("b", runs)
+        claimed_during_lease = await other.resume(db)
+        db.pending_jobs.documents[0]["lease_until"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+        claimed_after_lease = await other.resume(db)
+        await other.settle()
+        return job_id, claimed_during_lease, claimed_after_lease
+
+    job_id, claimed_during_lease, claimed_after_lease = asyncio.run(scenario())
+    assert claimed_during_lease == 0
+    assert claimed_after_lease == 1
+    assert [run[0] for run in runs] == ["a", "b"]
+    assert db.pending_jobs.documents == []
+
+
+def test_a_resumed_job_cut_off_again_is_saved_in_place():
+    db = FakeDatabase()
+
+    async def scenario():
+        await db.pending_jobs.create_index([("job_id", 1)], unique=True)
+        job_id = await save_cut_off_job(db)
+        worker = Worker("a", finish=False)
+        await worker.resume(db)
+        await worker.settle()
+        worker.step_done(job_id, "confirmation_email")
+        await worker.persist(db)
+        return job_id
+
+    job_id = asyncio.run(scenario())
+    assert len(db.pending_jobs.documents) == 1
+    saved = db.pending_jobs.documents[0]
+    assert saved["job_id"] == job_id
+    assert saved["steps_done"] == ["size_index", "confirmation_email"]
+    assert "lease_until" not in saved and "owner" not in saved
+
+
+def test_a_job_without_a_handler_is_left_for_a_worker_that_has_one():
+    db = FakeDatabase()
+
+    async def scenario():
+        await save_cut_off_job(db)
+        worker = Worker("a")
+        worker._handlers.clear()
+        return await worker.resume(db)
+
+    assert asyncio.run(scenario()) == 0
+    assert len(db.pending_jobs.documents) == 1
@@ -0,0 +1,138 @@
+import asyncio
+from email.message import EmailMessage
+
+from services.mail_transport import SmtpTransport, smtp_open_connections
+
+
+class FakeSmtpServer:
+    """Just enough of an SMTP server to accept messages and count connections"""
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+        self._writers = set()
+        self._server = None
+        self.port = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.drop_connections()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def drop_connections(self):
+        for writer in list(self._writers):
+            writer.close()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        writer.write(b"220 fake ESMTP\r\n")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode().strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    writer.write(b"250-fake\r\n250 8BITMIME\r\n")
+                elif command == "DATA":
+                    writer.write(b"354 end with .\r\n")
+                    await writer.drain()
+                    self.messages.append(await reader.readuntil(b"\r\n.\r\n"))
+                    writer.write(b"250 queued\r\n")
+                elif command == "QUIT":
+                    writer.write(b"221 bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"250 ok\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+def make_message(index):
+    message = EmailMessage()
+    message["From"] = "orders@example.com"
+    message["To"] = "customer@example.com"
+    message["Subject"] = f"Order {index}"
+    message["Message-ID"] = f"<order-{index}@example.com>"
+    message.set_content("Thank you for your order")
+    return message
+
+
+def make_transport(monkeypatch, port, pool_size=2):
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(port))
+    monkeypatch.setenv("SMTP_START_TLS", "false")
+    monkeypatch.setenv("SMTP_POOL_SIZE", str(pool_size))
+    monkeypatch.delenv("SMTP_USERNAME", raising=False)
+    monkeypatch.delenv("SMTP_PASSWORD", raising=False)
+    return SmtpTransport()
+
+
+def test_sequential_sends_reuse_one_pooled_connection(monkeypatch):
+    async def scenario():
+        server = FakeSmtpServer()
+        await server.start()
+        transport = make_transport(monkeypatch, server.port)
+        try:
+            message_ids = [await transport.send(make_message(index)) for index in range(5)]
+        finally:
+            await transport.close()
+            await server.stop()
+        return server, message_ids
+
+    server, message_ids = asyncio.run(scenario())
+    assert message_ids == [f"<order-{index}@example.com>" for index in range(5)]
+    assert len(server.messages) == 5
+    assert server.connections == 1
+
+
+def test_concurrent_sends_stay_within_pool_size(monkeypatch):
+    async def scenario():
+        server = FakeSmtpServer()
+        await server.start()
+        transport = make_transport(monkeypatch, server.port, pool_size=2)
+        try:
+            await asyncio.gather(*(transport.send(make_message(index)) for index in range(6)))
+        finally:
+            await transport.close()
+            await server.stop()
+        return server
+
+    server = asyncio.run(scenario())
+    assert len(server.messages) == 6
+    assert server.connections <= 2
+
+
+def test_reconnects_after_server_drops_the_connection(monkeypatch):
+    async def scenario():
+        server = FakeSmtpServer()
+        await server.start()
+        transport = make_transport(monkeypatch, server.port)
+        opened_before = smtp_open_connections._values.get((), 0)
+        try:
+            await transport.send(make_message(1))
+            server.drop_connections()
+            await asyncio.sleep(0.05)
+            await transport.send(make_message(2))
+            open_during = smtp_open_connections._values.get((), 0) - opened_before
+        finally:
+            await transport.close()
+            await server.stop()
+        open_after = smtp_open_connections._values.get((), 0) - opened_before
+        return server, open_during, open_after
+
+    server, open_during, open_after = asyncio.run(scenario())
+    assert len(server.messages) == 2
+    assert server.connections == 2
+    assert open_during == 1
+    assert open_after == 0
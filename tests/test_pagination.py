@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_page
+from tests.fake_mongo import FakeDatabase
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_submissions(db, count):
+    for index in range(count):
+        db.measurements.documents.append({
+            "_id": index,
+            "id": f"order-{index:03d}",
+            # Pairs share a timestamp, so the id has to break ties
+            "created_at": START + timedelta(minutes=index // 2),
+            "order_status": "paid" if index % 3 else "pending_payment",
+            "customer_info": {"first_name": f"Customer {index}", "email": f"c{index}@example.com"}
+        })
+
+
+def collect_pages(collection, query, limit):
+    async def walk():
+        pages, cursor = [], None
+        while True:
+            page = await keyset_page(collection, query, {"customer_info.first_name": 1}, limit, cursor)
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+    return asyncio.run(walk())
+
+
+def test_cursor_round_trips():
+    document = {"created_at": START, "id": "order-001"}
+    assert decode_cursor(encode_cursor(document)) == (START, "order-001")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", encode_cursor({"created_at": START, "id": "x"})[:-4]])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_document_once_newest_first():
+    db = FakeDatabase()
+    make_submissions(db, 25)
+
+    pages = collect_pages(db.measurements, {}, limit=4)
+    ids = [item["id"] for page in pages for item in page["items"]]
+
+    assert len(pages) == 7
+    assert ids == [f"order-{index:03d}" for index in reversed(range(25))]
+    assert all(set(item) == {"id", "created_at", "customer_info"} for page in pages for item in page["items"])
+
+
+def test_pages_follow_the_status_filter():
+    db = FakeDatabase()
+    make_submissions(db, 25)
+
+    pages = collect_pages(db.measurements, {"order_status": "pending_payment"}, limit=3)
+    ids = [item["id"] for page in pages for item in page["items"]]
+
+    assert ids == [f"order-{index:03d}" for index in reversed(range(25)) if index % 3 == 0]
+
+
+def test_the_last_full_page_has_no_cursor():
+    db = FakeDatabase()
+    make_submissions(db, 4)
+
+    pages = collect_pages(db.measurements, {}, limit=4)
+
+    assert len(pages) == 1 and pages[0]["next_cursor"] is None
@@ -0,0 +1,96 @@
+import pytest
+
+from services.rate_limiter import AdmissionControl, ConcurrencyLimiter, TokenBucketLimiter
+
+
+def take(limiter, key, now):
+    """Consume a token if one is available, like AdmissionControl.check does"""
+    if limiter.retry_after(key, now) > 0:
+        return False
+    limiter.consume(key)
+    return True
+
+
+def test_bucket_allows_the_burst_then_refuses():
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=3)
+    assert [take(limiter, "ip:a", 100.0) for _ in range(4)] == [True, True, True, False]
+    assert limiter.retry_after("ip:a", 100.0) == pytest.approx(1.0)
+
+
+def test_bucket_refills_at_the_rate_up_to_the_burst():
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=3)
+    for _ in range(3):
+        take(limiter, "ip:a", 100.0)
+    assert take(limiter, "ip:a", 101.0)
+    assert not take(limiter, "ip:a", 101.0)
+    # A long pause refills only up to the burst
+    assert [take(limiter, "ip:a", 1000.0) for _ in range(4)] == [True, True, True, False]
+
+
+def test_buckets_are_independent_per_key():
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=1)
+    assert take(limiter, "ip:a", 100.0)
+    assert not take(limiter, "ip:a", 100.0)
+    assert take(limiter, "ip:b", 100.0)
+
+
+def test_least_recently_used_buckets_are_evicted():
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=1, max_keys=2)
+    for key in ("ip:a", "ip:b", "ip:c"):
+        take(limiter, key, 100.0)
+    assert len(limiter._buckets) == 2
+    assert "ip:a" not in limiter._buckets
+
+
+def test_check_charges_both_the_ip_and_the_session(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_PAYMENT_ORDER_BURST", "2")
+    control = AdmissionControl()
+    assert control.check("payment_order", "10.0.0.1", "session-1") == 0
+    assert control.check("payment_order", "10.0.0.1", "session-2") == 0
+    # The IP bucket is empty now, whichever session asks
+    assert control.check("payment_order", "10.0.0.1", "session-3") > 0
+    # The first session is also limited from another address
+    assert control.check("payment_order", "10.0.0.2", "session-1") == 0
+    assert control.check("payment_order", "10.0.0.3", "session-1") > 0
+
+
+def test_forwarded_for_is_used_only_when_trusted(monkeypatch):
+    headers = {"x-forwarded-for": "203.0.113.7, 10.0.0.1"}
+    monkeypatch.setenv("TRUST_PROXY_HEADERS", "false")
+    assert AdmissionControl().client_ip(headers, "10.0.0.1") == "10.0.0.1"
+    monkeypatch.setenv("TRUST_PROXY_HEADERS", "true")
+    assert AdmissionControl().client_ip(headers, "10.0.0.1") == "203.0.113.7"
+
+
+def test_concurrency_limiter_rejects_past_the_limit():
+    slots = ConcurrencyLimiter(2)
+    assert slots.try_acquire() and slots.try_acquire()
+    assert not slots.try_acquire()
+    slots.release()
+    assert slots.try_acquire()
+
+
+def test_resumable_uploads_take_one_token_when_created():
+    control = AdmissionControl()
+    upload_id = "0f8fe4a1-4a52-4bd7-8a4e-1d1bd5a7a0c4"
+    assert control.limit_for("POST", "/api/upload-image") == ("upload", True)
+    assert control.limit_for("POST", "/api/upload-image/resumable") == ("upload", True)
+    assert control.limit_for("PATCH", f"/api/upload-image/resumable/{upload_id}") == ("upload", False)
+    assert control.limit_for("POST", f"/api/upload-image/resumable/{upload_id}/finish") == ("upload", False)
+    assert control.limit_for("GET", f"/api/upload-image/resumable/{upload_id}") is None
+
+
+def test_chunks_are_not_refused_by_the_upload_rate_limit(monkeypatch):
+    from fastapi.testclient import TestClient
+    import server
+
+    monkeypatch.setattr(server.admission_control, "enabled", True)
+    monkeypatch.setitem(server.admission_control.limiters, "upload", TokenBucketLimiter(rate_per_minute=1, burst=2))
+    client = TestClient(server.app)
+    chunk_url = "/api/upload-image/resumable/0f8fe4a1-4a52-4bd7-8a4e-1d1bd5a7a0c4"
+
+    chunk_statuses = {client.patch(chunk_url, content=b"x" * 16).status_code for _ in range(10)}
+    upload_statuses = [client.post("/api/upload-image").status_code for _ in range(3)]
+
+    assert 429 not in chunk_statuses
+    assert upload_statuses[-1] == 429
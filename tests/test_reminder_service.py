@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from services import reminder_service as reminder_module
+from services.reminder_service import ReminderService
+from tests.fake_mongo import FakeDatabase
+
+
+def make_service(monkeypatch, outcomes):
+    monkeypatch.setenv("REMINDER_SEND_INTERVAL_SECONDS", "0")
+    monkeypatch.setenv("REMINDER_MAX_ATTEMPTS", "2")
+    sent = []
+
+    async def send_payment_reminder(submission, payment_link):
+        sent.append(submission["id"])
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(reminder_module.gmail_service, "send_payment_reminder", send_payment_reminder)
+    service = ReminderService()
+    service._db = FakeDatabase()
+    service._db.measurements.documents.append({
+        "_id": "order-1", "id": "order-1", "order_status": "pending_payment",
+        "created_at": datetime.now(timezone.utc) - timedelta(hours=2)
+    })
+    return service, sent
+
+
+def order(service):
+    return service._db.measurements.documents[0]
+
+
+def test_a_sent_reminder_is_marked_and_not_sent_again(monkeypatch):
+    service, sent = make_service(monkeypatch, [True])
+
+    assert asyncio.run(service.sweep_once()) == 1
+    assert asyncio.run(service.sweep_once()) == 0
+
+    assert sent == ["order-1"]
+    assert order(service)["reminder_sent_at"] is not None
+    assert "reminder_claimed_until" not in order(service)
+
+
+def test_a_claim_left_by_a_crashed_worker_expires(monkeypatch):
+    service, sent = make_service(monkeypatch, [True])
+
+    # A worker claimed the order and died before sending
+    assert asyncio.run(service._claim("order-1")) is not None
+    assert asyncio.run(service.sweep_once()) == 0
+    order(service)["reminder_claimed_until"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    assert asyncio.run(service.sweep_once()) == 1
+
+    assert sent == ["order-1"]
+    assert order(service)["reminder_attempts"] == 2
+
+
+def test_failed_sends_are_retried_up_to_the_attempt_limit(monkeypatch):
+    service, sent = make_service(monkeypatch, [False, RuntimeError("smtp down"), True])
+
+    for _ in range(3):
+        asyncio.run(service.sweep_once())
+
+    assert sent == ["order-1", "order-1"]
+    assert order(service)["reminder_attempts"] == 2
+    assert order(service).get("reminder_sent_at") is None
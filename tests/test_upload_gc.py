@@ -0,0 +1,117 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.upload_gc import UploadGarbageCollector, upload_filename
+from tests.fake_mongo import FakeDatabase
+
+DAY = 24 * 3600
+
+
+def make_collector(monkeypatch, tmp_path, db, **env):
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    collector = UploadGarbageCollector()
+    collector._db = db
+    return collector
+
+
+def add_file(directory, name, age_seconds):
+    path = directory / name
+    path.write_bytes(b"photo")
+    stamp = time.time() - age_seconds
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def add_submission(db, submission_id, front_view):
+    db.measurements.documents.append({
+        "_id": submission_id, "id": submission_id,
+        "images": {"front_view": front_view, "side_view": None, "reference_fit": None}
+    })
+
+
+def test_upload_filename_handles_absolute_and_relative_urls():
+    assert upload_filename("https://shop.example.com/uploads/a.jpg?v=2") == "a.jpg"
+    assert upload_filename("/uploads/b.png") == "b.png"
+    assert upload_filename("https://elsewhere.example.com/c.png") is None
+    assert upload_filename(None) is None
+
+
+def test_only_unreferenced_files_past_the_grace_period_are_orphans(monkeypatch, tmp_path):
+    db = FakeDatabase()
+    for index in range(4):
+        add_submission(db, f"order-{index}", f"/uploads/kept-{index}.jpg")
+        add_file(tmp_path, f"kept-{index}.jpg", 10 * DAY)
+    db.measurements_archive.documents.append({"_id": "a", "id": "archived", "images": {"front_view": "/uploads/archived.jpg"}})
+    add_file(tmp_path, "archived.jpg", 10 * DAY)
+    add_file(tmp_path, "fresh.jpg", 3600)
+    add_file(tmp_path, "orphan.jpg", 10 * DAY)
+    add_file(tmp_path, ".hidden", 10 * DAY)
+    collector = make_collector(monkeypatch, tmp_path, db, UPLOAD_GC_DRY_RUN="false")
+
+    report = asyncio.run(collector.collect(dry_run=False))
+
+    assert report["referenced"] == 5
+    assert report["files"] == 7
+    assert report["in_grace_period"] == 1
+    assert [orphan["filename"] for orphan in report["orphan_files"]] == ["orphan.jpg"]
+    assert report["deleted"] == 1 and report["refused"] is None
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        ".hidden", "archived.jpg", "fresh.jpg", "kept-0.jpg", "kept-1.jpg", "kept-2.jpg", "kept-3.jpg"
+    ]
+
+
+def test_dry_run_is_the_default(monkeypatch, tmp_path):
+    monkeypatch.delenv("UPLOAD_GC_DRY_RUN", raising=False)
+    assert make_collector(monkeypatch, tmp_path, FakeDatabase()).dry_run is True
+
+
+def test_nothing_is_deleted_when_no_submission_refers_to_any_upload(monkeypatch, tmp_path):
+    add_file(tmp_path, "a.jpg", 10 * DAY)
+    add_file(tmp_path, "b.jpg", 10 * DAY)
+    collector = make_collector(monkeypatch, tmp_path, FakeDatabase())
+
+    report = asyncio.run(collector.collect(dry_run=False))
+
+    assert report["orphans"] == 2
+    assert report["deleted"] == 0
+    assert "right database" in report["refused"]
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_nothing_is_deleted_when_most_files_look_orphaned(monkeypatch, tmp_path):
+    db = FakeDatabase()
+    add_submission(db, "order-1", "/uploads/kept.jpg")
+    add_file(tmp_path, "kept.jpg", 10 * DAY)
+    for index in range(3):
+        add_file(tmp_path, f"orphan-{index}.jpg", 10 * DAY)
+    collector = make_collector(monkeypatch, tmp_path, db, UPLOAD_GC_MAX_ORPHAN_RATIO="0.5")
+
+    report = asyncio.run(collector.collect(dry_run=False))
+
+    assert report["orphans"] == 3
+    assert report["deleted"] == 0
+    assert report["refused"]
+    assert len(list(tmp_path.iterdir())) == 4
+
+
+def test_one_worker_holds_the_collection_lease(monkeypatch, tmp_path):
+    db = FakeDatabase()
+    first = make_collector(monkeypatch, tmp_path, db)
+    second = make_collector(monkeypatch, tmp_path, db)
+
+    async def scenario():
+        results = [await first._acquire_lease()]
+        with monkeypatch.context() as patch:
+            patch.setattr("services.upload_gc.os.getpid", lambda: -1)
+            results.append(await second._acquire_lease())
+            # Once the lease runs out another worker takes it over
+            db.background_leases.documents[0]["lease_until"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+            results.append(await second._acquire_lease())
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert db.background_leases.documents[0]["owner"].endswith(":-1")